@@ -0,0 +1,177 @@
+from grid import Grid, LEFT, RIGHT, TOP, BOTTOM, WALLS
+import importlib.util
+
+# Vectorized maze analytics with NumPy. Everything here works on a
+# (num_rows, num_cols) uint8 array of wall bitmasks, walls[j, i] being the
+# cell in column i and row j, with the same LEFT/RIGHT/TOP/BOTTOM bits as
+# grid.py. Maze.to_numpy() gives you one.
+#
+# Cells are numbered row by row (j * num_cols + i), exactly like Grid
+# indexes, so the CSR graph and flat results line up with grid.data.
+#
+# NumPy is optional: the rest of the maze engine works without it, and the
+# functions here raise ImportError if it isn't installed. It's only imported
+# the first time one of them is called, so importing the engine (which
+# imports this module) doesn't pay for loading NumPy.
+
+np = None
+
+
+def _require_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError("maze analysis needs NumPy: pip install numpy") from None
+
+
+# Whether NumPy is installed, without importing it:
+def has_numpy():
+    return np is not None or importlib.util.find_spec("numpy") is not None
+
+
+def to_numpy(grid):
+    _require_numpy()
+    walls = np.frombuffer(grid.tobytes(), dtype=np.uint8)
+    return (walls & WALLS).reshape(grid.num_rows, grid.num_cols)
+
+
+# Build a Grid from a wall array. Both sides of every interior wall have to
+# agree (a cell's right wall is its neighbor's left wall), otherwise the
+# array doesn't describe a maze and ValueError is raised:
+def from_numpy(walls):
+    _require_numpy()
+    walls = np.asarray(walls)
+    if walls.ndim != 2 or walls.size == 0:
+        raise ValueError("walls must be a non-empty 2-D array")
+    walls = walls.astype(np.uint8) & WALLS
+    has_right = (walls[:, :-1] & RIGHT) != 0
+    has_left = (walls[:, 1:] & LEFT) != 0
+    has_bottom = (walls[:-1, :] & BOTTOM) != 0
+    has_top = (walls[1:, :] & TOP) != 0
+    if (has_right != has_left).any() or (has_bottom != has_top).any():
+        raise ValueError("walls disagree between neighboring cells")
+    num_rows, num_cols = walls.shape
+    grid = Grid(num_cols, num_rows)
+    grid.data[:] = walls.tobytes()
+    return grid
+
+
+# Boolean arrays of open interior passages: right[j, i] is True when cell
+# (i, j) opens onto (i + 1, j), and down[j, i] when it opens onto (i, j + 1):
+def passages(walls):
+    _require_numpy()
+    walls = np.asarray(walls)
+    right = (walls[:, :-1] & RIGHT) == 0
+    down = (walls[:-1, :] & BOTTOM) == 0
+    return right, down
+
+
+# Every open passage as two arrays of cell numbers (a[k] opens onto b[k]):
+def _edges(walls):
+    right, down = passages(walls)
+    num_rows, num_cols = np.shape(walls)
+    cells = np.arange(num_rows * num_cols, dtype=np.int64).reshape(num_rows, num_cols)
+    a = np.concatenate([cells[:, :-1][right], cells[:-1, :][down]])
+    b = np.concatenate([cells[:, 1:][right], cells[1:, :][down]])
+    return a, b
+
+
+# Number of open passages out of each cell. Holes in the outer wall (the
+# entrance and exit) don't count, since they don't lead to another cell:
+def degrees(walls):
+    right, down = passages(walls)
+    degree = np.zeros(np.shape(walls), dtype=np.uint8)
+    degree[:, :-1] += right
+    degree[:, 1:] += right
+    degree[:-1, :] += down
+    degree[1:, :] += down
+    return degree
+
+
+# Boolean mask of the cells with exactly one way out:
+def dead_ends(walls):
+    return degrees(walls) == 1
+
+
+# The maze as an undirected graph in compressed sparse row form. Returns
+# (indptr, indices): the neighbors of cell k are indices[indptr[k]:indptr[k + 1]],
+# sorted. This is the layout scipy.sparse.csr_matrix takes, if you have it:
+def to_csr(walls):
+    a, b = _edges(walls)
+    num_rows, num_cols = np.shape(walls)
+    sources = np.concatenate([a, b])
+    targets = np.concatenate([b, a])
+    order = np.lexsort((targets, sources))
+    indices = targets[order]
+    indptr = np.zeros(num_rows * num_cols + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_rows * num_cols), out=indptr[1:])
+    return indptr, indices
+
+
+# Label every cell with the smallest cell number in its connected region, so
+# two cells are connected exactly when their labels match. Rather than
+# flooding outwards one ring at a time (one step per cell of corridor, which
+# is slow on long winding mazes), each round hooks every region onto a
+# neighboring region with a smaller label and then pointer-jumps the labels
+# flat. Every region merges with at least one neighbor per round, so this
+# takes O(log n) rounds of array operations:
+def components(walls):
+    a, b = _edges(walls)
+    num_rows, num_cols = np.shape(walls)
+    label = np.arange(num_rows * num_cols, dtype=np.int64)
+    while True:
+        label_a = label[a]
+        label_b = label[b]
+        different = label_a != label_b
+        if not different.any():
+            break
+        low = np.minimum(label_a, label_b)[different]
+        high = np.maximum(label_a, label_b)[different]
+        # Labels are always roots here, so this hooks whole regions. If a
+        # root gets several hooks at once, any of them will do:
+        label[high] = low
+        while True:
+            jumped = label[label]
+            if (jumped == label).all():
+                break
+            label = jumped
+    return label.reshape(num_rows, num_cols)
+
+
+# Breadth-first flood fill from `start`, an (i, j) pair. Returns a
+# (num_rows, num_cols) int64 array of distances in moves from start, -1 for
+# cells that can't be reached. Each ring of the fill is a handful of array
+# operations, so there is one Python-level step per ring, not per cell. That
+# is fast on mazes with lots of branching, but a maze with very long
+# corridors has a lot of rings; use components() or reachable() if you
+# only need connectivity:
+def distances(walls, start=(0, 0)):
+    indptr, indices = to_csr(walls)
+    num_rows, num_cols = np.shape(walls)
+    distance = np.full(num_rows * num_cols, -1, dtype=np.int64)
+    i, j = start
+    frontier = np.array([j * num_cols + i], dtype=np.int64)
+    distance[frontier] = 0
+    ring = 0
+    while frontier.size:
+        ring += 1
+        # Gather every neighbor of every frontier cell in one go:
+        counts = indptr[frontier + 1] - indptr[frontier]
+        total = counts.sum()
+        if total == 0:
+            break
+        offsets = np.repeat(indptr[frontier] - np.cumsum(counts) + counts, counts)
+        neighbors = indices[offsets + np.arange(total)]
+        neighbors = np.unique(neighbors[distance[neighbors] < 0])
+        distance[neighbors] = ring
+        frontier = neighbors
+    return distance.reshape(num_rows, num_cols)
+
+
+# Boolean mask of the cells reachable from `start`, an (i, j) pair:
+def reachable(walls, start=(0, 0)):
+    label = components(walls)
+    i, j = start
+    return label == label[j, i]
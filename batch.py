@@ -0,0 +1,113 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from generators import dead_ends
+from instrument import MazeStats
+from maze import Maze
+import mazefile
+import os
+
+# Generate lots of seeded mazes at once, spread over a pool of worker
+# processes. Every maze gets its own random number generator (see Maze), so
+# a spec always produces the same maze no matter which worker builds it or
+# what else that worker built before.
+#
+#   for packed in generate_batch([(rows, cols, seed), ...], workers=8):
+#       packed.save(f"maze-{packed.seed}.maze")
+#
+# Results come back as PackedMaze objects (walls packed 4 bits per cell, the
+# same layout as a maze file), in the same order as the specs. Only a few
+# results per worker are in flight at any time, so a huge batch streams
+# through without piling up in memory.
+#
+# Pass a solver name and every maze is solved in the worker too, with its
+# metrics (path length, dead ends, timings, ...) in PackedMaze.metrics.
+
+
+class PackedMaze:
+    def __init__(self, num_rows, num_cols, seed, generator, packed, metrics=None):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.seed = seed
+        self.generator = generator
+        # The walls, packed row by row as in mazefile.pack_grid():
+        self.packed = packed
+        # A dict of numbers about the maze and its solution, ready for
+        # json.dumps, if the batch was solved (see _metrics):
+        self.metrics = metrics
+
+    def to_maze(self, **kwargs):
+        grid = mazefile.unpack_grid(self.packed, self.num_cols, self.num_rows)
+        return Maze.from_grid(grid, seed=self.seed, generator=self.generator, **kwargs)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            mazefile.write_header(
+                f, self.num_cols, self.num_rows, self.seed, self.generator
+            )
+            f.write(self.packed)
+
+
+# Build one maze from a (num_rows, num_cols, seed) spec, and solve it if
+# there's a solver. This runs inside the worker processes, so it has to be a
+# plain module-level function:
+def _generate(spec, generator, solver=None):
+    num_rows, num_cols, seed = spec
+    if solver is None:
+        maze = Maze.headless(num_rows, num_cols, seed, generator)
+        metrics = None
+    else:
+        stats = MazeStats()
+        maze = Maze.headless(num_rows, num_cols, seed, generator, stats=stats)
+        metrics = _metrics(maze, maze.find_path(solver), stats)
+    return PackedMaze(
+        num_rows, num_cols, seed, generator, mazefile.pack_grid(maze._cells), metrics
+    )
+
+
+# What the batch reports about a solved maze. Path length is in moves (-1 if
+# there's no way through), and the timings are in seconds:
+def _metrics(maze, result, stats):
+    return {
+        "seed": maze._seed,
+        "rows": maze._num_rows,
+        "cols": maze._num_cols,
+        "generator": maze._generator,
+        "solver": result.solver,
+        "path_length": result.length,
+        "nodes_expanded": result.nodes_expanded,
+        "dead_ends": len(dead_ends(maze._cells)),
+        "walls_removed": stats.walls_removed,
+        "timings": {
+            "generate": stats.timings.get("create", 0.0) + stats.timings.get("carve", 0.0),
+            "solve": result.elapsed,
+        },
+    }
+
+
+# Generate a maze for every (num_rows, num_cols, seed) spec and yield them
+# as PackedMaze objects, in order. workers is the number of processes to use
+# (default: one per CPU); with workers=1 everything runs in this process.
+# in_flight caps how many mazes each worker can have queued or finished but
+# not yet handed back. solver is the name of a find_path() solver to solve
+# every maze with, or None not to solve them:
+def generate_batch(
+    specs, workers=None, generator="backtracker", in_flight=4, solver=None
+):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    if workers == 1:
+        for spec in specs:
+            yield _generate(spec, generator, solver)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for spec in specs:
+            pending.append(pool.submit(_generate, spec, generator, solver))
+            if len(pending) >= workers * in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
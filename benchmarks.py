@@ -0,0 +1,782 @@
+import analysis
+import argparse
+import batch
+from cell import Cell
+from concurrent.futures import ProcessPoolExecutor
+import events
+from generators import GENERATORS
+from graphics import LineBatch
+from instrument import MazeStats
+from maze import Maze
+import raster
+from solvers import SOLVERS
+import json
+import os
+import platform
+import random
+import stream
+import subprocess
+import sys
+import tempfile
+import time
+from topology import Square
+import tracemalloc
+
+# resource (for peak RSS) only exists on Unix:
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Simple benchmarks for the maze engine. Run with:
+#
+#   python benchmarks.py            (default sizes)
+#   python benchmarks.py 100 1000   (square grids of 100x100 and 1000x1000 cells)
+#
+# Every benchmark builds headless mazes (Maze.headless) with a fixed seed so runs are
+# comparable with each other.
+#
+# For numbers to keep and compare between commits, run the suite instead. Every case
+# runs in a fresh process and records time, peak RSS and peak traced allocations, and
+# the results are written as JSON:
+#
+#   python benchmarks.py --json before.json
+#   python benchmarks.py --json after.json --compare before.json
+#   python benchmarks.py --json - 10 100 --cases solve      (a subset, to stdout)
+
+SEED = 1234
+
+# (num_rows, num_cols) pairs for 10^4, 10^6 and 4x10^6 cells:
+DEFAULT_SIZES = [(100, 100), (1000, 1000), (2000, 2000)]
+
+
+# A stand-in for a Tk canvas that just counts the calls made on it, so drawing
+# can be benchmarked without a display:
+class CountingCanvas:
+    def __init__(self):
+        self.created = 0
+        self.configured = 0
+
+    def create_line(self, *args, **kwargs):
+        self.created += 1
+        return self.created
+
+    def itemconfigure(self, item, **kwargs):
+        self.configured += 1
+
+    def delete(self, item):
+        pass
+
+
+# A stand-in for graphics.Window with a real LineBatch on a CountingCanvas,
+# flushing a frame every steps_per_frame steps and never sleeping:
+class BenchWindow:
+    def __init__(self, steps_per_frame=200):
+        self.canvas = CountingCanvas()
+        self.lines = LineBatch(self.canvas)
+        self.steps_per_frame = steps_per_frame
+        self.steps = 0
+        self.frames = 0
+
+    def draw_line(self, line, fill_color="black"):
+        self.lines.draw_line(line, fill_color)
+
+    def erase_line(self, line):
+        self.lines.erase_line(line)
+
+    def animate(self):
+        self.steps += 1
+        if self.steps % self.steps_per_frame == 0:
+            self.redraw()
+
+    def redraw(self):
+        self.lines.flush()
+        self.frames += 1
+
+
+# Time how long it takes to build (and carve) a maze of the given size.
+# Returns the number of seconds it took:
+def time_carve(num_rows, num_cols, seed=SEED):
+    start = time.perf_counter()
+    Maze.headless(num_rows, num_cols, seed=seed)
+    return time.perf_counter() - start
+
+
+def bench_carve(sizes):
+    print("carve")
+    for num_rows, num_cols in sizes:
+        cells = num_rows * num_cols
+        elapsed = time_carve(num_rows, num_cols)
+        print(
+            f"  {num_cols}x{num_rows} ({cells} cells): "
+            f"{elapsed:.3f}s, {cells / elapsed:,.0f} cells/sec"
+        )
+
+
+# Solve throughput on a headless maze. Only the solve itself is timed:
+def bench_solve(sizes):
+    print("solve (headless)")
+    for num_rows, num_cols in sizes:
+        cells = num_rows * num_cols
+        maze = Maze.headless(num_rows, num_cols, seed=SEED)
+        start = time.perf_counter()
+        maze.solve()
+        elapsed = time.perf_counter() - start
+        print(
+            f"  {num_cols}x{num_rows} ({cells} cells): "
+            f"{elapsed:.3f}s, {cells / elapsed:,.0f} cells/sec"
+        )
+
+
+# Each shortest-path solver from entrance to exit: latency, path length and
+# how many cells it had to expand:
+def bench_solvers(sizes):
+    print("shortest path solvers")
+    for num_rows, num_cols in sizes:
+        maze = Maze.headless(num_rows, num_cols, seed=SEED)
+        print(f"  {num_cols}x{num_rows} ({num_rows * num_cols} cells)")
+        for name in SOLVERS:
+            result = maze.find_path(name)
+            print(
+                f"    {name:18} {result.elapsed * 1000:9.1f}ms"
+                f"  length {result.length:8}  expanded {result.nodes_expanded:8}"
+            )
+
+
+# Peak memory allocated while building a maze, in bytes per cell:
+def bench_memory(sizes):
+    print("memory")
+    for num_rows, num_cols in sizes:
+        cells = num_rows * num_cols
+        tracemalloc.start()
+        Maze.headless(num_rows, num_cols, seed=SEED)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {num_cols}x{num_rows}: peak {peak / 1e6:.1f} MB, {peak / cells:.1f} bytes/cell")
+
+
+def bench_reset(sizes):
+    print("reset visited")
+    for num_rows, num_cols in sizes:
+        maze = Maze.headless(num_rows, num_cols, seed=SEED)
+        start = time.perf_counter()
+        maze._reset_cells_visited()
+        elapsed = time.perf_counter() - start
+        print(f"  {num_cols}x{num_rows}: {elapsed * 1000:.3f}ms")
+
+
+# Every generator in the registry, side by side: time and peak memory per
+# cell. Memory is measured on a separate run, since tracemalloc slows
+# everything down:
+def bench_generators(sizes):
+    print("generators")
+    for num_rows, num_cols in sizes:
+        cells = num_rows * num_cols
+        print(f"  {num_cols}x{num_rows} ({cells} cells)")
+        for name in GENERATORS:
+            start = time.perf_counter()
+            Maze.headless(num_rows, num_cols, seed=SEED, generator=name)
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            Maze.headless(num_rows, num_cols, seed=SEED, generator=name)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"    {name:12} {elapsed * 1e9 / cells:8.0f} ns/cell"
+                f" {peak / cells:8.1f} bytes/cell"
+            )
+
+
+# Carving and solving over each topology, at the same number of cells: the
+# layered mazes have 4 levels of a quarter of the rows each. "square (generic)"
+# carves a square grid through the topology code, which shows what the square
+# fast path is worth:
+def bench_topologies(sizes):
+    print("topologies (backtracker carve, bfs solve)")
+    for num_rows, num_cols in sizes:
+        cells = num_rows * num_cols
+        print(f"  {num_cols}x{num_rows} ({cells} cells)")
+        for name, make in (
+            ("square", lambda: Maze.headless(num_rows, num_cols, seed=SEED)),
+            ("square (generic)", lambda: Maze.from_grid(_carved(Square(num_cols, num_rows)))),
+            ("hex", lambda: Maze.headless(num_rows, num_cols, seed=SEED, topology="hex")),
+            ("triangle", lambda: Maze.headless(
+                num_rows, num_cols, seed=SEED, topology="triangle"
+            )),
+            ("layers", lambda: Maze.headless(
+                max(1, num_rows // 4), num_cols, seed=SEED, topology="layers", num_levels=4
+            )),
+        ):
+            start = time.perf_counter()
+            maze = make()
+            carved = time.perf_counter() - start
+            start = time.perf_counter()
+            maze.find_path()
+            solved = time.perf_counter() - start
+            print(
+                f"    {name:17} carve {carved * 1e9 / cells:6.0f} ns/cell,"
+                f" solve {solved * 1e9 / cells:6.0f} ns/cell"
+            )
+
+
+def _carved(topology):
+    grid = topology.grid()
+    GENERATORS["backtracker"](grid, random.Random(SEED))
+    return grid
+
+
+# Stream a maze straight to disk, num_cols wide, for a growing number of
+# rows. Peak memory should stay flat as the maze gets taller:
+def bench_stream(num_cols=1000, heights=(100, 1000, 5000)):
+    print(f"stream to disk ({num_cols} columns)")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "stream.maze")
+        for num_rows in heights:
+            start = time.perf_counter()
+            stream.write_stream(path, num_cols, num_rows, seed=SEED)
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            stream.write_stream(path, num_cols, num_rows, seed=SEED)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"  {num_rows} rows: {num_rows / elapsed:,.0f} rows/sec,"
+                f" peak {peak / 1e3:.0f} kB, {os.path.getsize(path) / 1e6:.1f} MB on disk"
+            )
+
+
+# The vectorized NumPy helpers in analysis.py. Skipped without NumPy:
+def bench_analysis(sizes):
+    if not analysis.has_numpy():
+        print("analysis: skipped, NumPy is not installed")
+        return
+    print("analysis (NumPy)")
+    for num_rows, num_cols in sizes:
+        walls = Maze.headless(num_rows, num_cols, seed=SEED).to_numpy()
+        print(f"  {num_cols}x{num_rows} ({num_rows * num_cols} cells)")
+        for name in ("degrees", "dead_ends", "to_csr", "reachable"):
+            start = time.perf_counter()
+            getattr(analysis, name)(walls)
+            elapsed = time.perf_counter() - start
+            print(f"    {name:10} {elapsed * 1000:9.1f}ms")
+
+
+# Save a maze, then time opening it memory-mapped versus loading it into
+# memory, and solving it straight from the mapping:
+def bench_files(sizes):
+    print("save / load")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.maze")
+        for num_rows, num_cols in sizes:
+            maze = Maze.headless(num_rows, num_cols, seed=SEED)
+            start = time.perf_counter()
+            maze.save(path)
+            saved = time.perf_counter() - start
+            start = time.perf_counter()
+            mapped = Maze.load(path)
+            opened = time.perf_counter() - start
+            start = time.perf_counter()
+            Maze.load(path, in_memory=True)
+            loaded = time.perf_counter() - start
+            with mapped:
+                result = mapped.find_path()
+            print(
+                f"  {num_cols}x{num_rows}: {os.path.getsize(path) / 1e6:.1f} MB,"
+                f" save {saved * 1000:.1f}ms, mmap open {opened * 1000:.3f}ms,"
+                f" load into memory {loaded * 1000:.1f}ms,"
+                f" bfs on mapping {result.elapsed * 1000:.1f}ms"
+            )
+
+
+# Batch generation throughput with 1, 4 and one-per-CPU worker processes:
+def bench_batch(count=400, num_rows=50, num_cols=50):
+    print(f"batch ({count} mazes of {num_cols}x{num_rows})")
+    specs = [(num_rows, num_cols, SEED + k) for k in range(count)]
+    for workers in sorted({1, 4, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        for _ in batch.generate_batch(specs, workers=workers):
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"  {workers:3} workers: {count / elapsed:8.1f} mazes/sec")
+
+
+# Build and solve an animated maze against a fake canvas: how long the
+# drawing path takes, and how many canvas items and updates it produces:
+def bench_render(num_rows=200, num_cols=200):
+    print(f"render ({num_cols}x{num_rows}, fake canvas)")
+    win = BenchWindow()
+    start = time.perf_counter()
+    maze = Maze(0, 0, num_rows, num_cols, 4, 4, win, seed=SEED)
+    maze.solve()
+    win.redraw()
+    elapsed = time.perf_counter() - start
+    print(
+        f"  {elapsed:.2f}s, {win.steps} steps in {win.frames} frames,"
+        f" {win.lines.item_count} canvas items,"
+        f" {win.canvas.configured} item updates"
+    )
+
+
+# Headless image export: thumbnails per second for small mazes, then one
+# large maze written strip by strip (peak memory should track the width):
+def bench_raster(thumbnails=200, num_rows=1000, num_cols=1000):
+    print("raster export")
+    mazes = [Maze.headless(20, 20, seed=SEED + k) for k in range(thumbnails)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "thumb.png")
+        start = time.perf_counter()
+        for maze in mazes:
+            maze.save_image(path, cell_px=4, wall_px=1)
+        elapsed = time.perf_counter() - start
+        print(f"  20x20 thumbnails: {thumbnails / elapsed * 60:,.0f} per minute")
+
+        maze = Maze.headless(num_rows, num_cols, seed=SEED)
+        path = os.path.join(tmp, "big.png")
+        start = time.perf_counter()
+        tracemalloc.start()
+        maze.save_image(path, cell_px=2, wall_px=1, path=maze.find_path())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        elapsed = time.perf_counter() - start
+        width, height = raster.image_size(maze._cells, 2, 1)
+        print(
+            f"  {num_cols}x{num_rows} with path: {width}x{height} px in {elapsed:.2f}s,"
+            f" peak {peak / 1e6:.1f} MB"
+        )
+
+
+def bench_events(num_rows=500, num_cols=500):
+    print("event log record/replay")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "run.events")
+        start = time.perf_counter()
+        Maze.headless(num_rows, num_cols, seed=SEED).solve()
+        plain = time.perf_counter() - start
+        start = time.perf_counter()
+        with events.EventRecorder(path) as recorder:
+            Maze.headless(num_rows, num_cols, seed=SEED, recorder=recorder).solve()
+        recorded = time.perf_counter() - start
+        print(
+            f"  {num_cols}x{num_rows} carve+solve: {plain:.2f}s plain,"
+            f" {recorded:.2f}s recorded ({recorder.count / recorded:,.0f} events/s,"
+            f" {os.path.getsize(path) / 1e6:.1f} MB)"
+        )
+
+        player = events.Player(path)
+        start = time.perf_counter()
+        player.skip_to_end()
+        elapsed = time.perf_counter() - start
+        print(f"  replay: {len(player) / elapsed:,.0f} events/s")
+        start = time.perf_counter()
+        player.seek(len(player) // 2)
+        elapsed = time.perf_counter() - start
+        print(f"  seek back to the middle: {elapsed:.2f}s")
+        player.close()
+
+
+# Braiding a share of the dead ends, then the 10 shortest paths through the
+# braided maze:
+def bench_braid(sizes, fraction=0.3, k=10):
+    print(f"braid ({fraction:.0%} of dead ends) and {k} shortest paths")
+    for num_rows, num_cols in sizes:
+        maze = Maze.headless(num_rows, num_cols, seed=SEED)
+        start = time.perf_counter()
+        removed = maze.braid(fraction)
+        braided = time.perf_counter() - start
+        results = maze.find_paths(k)
+        print(
+            f"  {num_cols}x{num_rows}: braid {braided:.3f}s ({removed} walls),"
+            f" {len(results)} paths in {results[-1].elapsed:.3f}s,"
+            f" lengths {results[0].length}..{results[-1].length},"
+            f" expanded {results[-1].nodes_expanded}"
+        )
+
+
+# PathIndex: build time, then random distance queries (cold, then again from the
+# cache) and path queries, against a fresh BFS per query:
+def bench_path_index(sizes, queries=100_000):
+    print("path index")
+    for num_rows, num_cols in sizes:
+        maze = Maze.headless(num_rows, num_cols, seed=SEED)
+        start = time.perf_counter()
+        index = maze.path_index()
+        built = time.perf_counter() - start
+        rng = random.Random(SEED)
+        pairs = [
+            ((rng.randrange(num_cols), rng.randrange(num_rows)),
+             (rng.randrange(num_cols), rng.randrange(num_rows)))
+            for _ in range(queries)
+        ]
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            for a, b in pairs:
+                index.distance(a, b)
+            timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        for a, b in pairs[:1000]:
+            index.path(a, b)
+        paths = (time.perf_counter() - start) / 1000
+        start = time.perf_counter()
+        for a, b in pairs[:10]:
+            maze.find_path(start=a, goal=b)
+        searched = (time.perf_counter() - start) / 10
+        print(
+            f"  {num_cols}x{num_rows}: build {built:.2f}s,"
+            f" distance {queries / timings[0]:,.0f}/s cold {queries / timings[1]:,.0f}/s cached,"
+            f" path {paths * 1000:.3f}ms avg, bfs {searched * 1000:.1f}ms per query"
+        )
+
+
+# How long a fresh interpreter takes to import each module, and what heavy
+# optional modules come along with it. Each import runs in its own
+# subprocess, best of `repeat`, with the interpreter's own start-up
+# (importing nothing) taken off:
+def bench_import(modules=("maze", "graphics", "benchmarks"), repeat=5):
+    print("import time")
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = (
+        "import sys, time; start = time.perf_counter(); {}; "
+        "print(time.perf_counter() - start, "
+        "*(name for name in ('tkinter', 'numpy', 'multiprocessing') if name in sys.modules))"
+    )
+    for module in modules:
+        best = None
+        for _ in range(repeat):
+            out = subprocess.run(
+                [sys.executable, "-c", code.format(f"import {module}")],
+                capture_output=True,
+                text=True,
+                cwd=here,
+                check=True,
+            ).stdout.split()
+            if best is None or float(out[0]) < float(best[0]):
+                best = out
+        loaded = ", ".join(best[1:]) or "nothing heavy"
+        print(f"  {module:12} {float(best[0]) * 1000:7.1f}ms (loads {loaded})")
+
+
+# Incremental re-solving: after each wall change, the LPA* solver's repair
+# against a fresh breadth-first find_path(), on a braided maze so most changes
+# leave a way through. Changes are made along the current path, near the
+# start and near the goal, where they cost the most and the least:
+def bench_incremental(num_rows=1000, num_cols=1000, changes=20):
+    print(f"incremental solving ({num_cols}x{num_rows}, {changes} changes)")
+    maze = Maze.headless(num_rows, num_cols, seed=SEED)
+    maze.braid(0.3)
+    start = time.perf_counter()
+    solver = maze.incremental_solver()
+    solver.solve()
+    built = time.perf_counter() - start
+    print(f"  first solve: {built:.2f}s")
+    rng = random.Random(SEED)
+    for where in ("start", "goal"):
+        repaired = searched = expanded = 0.0
+        for _ in range(changes):
+            path = solver.solve().path
+            if len(path) < 2:
+                break
+            k = rng.randrange(min(50, len(path) - 1))
+            if where == "goal":
+                k = len(path) - 2 - k
+            maze.close_wall(path[k], path[k + 1])
+            result = solver.solve()
+            repaired += result.elapsed
+            expanded += result.nodes_expanded
+            start = time.perf_counter()
+            maze.find_path()
+            searched += time.perf_counter() - start
+            maze.open_wall(path[k], path[k + 1])
+            solver.solve()
+        print(
+            f"  near the {where}: repair {repaired / changes * 1000:.1f}ms"
+            f" ({expanded / changes:,.0f} cells), bfs {searched / changes * 1000:.1f}ms per change"
+        )
+
+
+# Tiled carving: one serial carve against the same grid cut into blocks, built
+# in this process and then over a pool with one worker per CPU:
+def bench_tiled(num_rows=2000, num_cols=2000, block_size=256):
+    cpus = os.cpu_count() or 1
+    print(f"tiled carving ({num_cols}x{num_rows}, {block_size}x{block_size} blocks, {cpus} CPUs)")
+    start = time.perf_counter()
+    Maze.headless(num_rows, num_cols, seed=SEED)
+    serial = time.perf_counter() - start
+    print(f"  serial backtracker: {serial:.2f}s")
+    for workers in sorted({1, cpus}):
+        start = time.perf_counter()
+        Maze.tiled(num_rows, num_cols, seed=SEED, block_size=block_size, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"  tiled, {workers} workers: {elapsed:.2f}s ({serial / elapsed:.2f}x)")
+
+
+def bench_stats(sizes):
+    print("instrumentation overhead (carve + solve)")
+    for num_rows, num_cols in sizes:
+        start = time.perf_counter()
+        Maze.headless(num_rows, num_cols, seed=SEED).solve()
+        plain = time.perf_counter() - start
+        stats = MazeStats()
+        start = time.perf_counter()
+        Maze.headless(num_rows, num_cols, seed=SEED, stats=stats).solve()
+        measured = time.perf_counter() - start
+        phases = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in stats.timings.items())
+        print(
+            f"  {num_cols}x{num_rows}: {plain:.3f}s plain, {measured:.3f}s with stats"
+            f" ({phases})"
+        )
+
+
+# The suite. Each case is a function that takes (num_rows, num_cols) and does its
+# setup (building the maze to solve, say), then returns a function that runs just
+# the part being measured. max_cells skips the case on bigger grids.
+SUITE_SIZES = [(10, 10), (100, 100), (1000, 1000), (2000, 2000)]
+
+
+def _case_construct(generator):
+    def setup(num_rows, num_cols):
+        return lambda: Maze.headless(num_rows, num_cols, seed=SEED, generator=generator)
+    return setup
+
+
+def _case_topology(topology):
+    def setup(num_rows, num_cols):
+        if topology == "layers":
+            return lambda: Maze.headless(
+                max(1, num_rows // 4), num_cols, seed=SEED, topology="layers", num_levels=4
+            )
+        return lambda: Maze.headless(num_rows, num_cols, seed=SEED, topology=topology)
+    return setup
+
+
+def _case_topology_find_path(topology):
+    def setup(num_rows, num_cols):
+        maze = _case_topology(topology)(num_rows, num_cols)()
+        return maze.find_path
+    return setup
+
+
+def _case_tiled(num_rows, num_cols):
+    return lambda: Maze.tiled(num_rows, num_cols, seed=SEED)
+
+
+def _case_solve(num_rows, num_cols):
+    maze = Maze.headless(num_rows, num_cols, seed=SEED)
+    return maze.solve
+
+
+def _case_find_path(solver):
+    def setup(num_rows, num_cols):
+        maze = Maze.headless(num_rows, num_cols, seed=SEED)
+        return lambda: maze.find_path(solver)
+    return setup
+
+
+def _case_reset(num_rows, num_cols):
+    maze = Maze.headless(num_rows, num_cols, seed=SEED)
+    maze.solve()
+    return maze._reset_cells_visited
+
+
+def _case_braid(num_rows, num_cols):
+    maze = Maze.headless(num_rows, num_cols, seed=SEED)
+    return lambda: maze.braid(0.3)
+
+
+def _case_find_paths(num_rows, num_cols):
+    maze = Maze.headless(num_rows, num_cols, seed=SEED)
+    maze.braid(0.3)
+    return lambda: maze.find_paths(10)
+
+
+# Cell.draw for every cell of a carved maze, onto a fake canvas:
+def _case_draw(num_rows, num_cols):
+    maze = Maze.headless(num_rows, num_cols, seed=SEED)
+    win = BenchWindow()
+    maze._cells.set_geometry(0, 0, 4, 4, win)
+
+    def run():
+        for col in maze._cells:
+            for cell in col:
+                Cell.draw(cell, cell._x1, cell._y1, cell._x2, cell._y2)
+        win.redraw()
+    return run
+
+
+# name -> (setup, max_cells):
+SUITE = {}
+for _name in GENERATORS:
+    SUITE[f"construct/{_name}"] = (_case_construct(_name), None)
+SUITE["construct/tiled"] = (_case_tiled, None)
+for _name in ("hex", "triangle", "layers"):
+    SUITE[f"construct/{_name}"] = (_case_topology(_name), None)
+SUITE["solve/dfs"] = (_case_solve, None)
+for _name in SOLVERS:
+    SUITE[f"find_path/{_name}"] = (_case_find_path(_name), None)
+for _name in ("hex", "triangle", "layers"):
+    SUITE[f"find_path/{_name}"] = (_case_topology_find_path(_name), None)
+SUITE["braid"] = (_case_braid, None)
+SUITE["find_paths/yen"] = (_case_find_paths, None)
+SUITE["reset"] = (_case_reset, None)
+SUITE["draw/cell"] = (_case_draw, 250_000)
+
+
+# Peak resident set size of this process so far, in kilobytes:
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes:
+    if sys.platform == "darwin":
+        peak //= 1024
+    return peak
+
+
+# Run one case. This runs in its own worker process, so peak RSS belongs to this
+# case alone. Small grids are timed a few times and the best run kept. The case is
+# then run once more under tracemalloc, which slows it down too much to time:
+def _run_case(name, num_rows, num_cols):
+    setup, _ = SUITE[name]
+    repeat = 5 if num_rows * num_cols <= 10_000 else 1
+    run = setup(num_rows, num_cols)
+    rss_before = _peak_rss_kb()
+    best = None
+    for n in range(repeat):
+        if n:
+            run = setup(num_rows, num_cols)
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rss_after = _peak_rss_kb()
+
+    run = setup(num_rows, num_cols)
+    tracemalloc.start()
+    result = run()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        "case": name,
+        "rows": num_rows,
+        "cols": num_cols,
+        "seconds": best,
+        "repeat": repeat,
+        "peak_rss_kb": rss_after,
+        "rss_growth_kb": None if rss_after is None else rss_after - rss_before,
+        "alloc_peak_bytes": peak,
+        "alloc_retained_bytes": current,
+    }
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+# Run every case (or those whose names contain one of `only`) at every size and
+# return the results, printing progress to stderr:
+def run_suite(sizes=SUITE_SIZES, only=None):
+    results = []
+    for name, (setup, max_cells) in SUITE.items():
+        if only and not any(part in name for part in only):
+            continue
+        for num_rows, num_cols in sizes:
+            if max_cells is not None and num_rows * num_cols > max_cells:
+                continue
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                result = pool.submit(_run_case, name, num_rows, num_cols).result()
+            print(
+                f"{name:28} {f'{num_cols}x{num_rows}':10} {result['seconds']:9.4f}s",
+                file=sys.stderr,
+            )
+            results.append(result)
+    return {
+        "seed": SEED,
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+# Print how each case changed against an earlier run. Ratios are new / old time, so
+# anything over `threshold` is flagged as a regression, unless it's faster than
+# min_seconds either way (those are mostly timer noise):
+def compare(old, new, threshold=1.1, min_seconds=0.001):
+    before = {(r["case"], r["rows"], r["cols"]): r for r in old["results"]}
+    for result in new["results"]:
+        key = (result["case"], result["rows"], result["cols"])
+        if key not in before:
+            continue
+        ratio = result["seconds"] / max(before[key]["seconds"], 1e-9)
+        slow = ratio > threshold and result["seconds"] > min_seconds
+        flag = "  REGRESSION" if slow else ""
+        size = f"{result['cols']}x{result['rows']}"
+        print(
+            f"{result['case']:28} {size:10}"
+            f" {before[key]['seconds']:9.4f}s -> {result['seconds']:9.4f}s"
+            f" ({ratio:5.2f}x){flag}"
+        )
+
+
+def parse_sizes(args):
+    if not args:
+        return DEFAULT_SIZES
+    return [(int(n), int(n)) for n in args]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maze benchmarks")
+    parser.add_argument("sizes", nargs="*", help="square grid sizes, e.g. 100 1000")
+    parser.add_argument("--json", metavar="PATH", help="run the suite, write JSON ('-' for stdout)")
+    parser.add_argument("--compare", metavar="PATH", help="compare the suite against an earlier run")
+    parser.add_argument("--cases", nargs="+", help="only run suite cases whose names contain these")
+    args = parser.parse_args()
+
+    if args.json or args.compare:
+        results = run_suite(parse_sizes(args.sizes) if args.sizes else SUITE_SIZES, args.cases)
+        if args.json == "-":
+            json.dump(results, sys.stdout, indent=2)
+            print()
+        elif args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=2)
+        if args.compare:
+            with open(args.compare) as f:
+                compare(json.load(f), results)
+        return
+
+    sizes = parse_sizes(args.sizes)
+    bench_import()
+    bench_carve(sizes)
+    bench_solve(sizes)
+    bench_solvers(sizes)
+    bench_memory(sizes)
+    bench_reset(sizes)
+    bench_generators(sizes)
+    bench_topologies(sizes)
+    bench_analysis(sizes)
+    bench_files(sizes)
+    bench_stream()
+    bench_batch()
+    bench_render()
+    bench_raster()
+    bench_events()
+    bench_stats(sizes)
+    bench_braid(sizes)
+    bench_path_index(sizes)
+    bench_incremental()
+    bench_tiled()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,3 @@
-from graphics import Line, Point
-
 # Let's build a Cell class that holds all the data about an individual cell. 
 # It should know which walls it has, know where it exists on the canvas in x/y
 # coordinates, and have access to the window so that it can draw itself:
@@ -23,6 +21,9 @@ class Cell:
     def draw(self, x1, y1, x2, y2):
         if self._win is None:
             return
+        # graphics is only imported once there's a window to draw on, so
+        # headless mazes never load it:
+        from graphics import Line, Point
         self._x1 = x1
         self._x2 = x2
         self._y1 = y1
@@ -59,6 +60,25 @@ class Cell:
     # We need a way to draw a path between 2 cells. It should draw a 
     # line from the center of one cell to another
     def draw_move(self, to_cell, undo=False):
+        # Nothing to draw on without a window (and no coordinates either):
+        if self._win is None:
+            return
+        fill_color = "red"
+        if undo:
+            fill_color = "gray"
+
+        self._win.draw_line(self._move_line(to_cell), fill_color)
+
+    # Take a move drawn by draw_move() off the window again (events.Player
+    # does this when it seeks back to before the move):
+    def erase_move(self, to_cell):
+        if self._win is None:
+            return
+        self._win.erase_line(self._move_line(to_cell))
+
+    # The line from the center of this cell to the center of another:
+    def _move_line(self, to_cell):
+        from graphics import Line, Point
         # Calculate center coordinates of current cell:
         x_center = (self._x1 + self._x2) // 2
         y_center = (self._y1 + self._y2) // 2
@@ -66,9 +86,4 @@ class Cell:
         x_center2 = (to_cell._x1 + to_cell._x2) // 2
         y_center2 = (to_cell._y1 + to_cell._y2) // 2
 
-        fill_color = "red"
-        if undo:
-            fill_color = "gray"
-
-        line = Line(Point(x_center, y_center), Point(x_center2, y_center2))
-        self._win.draw_line(line, fill_color)
+        return Line(Point(x_center, y_center), Point(x_center2, y_center2))
@@ -0,0 +1,135 @@
+import argparse
+from batch import generate_batch
+from generators import GENERATORS
+import json
+import os
+from solvers import SOLVERS
+import sys
+import time
+
+# Generate, solve and measure mazes in bulk from the command line, with no
+# window. Every maze gets the next seed from --seed on, so a run is
+# reproducible and can be split up by seed range:
+#
+#   python cli.py 1000 --size 200x100 --generator kruskal --seed 5000 \
+#       --solver astar --workers 8 --out mazes/ --metrics metrics.jsonl
+#
+# writes mazes/maze-5000.maze ... mazes/maze-5999.maze (the compact maze
+# file format, see mazefile.py; Maze.load() opens them) and one JSON object
+# per maze to metrics.jsonl: seed, size, generator and solver, path length,
+# nodes expanded, dead ends, walls removed and timings (see
+# batch._metrics). Without --out the mazes aren't kept, and without
+# --metrics the metrics go to stdout. Progress goes to stderr.
+
+
+# "200x100" (columns x rows) or "200" (square) -> (num_rows, num_cols):
+def parse_size(text):
+    cols, _, rows = text.lower().partition("x")
+    try:
+        num_cols = int(cols)
+        num_rows = int(rows) if rows else num_cols
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a size like 200x100, got {text!r}")
+    if num_cols < 1 or num_rows < 1:
+        raise argparse.ArgumentTypeError(f"size must be at least 1x1, got {text!r}")
+    return num_rows, num_cols
+
+
+def _positive(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"expected at least 1, got {text!r}")
+    return value
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Generate and solve mazes in bulk, writing per-maze metrics as JSON lines."
+    )
+    parser.add_argument("count", type=_positive, help="number of mazes to generate")
+    parser.add_argument(
+        "--size",
+        type=parse_size,
+        default=(12, 16),
+        help="COLSxROWS, or one number for a square (default: 16x12)",
+    )
+    parser.add_argument(
+        "--generator", choices=sorted(GENERATORS), default="backtracker", help="carving algorithm"
+    )
+    # Seed 0 would mean "no seed" to Maze, so seeds start at 1:
+    parser.add_argument(
+        "--seed",
+        type=_positive,
+        default=1,
+        help="seed of the first maze; the rest count up from it",
+    )
+    parser.add_argument(
+        "--solver", choices=sorted(SOLVERS), default="bfs", help="shortest-path solver"
+    )
+    parser.add_argument(
+        "--workers", type=_positive, default=None, help="worker processes (default: one per CPU)"
+    )
+    parser.add_argument("--out", metavar="DIR", help="save every maze as DIR/maze-SEED.maze")
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        default="-",
+        help="write metrics to PATH as JSON lines ('-' for stdout)",
+    )
+    parser.add_argument("--quiet", action="store_true", help="don't report progress")
+    return parser
+
+
+# Progress on stderr, overwriting one line, at most a few times a second:
+class Progress:
+    def __init__(self, total, stream=sys.stderr, interval=0.2):
+        self._total = total
+        self._stream = stream
+        self._interval = interval
+        self._started = time.perf_counter()
+        self._shown = 0.0
+        self.done = 0
+
+    def step(self):
+        self.done += 1
+        now = time.perf_counter()
+        if self.done == self._total or now - self._shown >= self._interval:
+            self._shown = now
+            elapsed = now - self._started
+            rate = self.done / elapsed if elapsed > 0 else 0.0
+            self._stream.write(
+                f"\r{self.done}/{self._total} mazes, {rate:,.1f}/s, {elapsed:.1f}s"
+            )
+            if self.done == self._total:
+                self._stream.write("\n")
+            self._stream.flush()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    num_rows, num_cols = args.size
+    specs = (
+        (num_rows, num_cols, seed) for seed in range(args.seed, args.seed + args.count)
+    )
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    progress = None if args.quiet else Progress(args.count)
+
+    out = sys.stdout if args.metrics == "-" else open(args.metrics, "w")
+    try:
+        for packed in generate_batch(
+            specs, args.workers, args.generator, solver=args.solver
+        ):
+            if args.out:
+                packed.save(os.path.join(args.out, f"maze-{packed.seed}.maze"))
+            out.write(json.dumps(packed.metrics) + "\n")
+            if progress is not None:
+                progress.step()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+from grid import Grid, LEFT, RIGHT, TOP, BOTTOM, VISITED
+from maze import Maze
+import mmap
+import os
+import struct
+
+# Record what a maze's algorithms do as a compact binary event log, and play
+# it back later in a window at any speed.
+#
+# Drawing while generating or solving slows the algorithms down to the speed
+# of the animation. Instead, build the maze headless with a recorder:
+#
+#   with EventRecorder("run.events") as recorder:
+#       maze = Maze.headless(100, 100, seed=1, recorder=recorder)
+#       maze.solve()
+#
+# and it runs at full speed, writing one event per step. A Player then
+# replays the log onto a Window, and can jump to any step.
+#
+# File layout: a header (b"MZEV", version, num_cols, num_rows), then one
+# 5-byte record per event. The first byte is the event kind in the high
+# nibble and a wall bit (LEFT/RIGHT/TOP/BOTTOM) in the low nibble; the rest
+# is the cell index as a uint32. The wall bit says which neighbor the event
+# involves, so two-cell events don't need a second index. Records are all
+# the same size, so event n is always at the same offset and seeking is free.
+
+MAGIC = b"MZEV"
+VERSION = 1
+HEADER = struct.Struct("<4sB3xII")
+RECORD = struct.Struct("<BI")
+
+# Event kinds:
+WALL_REMOVED = 1  # the wall between a cell and a neighbor was knocked down
+VISITED_CELL = 2  # a cell was visited by the solver
+MOVE = 3  # the solver moved from a cell to a neighbor
+UNDO = 4  # the solver backed out of a move, from a cell to a neighbor
+WALL_ADDED = 5  # a wall between two cells was put back (Maze.close_wall)
+
+_OPPOSITE = {LEFT: RIGHT, RIGHT: LEFT, TOP: BOTTOM, BOTTOM: TOP}
+
+# How many events to buffer in memory before writing them to the file:
+_FLUSH_EVERY = 1 << 16
+
+
+class EventLogError(ValueError):
+    pass
+
+
+# Writes events to a file. Hand one to Maze(recorder=...); the maze calls
+# begin() once it knows its size, and the event methods as it goes:
+class EventRecorder:
+    def __init__(self, path):
+        self._file = open(path, "wb")
+        self._buffer = bytearray()
+        self._num_cols = None
+        self.count = 0
+
+    def begin(self, num_cols, num_rows):
+        if self._num_cols is not None:
+            raise EventLogError("an EventRecorder can only record one maze")
+        self._num_cols = num_cols
+        self._file.write(HEADER.pack(MAGIC, VERSION, num_cols, num_rows))
+
+    # The wall bit on `index`'s side that leads to `next_index`:
+    def _direction(self, index, next_index):
+        step = next_index - index
+        if step == self._num_cols:
+            return BOTTOM
+        if step == -self._num_cols:
+            return TOP
+        if step == 1:
+            return RIGHT
+        if step == -1:
+            return LEFT
+        raise EventLogError(f"cells {index} and {next_index} aren't neighbors")
+
+    def _record(self, kind, index, wall):
+        self._buffer += RECORD.pack(kind << 4 | wall, index)
+        self.count += 1
+        if len(self._buffer) >= _FLUSH_EVERY * RECORD.size:
+            self.flush()
+
+    def wall_removed(self, index, next_index):
+        self._record(WALL_REMOVED, index, self._direction(index, next_index))
+
+    # A hole in the outer wall, like the entrance and exit: there's no
+    # neighbor on the other side, so the wall is given directly:
+    def outer_wall_removed(self, index, wall):
+        self._record(WALL_REMOVED, index, wall)
+
+    def wall_added(self, index, next_index):
+        self._record(WALL_ADDED, index, self._direction(index, next_index))
+
+    def visited(self, index):
+        self._record(VISITED_CELL, index, 0)
+
+    def move(self, index, next_index):
+        self._record(MOVE, index, self._direction(index, next_index))
+
+    def undo(self, index, next_index):
+        self._record(UNDO, index, self._direction(index, next_index))
+
+    def flush(self):
+        self._file.write(self._buffer)
+        self._buffer.clear()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Open an event log. Returns (num_cols, num_rows, buf, count), where buf is
+# the memory-mapped file and count the number of events in it:
+def open_log(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise EventLogError("file is too short to be an event log")
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, num_cols, num_rows = HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        buf.close()
+        raise EventLogError("not an event log")
+    if version != VERSION:
+        buf.close()
+        raise EventLogError(f"unsupported event log version {version}")
+    count = (len(buf) - HEADER.size) // RECORD.size
+    return num_cols, num_rows, buf, count
+
+
+# Decode every event in a log as (kind, index, next_index, wall) tuples.
+# next_index is None for VISITED_CELL events and for holes in the outer wall:
+def read_events(path):
+    num_cols, num_rows, buf, count = open_log(path)
+    try:
+        for n in range(count):
+            yield _decode(buf, n, num_cols, num_rows)
+    finally:
+        buf.close()
+
+
+def _decode(buf, n, num_cols, num_rows):
+    byte, index = RECORD.unpack_from(buf, HEADER.size + n * RECORD.size)
+    kind = byte >> 4
+    wall = byte & 0x0F
+    j, i = divmod(index, num_cols)
+    next_index = None
+    if wall == LEFT and i > 0:
+        next_index = index - 1
+    elif wall == RIGHT and i < num_cols - 1:
+        next_index = index + 1
+    elif wall == TOP and j > 0:
+        next_index = index - num_cols
+    elif wall == BOTTOM and j < num_rows - 1:
+        next_index = index + num_cols
+    return kind, index, next_index, wall
+
+
+# Replays an event log. It rebuilds the maze from scratch (every wall up)
+# and applies the events one by one, drawing them on `win` if one is given:
+#
+#   player = Player("run.events", win, 50, 50, 20, 20)
+#   player.play(events_per_frame=10)   # or step(), seek(n), skip_to_end()
+#   win.run(player.steps())            # or play it without blocking the window
+class Player:
+    def __init__(self, path, win=None, x1=0, y1=0, cell_size_x=10, cell_size_y=10):
+        self._num_cols, self._num_rows, self._buf, self._count = open_log(path)
+        self._win = win
+        # The maze is built headless and only then given the window, so the
+        # starting grid is drawn in one go instead of animated cell by cell
+        # (which would sleep through a frame per cell before anything plays):
+        self._maze = Maze.from_grid(
+            Grid(self._num_cols, self._num_rows), x1, y1, cell_size_x, cell_size_y
+        )
+        self._position = 0
+        # Solver moves seen so far, (index, next_index) -> True if undone,
+        # so the path can be redrawn after a seek:
+        self._moves = {}
+        if win is not None:
+            self._maze._win = win
+            self._maze._cells.set_geometry(x1, y1, cell_size_x, cell_size_y, win)
+            self._refresh()
+
+    def __len__(self):
+        return self._count
+
+    # How many events have been applied:
+    @property
+    def position(self):
+        return self._position
+
+    @property
+    def maze(self):
+        return self._maze
+
+    def _apply(self, n, draw):
+        kind, index, next_index, wall = _decode(
+            self._buf, n, self._num_cols, self._num_rows
+        )
+        maze = self._maze
+        data = maze._cells.data
+        if kind in (WALL_REMOVED, WALL_ADDED):
+            if kind == WALL_REMOVED:
+                data[index] &= ~wall
+                if next_index is not None:
+                    data[next_index] &= ~_OPPOSITE[wall]
+            else:
+                data[index] |= wall
+                if next_index is not None:
+                    data[next_index] |= _OPPOSITE[wall]
+            maze._cells.changed(index, next_index)
+            if draw:
+                j, i = divmod(index, self._num_cols)
+                maze._draw_cell(i, j)
+                if next_index is not None:
+                    j, i = divmod(next_index, self._num_cols)
+                    maze._draw_cell(i, j)
+        elif kind == VISITED_CELL:
+            data[index] |= VISITED
+        elif kind in (MOVE, UNDO):
+            undo = kind == UNDO
+            self._moves[(index, next_index)] = undo
+            if draw:
+                maze._draw_move(index, next_index, undo)
+                maze._animate()
+        else:
+            raise EventLogError(f"unknown event kind {kind} at event {n}")
+
+    # Apply the next event. Returns False once there are no events left:
+    def step(self):
+        if self._position >= self._count:
+            return False
+        self._apply(self._position, self._win is not None)
+        self._position += 1
+        return True
+
+    # The rest of the log as a generator, one event per step, for
+    # Window.run() to play from the event loop:
+    def steps(self):
+        while self.step():
+            yield self._position
+
+    # Play the rest of the log. events_per_frame sets the speed: how many
+    # events the window shows per frame (see Window.steps_per_frame):
+    def play(self, events_per_frame=None):
+        if self._win is not None and events_per_frame is not None:
+            self._win.steps_per_frame = events_per_frame
+        while self.step():
+            pass
+        if self._win is not None:
+            self._win.redraw()
+
+    # Jump to just after event n (0 is the start, len(player) the end). Going
+    # backwards replays from the beginning, and takes the moves that haven't
+    # happened yet at n off the window; either way nothing is animated, and the
+    # window is redrawn once at the new position:
+    def seek(self, n):
+        n = max(0, min(n, self._count))
+        drawn = {}
+        if n < self._position:
+            self._maze._cells.data[:] = Grid(self._num_cols, self._num_rows).data
+            self._maze._cells.changed()
+            drawn = self._moves
+            self._moves = {}
+            self._position = 0
+        while self._position < n:
+            self._apply(self._position, False)
+            self._position += 1
+        if self._win is not None:
+            for index, next_index in drawn:
+                if (index, next_index) not in self._moves:
+                    self._maze._erase_move(index, next_index)
+            self._refresh()
+
+    def skip_to_end(self):
+        self.seek(self._count)
+
+    # Redraw every cell and every move, without animating:
+    def _refresh(self):
+        maze = self._maze
+        for col in maze._cells:
+            for cell in col:
+                cell.draw(cell._x1, cell._y1, cell._x2, cell._y2)
+        for (index, next_index), undo in self._moves.items():
+            maze._draw_move(index, next_index, undo)
+        self._win.redraw()
+
+    def close(self):
+        self._buf.close()
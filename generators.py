@@ -0,0 +1,486 @@
+from array import array
+from grid import LEFT, RIGHT, TOP, BOTTOM, VISITED
+
+# Maze generation algorithms. Every generator works on a Grid whose cells all
+# start with their walls up and carves it into a perfect maze (exactly one
+# path between any two cells). They all take the same arguments:
+#
+#   grid      the Grid to carve (see grid.py for the byte layout)
+#   rng       where random numbers come from: the random module or a
+#             random.Random instance, so a seed gives the same maze
+#   start     index of the cell to start from, for algorithms that care
+#   on_carve  optional callback, called as on_carve(index, next_index) every
+#             time the wall between two cells is knocked down
+#
+# Grids with a topology (hex, layered; see topology.py) are carved by the same
+# code, asking the topology for each cell's neighbors; binary_tree, sidewinder
+# and eller only make sense for square rows and columns, and refuse them.
+#
+# Only walls between two cells are ever removed, so the entrance and exit
+# that Maze._break_entrance_and_exit opens in the outer wall are left alone.
+# Generators may use the VISITED bit while they work, but they always leave
+# it cleared.
+
+
+# Knock down the wall between two neighboring cells. `wall` is the wall on
+# the first cell's side, `opposite_wall` the same wall seen from the second:
+def _carve(data, index, next_index, wall, opposite_wall, on_carve):
+    data[index] &= ~wall
+    data[next_index] &= ~opposite_wall
+    if on_carve is not None:
+        on_carve(index, next_index)
+
+
+# Every neighbor of a cell as (neighbor index, wall, opposite wall), checked
+# in the order left, right, up, down:
+def _neighbors(index, num_cols, num_rows):
+    j, i = divmod(index, num_cols)
+    neighbors = []
+    if i > 0:
+        neighbors.append((index - 1, LEFT, RIGHT))
+    if i < num_cols - 1:
+        neighbors.append((index + 1, RIGHT, LEFT))
+    if j > 0:
+        neighbors.append((index - num_cols, TOP, BOTTOM))
+    if j < num_rows - 1:
+        neighbors.append((index + num_cols, BOTTOM, TOP))
+    return neighbors
+
+
+# The neighbor function to carve a grid with: _neighbors() for square grids,
+# or the topology's, which is called the same way:
+def _neighbors_for(grid):
+    if grid.topology is None:
+        return _neighbors
+    return grid.topology.neighbors
+
+
+def _require_square(grid, name):
+    if grid.topology is not None:
+        raise ValueError(f"{name} only carves square grids, not {grid.topology.name}")
+
+
+# Recursive backtracker: a randomized depth-first search. This is the
+# algorithm Maze has always used; it makes long, winding corridors. The
+# "recursion" is an explicit stack, and random numbers are drawn in the same
+# order as the original recursive Maze._break_walls_r, so old seeds still
+# give the same mazes. Other topologies take the same steps, with the
+# neighbors coming from the topology:
+def backtracker(grid, rng, start=0, on_carve=None):
+    data = grid.data
+    num_cols = grid.num_cols
+    num_rows = grid.num_rows
+    randrange = rng.randrange
+
+    data[start] |= VISITED
+    stack = [start]
+    # With a topology this loop carves the whole maze, and the square loop
+    # below finds the stack already empty:
+    topology = grid.topology
+    while stack and topology is not None:
+        index = stack[-1]
+        next_index_list = [
+            neighbor
+            for neighbor in topology.neighbors(index)
+            if not data[neighbor[0]] & VISITED
+        ]
+        if len(next_index_list) == 0:
+            stack.pop()
+            continue
+        next_index, wall, opposite_wall = next_index_list[randrange(len(next_index_list))]
+        _carve(data, index, next_index, wall, opposite_wall, on_carve)
+        data[next_index] |= VISITED
+        stack.append(next_index)
+
+    while stack:
+        index = stack[-1]
+        j, i = divmod(index, num_cols)
+
+        next_index_list = []
+        if i > 0 and not data[index - 1] & VISITED:
+            next_index_list.append((index - 1, LEFT, RIGHT))
+        if i < num_cols - 1 and not data[index + 1] & VISITED:
+            next_index_list.append((index + 1, RIGHT, LEFT))
+        if j > 0 and not data[index - num_cols] & VISITED:
+            next_index_list.append((index - num_cols, TOP, BOTTOM))
+        if j < num_rows - 1 and not data[index + num_cols] & VISITED:
+            next_index_list.append((index + num_cols, BOTTOM, TOP))
+
+        # Dead end: back up one cell:
+        if len(next_index_list) == 0:
+            stack.pop()
+            continue
+
+        next_index, wall, opposite_wall = next_index_list[randrange(len(next_index_list))]
+        data[index] &= ~wall
+        data[next_index] &= ~opposite_wall
+        if on_carve is not None:
+            on_carve(index, next_index)
+        data[next_index] |= VISITED
+        stack.append(next_index)
+
+    grid.clear_visited()
+
+
+# Randomized Kruskal: shuffle every interior wall, then knock a wall down
+# whenever the cells on either side aren't connected yet. Connectivity is
+# tracked with a union-find over cell indexes. Walls are encoded as
+# index * 2 (the wall to the right of the cell) or index * 2 + 1 (the wall
+# below it), and kept in an array to keep memory down on big grids. With a
+# topology, a wall is index * 8 + the position of the neighbor in the cell's
+# neighbor list, counting only neighbors with a higher index:
+def kruskal(grid, rng, start=0, on_carve=None):
+    data = grid.data
+    num_cols = grid.num_cols
+    num_rows = grid.num_rows
+    num_cells = num_cols * num_rows
+    topology = grid.topology
+
+    edges = array("q")
+    if topology is None:
+        for index in range(num_cells):
+            j, i = divmod(index, num_cols)
+            if i < num_cols - 1:
+                edges.append(index * 2)
+            if j < num_rows - 1:
+                edges.append(index * 2 + 1)
+    else:
+        for index in range(num_cells):
+            for position, neighbor in enumerate(topology.neighbors(index)):
+                if neighbor[0] > index:
+                    edges.append(index * 8 + position)
+    rng.shuffle(edges)
+
+    parent = array("q", range(num_cells))
+
+    def find(index):
+        # Path halving keeps the trees shallow without recursion:
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    remaining = num_cells - 1
+    for edge in edges:
+        if remaining == 0:
+            break
+        if topology is not None:
+            index, position = divmod(edge, 8)
+            next_index, wall, opposite_wall = topology.neighbors(index)[position]
+        else:
+            index, down = divmod(edge, 2)
+            next_index = index + num_cols if down else index + 1
+        root = find(index)
+        next_root = find(next_index)
+        if root == next_root:
+            continue
+        parent[root] = next_root
+        remaining -= 1
+        if topology is not None:
+            _carve(data, index, next_index, wall, opposite_wall, on_carve)
+        elif down:
+            _carve(data, index, next_index, BOTTOM, TOP, on_carve)
+        else:
+            _carve(data, index, next_index, RIGHT, LEFT, on_carve)
+
+
+# Randomized Prim: grow the maze outward from the start cell. The frontier
+# is every cell next to the maze but not in it yet; each step picks a random
+# frontier cell and connects it to a random neighbor that's already in the
+# maze. Makes lots of short dead ends:
+def prim(grid, rng, start=0, on_carve=None):
+    data = grid.data
+    num_cols = grid.num_cols
+    num_rows = grid.num_rows
+    randrange = rng.randrange
+    neighbors = _neighbors_for(grid)
+
+    in_frontier = bytearray(num_cols * num_rows)
+    frontier = []
+
+    def add_frontier(index):
+        for next_index, _, _ in neighbors(index, num_cols, num_rows):
+            if not data[next_index] & VISITED and not in_frontier[next_index]:
+                in_frontier[next_index] = 1
+                frontier.append(next_index)
+
+    data[start] |= VISITED
+    add_frontier(start)
+    while frontier:
+        # Swap a random frontier cell to the end of the list and pop it:
+        k = randrange(len(frontier))
+        frontier[k], frontier[-1] = frontier[-1], frontier[k]
+        index = frontier.pop()
+
+        in_maze = [
+            neighbor
+            for neighbor in neighbors(index, num_cols, num_rows)
+            if data[neighbor[0]] & VISITED
+        ]
+        next_index, wall, opposite_wall = in_maze[randrange(len(in_maze))]
+        _carve(data, index, next_index, wall, opposite_wall, on_carve)
+        data[index] |= VISITED
+        add_frontier(index)
+
+    grid.clear_visited()
+
+
+# Wilson's algorithm: loop-erased random walks. Starting from a cell that
+# isn't in the maze, walk randomly until the walk hits the maze, remembering
+# only the last direction taken out of each cell (which erases loops for
+# free). Then retrace the walk and carve it into the maze. The result is a
+# uniformly random spanning tree, with no bias towards any kind of corridor:
+def wilson(grid, rng, start=0, on_carve=None):
+    data = grid.data
+    num_cols = grid.num_cols
+    num_rows = grid.num_rows
+    num_cells = num_cols * num_rows
+    randrange = rng.randrange
+    neighbors_of = _neighbors_for(grid)
+
+    # Index into the neighbor list of the step last taken out of each cell:
+    exit_step = bytearray(num_cells)
+
+    data[start] |= VISITED
+    for walk_start in range(num_cells):
+        if data[walk_start] & VISITED:
+            continue
+
+        # Random walk until we bump into the maze:
+        index = walk_start
+        while not data[index] & VISITED:
+            neighbors = neighbors_of(index, num_cols, num_rows)
+            step = randrange(len(neighbors))
+            exit_step[index] = step
+            index = neighbors[step][0]
+
+        # Retrace the loop-erased walk and add it to the maze:
+        index = walk_start
+        while not data[index] & VISITED:
+            next_index, wall, opposite_wall = neighbors_of(index, num_cols, num_rows)[
+                exit_step[index]
+            ]
+            _carve(data, index, next_index, wall, opposite_wall, on_carve)
+            data[index] |= VISITED
+            index = next_index
+
+    grid.clear_visited()
+
+
+# Binary tree: every cell knocks down either its top or its left wall, picked
+# at random (cells on the top row or left column only have one choice). The
+# fastest generator there is, with no extra memory, but the top row and left
+# column are always straight corridors:
+def binary_tree(grid, rng, start=0, on_carve=None):
+    _require_square(grid, "binary_tree")
+    data = grid.data
+    num_cols = grid.num_cols
+    randrange = rng.randrange
+
+    for index in range(1, len(data)):
+        j, i = divmod(index, num_cols)
+        if j == 0:
+            _carve(data, index, index - 1, LEFT, RIGHT, on_carve)
+        elif i == 0 or randrange(2):
+            _carve(data, index, index - num_cols, TOP, BOTTOM, on_carve)
+        else:
+            _carve(data, index, index - 1, LEFT, RIGHT, on_carve)
+
+
+# Sidewinder: works one row at a time. The top row is one long corridor. On
+# every other row, each cell either extends the current "run" of cells to the
+# right, or closes the run by opening the top wall of a random cell in it:
+def sidewinder(grid, rng, start=0, on_carve=None):
+    _require_square(grid, "sidewinder")
+    data = grid.data
+    num_cols = grid.num_cols
+    num_rows = grid.num_rows
+    randrange = rng.randrange
+
+    for i in range(num_cols - 1):
+        _carve(data, i, i + 1, RIGHT, LEFT, on_carve)
+
+    for j in range(1, num_rows):
+        row_start = j * num_cols
+        run_start = 0
+        for i in range(num_cols):
+            index = row_start + i
+            if i < num_cols - 1 and randrange(2):
+                _carve(data, index, index + 1, RIGHT, LEFT, on_carve)
+                continue
+            # Close the run:
+            up = row_start + run_start + randrange(i - run_start + 1)
+            _carve(data, up, up - num_cols, TOP, BOTTOM, on_carve)
+            run_start = i + 1
+
+
+# Eller's algorithm: also works one row at a time, and only ever needs to
+# remember the current row. Each cell in the row belongs to a set of cells
+# that are already connected. Neighbors in different sets are randomly
+# joined, then every set gets at least one opening down into the next row.
+# On the last row every remaining set is joined.
+#
+# This yields (row, right_walls, down_walls) for each row, where right_walls
+# and down_walls are bytearrays of 0/1 flags per column. Keeping the rows
+# separate from the grid means the same code can build rows for mazes that
+# never fit in memory (see stream.py):
+def eller_rows(num_cols, num_rows, rng):
+    randrange = rng.randrange
+
+    # sets[i] is the set label of column i, members[label] the columns in it:
+    sets = list(range(num_cols))
+    members = {i: [i] for i in range(num_cols)}
+    next_label = num_cols
+
+    for j in range(num_rows):
+        last_row = j == num_rows - 1
+        right_walls = bytearray(b"\x01") * num_cols
+        down_walls = bytearray(b"\x01") * num_cols
+
+        # Randomly join neighbors that aren't connected yet (all of them on the
+        # last row). Merging relabels the smaller set into the bigger one:
+        for i in range(num_cols - 1):
+            a = sets[i]
+            b = sets[i + 1]
+            if a == b or not (last_row or randrange(2)):
+                continue
+            right_walls[i] = 0
+            if len(members[a]) < len(members[b]):
+                a, b = b, a
+            for k in members[b]:
+                sets[k] = a
+            members[a].extend(members.pop(b))
+
+        if not last_row:
+            # Every set opens at least one cell down. Cells that don't open
+            # down start a brand new set on the next row:
+            new_members = {}
+            for label, columns in members.items():
+                opened = [i for i in columns if randrange(2)]
+                if not opened:
+                    opened = [columns[randrange(len(columns))]]
+                for i in opened:
+                    down_walls[i] = 0
+                new_members[label] = opened
+            for i in range(num_cols):
+                if down_walls[i]:
+                    sets[i] = next_label
+                    new_members[next_label] = [i]
+                    next_label += 1
+            members = new_members
+
+        yield j, right_walls, down_walls
+
+
+def eller(grid, rng, start=0, on_carve=None):
+    _require_square(grid, "eller")
+    data = grid.data
+    num_cols = grid.num_cols
+    for j, right_walls, down_walls in eller_rows(num_cols, grid.num_rows, rng):
+        row_start = j * num_cols
+        for i in range(num_cols):
+            index = row_start + i
+            if not right_walls[i]:
+                _carve(data, index, index + 1, RIGHT, LEFT, on_carve)
+            if not down_walls[i]:
+                _carve(data, index, index + num_cols, BOTTOM, TOP, on_carve)
+
+
+# Every generator by name. Maze(..., generator="kruskal") looks names up here:
+GENERATORS = {
+    "backtracker": backtracker,
+    "kruskal": kruskal,
+    "prim": prim,
+    "wilson": wilson,
+    "binary_tree": binary_tree,
+    "sidewinder": sidewinder,
+    "eller": eller,
+}
+
+
+# Braiding: a pass run after a generator, not a generator itself. A perfect
+# maze has exactly one path between any two cells; braiding knocks down a
+# wall at some of its dead ends, which adds loops and so more than one way
+# through. `fraction` is the share of dead ends to visit (1.0 removes them
+# all). Each one gets a wall knocked through to a random neighbor,
+# preferring neighbors that are dead ends too, since that fixes two at once.
+# Returns the number of walls removed.
+
+# How many walls each byte has open, with bytes.translate():
+_OPEN_WALLS = bytes(4 - bin(b & 15).count("1") for b in range(256))
+
+
+# True if exactly one of the cell's walls to another cell is open (holes in
+# the outer wall, like the entrance, don't count):
+def _is_dead_end(data, index, num_cols, num_rows, neighbors=_neighbors):
+    walls = data[index]
+    open_walls = 0
+    for _, wall, _ in neighbors(index, num_cols, num_rows):
+        if not walls & wall:
+            open_walls += 1
+    return open_walls == 1
+
+
+# Every dead end in the grid, in index order. Cells are counted in C with
+# translate(); only the cells along the edge, which might have a hole in the
+# outer wall, are checked one by one. Grids with a topology are checked one
+# cell at a time:
+def dead_ends(grid):
+    data = grid.data
+    num_cols = grid.num_cols
+    num_rows = grid.num_rows
+    num_cells = num_cols * num_rows
+    if grid.topology is not None:
+        neighbors = grid.topology.neighbors
+        return [
+            index
+            for index in range(num_cells)
+            if _is_dead_end(data, index, num_cols, num_rows, neighbors)
+        ]
+    counts = bytes(data).translate(_OPEN_WALLS)
+    ends = {index for index, count in enumerate(counts) if count == 1}
+    edge = set(range(num_cols))
+    edge.update(range(num_cells - num_cols, num_cells))
+    edge.update(range(0, num_cells, num_cols))
+    edge.update(range(num_cols - 1, num_cells, num_cols))
+    for index in edge:
+        if _is_dead_end(data, index, num_cols, num_rows):
+            ends.add(index)
+        else:
+            ends.discard(index)
+    return sorted(ends)
+
+
+def braid(grid, rng, fraction=1.0, on_carve=None):
+    if not 0 <= fraction <= 1:
+        raise ValueError(f"fraction must be between 0 and 1, got {fraction}")
+    data = grid.data
+    num_cols = grid.num_cols
+    num_rows = grid.num_rows
+    randrange = rng.randrange
+    neighbors = _neighbors_for(grid)
+
+    ends = dead_ends(grid)
+    rng.shuffle(ends)
+    removed = 0
+    for index in ends[:round(len(ends) * fraction)]:
+        # Knocking through from a neighbor may have fixed this one already:
+        if not _is_dead_end(data, index, num_cols, num_rows, neighbors):
+            continue
+        walls = data[index]
+        closed = [
+            neighbor
+            for neighbor in neighbors(index, num_cols, num_rows)
+            if walls & neighbor[1]
+        ]
+        if not closed:
+            continue
+        choices = [
+            neighbor
+            for neighbor in closed
+            if _is_dead_end(data, neighbor[0], num_cols, num_rows, neighbors)
+        ] or closed
+        next_index, wall, opposite_wall = choices[randrange(len(choices))]
+        _carve(data, index, next_index, wall, opposite_wall, on_carve)
+        removed += 1
+    return removed
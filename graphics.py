@@ -1,9 +1,18 @@
-from tkinter import Tk, BOTH, Canvas
+import time
 # See tkinter documentation for explanation of __init__ commands
+#
+# tkinter is imported when the first Window is made, not when this module is
+# imported, so the drawing helpers below (Line, LineBatch, StepRunner) work
+# on machines without Tk.
 
 class Window:
-    # The constructor should take a width and height:
-    def __init__(self, width, height):
+    # The constructor should take a width and height. fps is how many frames per
+    # second to show at most while animating, and steps_per_frame how many
+    # animation steps (calls to animate()) go into each frame. The defaults show
+    # one step every 0.05 seconds; raise steps_per_frame to animate big mazes
+    # quickly without drawing every single step:
+    def __init__(self, width, height, fps=20, steps_per_frame=1):
+        from tkinter import Tk, BOTH, Canvas
         # It should create a new root widget using Tk() and save it as a data member:
         self.__root = Tk()
         # Set the title property of the root widget:
@@ -12,8 +21,17 @@ class Window:
         self.__canvas = Canvas(self.__root, bg="white", height=height, width=width)
         # Pack the canvas widget so that it's ready to be drawn:
         self.__canvas.pack(fill=BOTH, expand=1)
+        # Lines are drawn through a LineBatch, which keeps one canvas item per line
+        # and only touches the canvas when a frame is flushed:
+        self.__lines = LineBatch(self.__canvas)
+        self.__frame_time = 1 / fps
+        self.__steps_per_frame = steps_per_frame
+        self.__steps = 0
+        self.__next_frame = time.perf_counter()
         # Create a data member to represent that the window is "running", and set it to False:
         self.__running = False
+        # The animation started by run(), if any:
+        self.__runner = None
         # You'll also need to add another line to the constructor to call the 
 	   # protocol method on the root widget, to connect your close method to 
 	   # the "delete window" action. This will stop your program from running 
@@ -23,28 +41,112 @@ class Window:
     # The redraw() method on the window class should simply call the root 
     # widget's update_idletasks() and update() methods. Each time this is 
     # called, the window will redraw itself:
+    # Any lines drawn since the last frame are pushed to the canvas first:
     def redraw(self):
+        self.__lines.flush()
         self.__root.update_idletasks()
         self.__root.update()
 
     # This method should set the data member we created to track the "running"
-    # state of the window to True. Next, it should call self.redraw() over 
-    # and over as long as the running state remains True
+    # state of the window to True. Then it hands over to Tk's event loop, which
+    # redraws the window whenever it needs it and sleeps the rest of the time,
+    # until close() stops it:
     def wait_for_close(self):
         self.__running = True
-        while self.__running:
-            self.redraw()
+        self.redraw()
+        self.__root.mainloop()
         print("window closed...")
 
+    # Play an animation from Tk's event loop instead of blocking it. steps is
+    # any iterator (a generator, or events.Player.steps()); every frame takes
+    # steps_per_frame steps from it and shows the result, and in between the
+    # window keeps handling input. Space pauses and resumes, + and - double
+    # and halve the speed. Returns once the window is closed:
+    #
+    #   player = Player("run.events", win, 50, 50, 20, 20)
+    #   win.run(player.steps())
+    def run(self, steps):
+        self.__runner = StepRunner(
+            self.__root,
+            steps,
+            self.__frame_time,
+            self.__steps_per_frame,
+            on_frame=self.__lines.flush,
+            on_done=lambda: self.__root.title("Maze Solver (done)"),
+        )
+        self.__root.bind("<space>", lambda event: self.toggle_pause())
+        for key in ("<plus>", "<equal>", "<KP_Add>"):
+            self.__root.bind(key, lambda event: self.__change_speed(self.__runner.faster))
+        for key in ("<minus>", "<KP_Subtract>"):
+            self.__root.bind(key, lambda event: self.__change_speed(self.__runner.slower))
+        self.__runner.start()
+        self.wait_for_close()
+
+    # Pause or resume the animation started by run():
+    def toggle_pause(self):
+        if self.__runner is None or self.__runner.done:
+            return
+        self.__runner.toggle_pause()
+        self.__root.title("Maze Solver (paused)" if self.__runner.paused else "Maze Solver")
+
+    def __change_speed(self, change):
+        change()
+        self.__steps_per_frame = self.__runner.steps_per_frame
+
+    # Called once per step of an animated algorithm. Every steps_per_frame steps
+    # it redraws the window, then waits until it's time for the next frame, so
+    # the animation runs at a steady frame rate however fast the algorithm is.
+    # Under run() the StepRunner paces the frames instead, so this does nothing:
+    def animate(self):
+        if self.__runner is not None:
+            return
+        self.__steps += 1
+        if self.__steps % self.__steps_per_frame:
+            return
+        self.redraw()
+        self.__next_frame += self.__frame_time
+        delay = self.__next_frame - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Running behind: don't try to catch up by skipping the waits.
+            self.__next_frame = time.perf_counter()
+
+    # Animation speed, as steps per frame. Can be changed while animating:
+    @property
+    def steps_per_frame(self):
+        return self.__steps_per_frame
+
+    @steps_per_frame.setter
+    def steps_per_frame(self, steps_per_frame):
+        self.__steps_per_frame = max(1, int(steps_per_frame))
+        if self.__runner is not None:
+            self.__runner.steps_per_frame = self.__steps_per_frame
+
     # We need a draw_line method on our Window class. It should take an 
-    # instance of a Line and a fill_color as inputs, then call the Line's 
-    # draw() method.
+    # instance of a Line and a fill_color as inputs. Drawing the same line 
+    # again (say, a wall that gets knocked down) recolors it instead of piling 
+    # another line on top, and nothing reaches the canvas until the next redraw:
     def draw_line(self, line, fill_color="black"):
-        line.draw(self.__canvas, fill_color)
+        self.__lines.draw_line(line, fill_color)
+
+    # Remove a line drawn with draw_line() from the canvas, at the next redraw:
+    def erase_line(self, line):
+        self.__lines.erase_line(line)
+
+    # How many line items the canvas holds. This stays bounded by the number of
+    # distinct lines, however many times they're redrawn:
+    @property
+    def item_count(self):
+        return self.__lines.item_count
 
-    # the close() method should simply set the running state to False:
+    # the close() method should set the running state to False, stop any
+    # animation, and end the event loop:
     def close(self):
         self.__running = False
+        if self.__runner is not None:
+            self.__runner.cancel()
+        self.__root.quit()
 
 
 class Point:
@@ -65,9 +167,173 @@ class Line:
 
     # The Line class needs a draw() method that takes a Canvas and a "fill 
     # color" as input. The fill_color will just be a string like "black" or "red":
+    # It returns the id of the new canvas item:
     def draw(self, canvas, fill_color="black"):
         # Next it should call the Canvas's create_line method:
-        canvas.create_line(
+        return canvas.create_line(
             self.p1.x, self.p1.y, self.p2.x, self.p2.y, fill=fill_color, width=2
         )
 
+    # Two lines with the same end points (in either order) are the same line,
+    # so a wall shared by two cells gets one key. Coordinates are rounded so 
+    # tiny floating point differences don't split a line in two:
+    def key(self):
+        a = (round(self.p1.x, 2), round(self.p1.y, 2))
+        b = (round(self.p2.x, 2), round(self.p2.y, 2))
+        return (a, b) if a <= b else (b, a)
+
+
+# Keeps one canvas item per distinct line instead of creating a new item every
+# time a line is drawn. Drawing only records the line's latest color in a "dirty"
+# set; flush() then creates the new items and recolors the changed ones in one
+# batch. Lines redrawn several times between flushes cost a single update, and
+# lines redrawn in the color they already have cost nothing. Erased lines are
+# recorded the same way, with no color, and deleted from the canvas by flush():
+class LineBatch:
+    def __init__(self, canvas):
+        self.__canvas = canvas
+        # key -> (canvas item id, current color):
+        self.__items = {}
+        # key -> (line, color) waiting for the next flush:
+        self.__dirty = {}
+
+    def draw_line(self, line, fill_color="black"):
+        self.__dirty[line.key()] = (line, fill_color)
+
+    def erase_line(self, line):
+        self.__dirty[line.key()] = (line, None)
+
+    def flush(self):
+        for key, (line, fill_color) in self.__dirty.items():
+            item = self.__items.get(key)
+            if fill_color is None:
+                if item is not None:
+                    self.__canvas.delete(item[0])
+                    del self.__items[key]
+            elif item is None:
+                self.__items[key] = (line.draw(self.__canvas, fill_color), fill_color)
+            elif item[1] != fill_color:
+                self.__canvas.itemconfigure(item[0], fill=fill_color)
+                self.__items[key] = (item[0], fill_color)
+        self.__dirty.clear()
+
+    @property
+    def item_count(self):
+        return len(self.__items)
+
+
+# Steps through an iterator from a Tk event loop, steps_per_frame steps per
+# frame, using root.after() to come back for the next frame. Between frames
+# the event loop is free to handle input and redraw; once the steps run out
+# nothing more is scheduled, so a finished animation costs no CPU at all.
+# root is anything with Tk's after() and after_cancel(). on_frame is called
+# after every frame's steps, and on_done once the iterator is used up:
+class StepRunner:
+    def __init__(
+        self,
+        root,
+        steps,
+        frame_time=0.05,
+        steps_per_frame=1,
+        on_frame=None,
+        on_done=None,
+    ):
+        self.__root = root
+        self.__steps = iter(steps)
+        self.__frame_ms = max(1, round(frame_time * 1000))
+        # faster() and slower() change the wait between frames, but never make
+        # it shorter than this:
+        self.__min_frame_ms = self.__frame_ms
+        self.steps_per_frame = steps_per_frame
+        self.__on_frame = on_frame
+        self.__on_done = on_done
+        # The id of the next scheduled frame, if one is:
+        self.__pending = None
+        self.__paused = False
+        self.__done = False
+        # Steps taken so far:
+        self.count = 0
+
+    @property
+    def steps_per_frame(self):
+        return self.__steps_per_frame
+
+    @steps_per_frame.setter
+    def steps_per_frame(self, steps_per_frame):
+        self.__steps_per_frame = max(1, int(steps_per_frame))
+
+    # Seconds between frames:
+    @property
+    def frame_time(self):
+        return self.__frame_ms / 1000
+
+    # Twice as fast. If slower() stretched the frames, they're shortened again
+    # first; after that every frame takes twice as many steps:
+    def faster(self):
+        if self.__frame_ms > self.__min_frame_ms:
+            self.__frame_ms = max(self.__min_frame_ms, self.__frame_ms // 2)
+        else:
+            self.steps_per_frame = self.__steps_per_frame * 2
+
+    # Twice as slow: half as many steps per frame, and once that's down to one
+    # step, twice as long between frames (up to 32 times the starting wait):
+    def slower(self):
+        if self.__steps_per_frame > 1:
+            self.steps_per_frame = self.__steps_per_frame // 2
+        else:
+            self.__frame_ms = min(self.__min_frame_ms * 32, self.__frame_ms * 2)
+
+    @property
+    def paused(self):
+        return self.__paused
+
+    @property
+    def done(self):
+        return self.__done
+
+    def start(self):
+        self.__schedule()
+
+    def pause(self):
+        self.__paused = True
+        self.cancel()
+
+    def resume(self):
+        if self.__paused:
+            self.__paused = False
+            self.__schedule()
+
+    def toggle_pause(self):
+        if self.__paused:
+            self.resume()
+        else:
+            self.pause()
+
+    # Stop coming back for frames. pause() uses this too; resume() picks up
+    # where it left off:
+    def cancel(self):
+        if self.__pending is not None:
+            self.__root.after_cancel(self.__pending)
+            self.__pending = None
+
+    def __schedule(self):
+        if self.__pending is None and not self.__done and not self.__paused:
+            self.__pending = self.__root.after(self.__frame_ms, self._frame)
+
+    # One frame: take the steps, show them, and come back for the next:
+    def _frame(self):
+        self.__pending = None
+        for _ in range(self.__steps_per_frame):
+            try:
+                next(self.__steps)
+            except StopIteration:
+                self.__done = True
+                break
+            self.count += 1
+        if self.__on_frame is not None:
+            self.__on_frame()
+        if self.__done:
+            if self.__on_done is not None:
+                self.__on_done()
+        else:
+            self.__schedule()
@@ -0,0 +1,210 @@
+from cell import Cell
+
+# A Grid stores the whole maze in a single bytearray with one byte per cell,
+# instead of one Cell object per cell. Each byte is a bitmask of the cell's
+# four walls plus its visited flag:
+LEFT = 1
+RIGHT = 2
+TOP = 4
+BOTTOM = 8
+VISITED = 16
+# Two more walls, for the topologies in topology.py whose cells have more
+# than four neighbors (the stairs of a layered maze, the last two sides of a
+# hex cell). VISITED keeps its bit whatever the topology:
+UP = 32
+DOWN = 64
+
+# A brand new cell has all four walls and hasn't been visited:
+WALLS = LEFT | RIGHT | TOP | BOTTOM
+
+# Translation table that clears the VISITED bit of every byte in one pass.
+# bytearray.translate() runs in C, so resetting a multi-megacell grid is
+# a single memcpy-speed call instead of a Python loop:
+_CLEAR_VISITED = bytes(b & ~VISITED for b in range(256))
+
+
+class Grid:
+    # How the cells connect, for grids that aren't plain squares (see
+    # topology.py). None means the square layout described below, which the
+    # generators and solvers handle with their own fast code:
+    topology = None
+    # Called as on_change(index, next_index) whenever changed() is told which
+    # wall changed. Maze uses it to keep its incremental solvers up to date:
+    on_change = None
+
+    # Cells are stored row by row, so the cell in column i and row j lives at
+    # index j * num_cols + i. The left/right neighbors are at index -1/+1 and
+    # the top/bottom neighbors at index -num_cols/+num_cols:
+    def __init__(self, num_cols, num_rows, topology=None):
+        self.num_cols = num_cols
+        self.num_rows = num_rows
+        walls = WALLS
+        if topology is not None:
+            self.topology = topology
+            walls = topology.walls
+        self.data = bytearray([walls]) * (num_cols * num_rows)
+        # Bumped every time walls change after the maze is carved, so things
+        # worked out from the walls (like a PathIndex) can tell they're out of
+        # date. Code that writes walls into `data` directly should call
+        # changed() when it's done, or changed(index, next_index) for the
+        # wall between two cells, so on_change hears about it too:
+        self.version = 0
+        # Drawing geometry. These are only needed by the Cell views below,
+        # and are filled in by set_geometry():
+        self._x1 = 0
+        self._y1 = 0
+        self._cell_size_x = 0
+        self._cell_size_y = 0
+        self._win = None
+
+    # Remember where the grid is drawn on the canvas, so the Cell views can
+    # work out their own corner coordinates:
+    def set_geometry(self, x1, y1, cell_size_x, cell_size_y, win=None):
+        self._x1 = x1
+        self._y1 = y1
+        self._cell_size_x = cell_size_x
+        self._cell_size_y = cell_size_y
+        self._win = win
+
+    def index(self, i, j):
+        return j * self.num_cols + i
+
+    def changed(self, index=None, next_index=None):
+        self.version += 1
+        if next_index is not None and self.on_change is not None:
+            self.on_change(index, next_index)
+
+    # The index of the cell on the other side of one of a cell's walls, or
+    # None if the wall is on the outside of the grid:
+    def neighbor(self, index, wall):
+        if self.topology is not None:
+            for next_index, next_wall, _ in self.topology.neighbors(index):
+                if next_wall == wall:
+                    return next_index
+            return None
+        j, i = divmod(index, self.num_cols)
+        if wall == LEFT and i > 0:
+            return index - 1
+        if wall == RIGHT and i < self.num_cols - 1:
+            return index + 1
+        if wall == TOP and j > 0:
+            return index - self.num_cols
+        if wall == BOTTOM and j < self.num_rows - 1:
+            return index + self.num_cols
+        return None
+
+    def clear_visited(self):
+        self.data[:] = self.data.translate(_CLEAR_VISITED)
+
+    # The cells of row j, one byte each:
+    def row(self, j):
+        start = j * self.num_cols
+        return bytes(self.data[start:start + self.num_cols])
+
+    # One byte per cell, row by row, for code that wants all the walls at once
+    # (the VISITED bit may be set too; mask with WALLS if it matters):
+    def tobytes(self):
+        return bytes(self.data)
+
+    # The Grid behaves like the old list of columns of Cell objects, so
+    # grid[i][j] still gives you something that looks like a Cell:
+    def __len__(self):
+        return self.num_cols
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.num_cols
+        if not 0 <= i < self.num_cols:
+            raise IndexError("grid column index out of range")
+        return GridColumn(self, i)
+
+    def __iter__(self):
+        for i in range(self.num_cols):
+            yield GridColumn(self, i)
+
+
+# One column of a Grid. Indexing it gives a GridCell view of that cell:
+class GridColumn:
+    def __init__(self, grid, i):
+        self._grid = grid
+        self._i = i
+
+    def __len__(self):
+        return self._grid.num_rows
+
+    def __getitem__(self, j):
+        if j < 0:
+            j += self._grid.num_rows
+        if not 0 <= j < self._grid.num_rows:
+            raise IndexError("grid row index out of range")
+        return GridCell(self._grid, self._i, j)
+
+    def __iter__(self):
+        for j in range(self._grid.num_rows):
+            yield GridCell(self._grid, self._i, j)
+
+
+# A lightweight view of one cell in a Grid. It reads and writes the cell's
+# bits in the grid's bytearray, so it can be handed to anything that expects
+# a Cell (including Cell.draw and Cell.draw_move). Views are created on the
+# fly and thrown away, so the coordinates are worked out from the grid's
+# geometry rather than stored:
+class GridCell(Cell):
+    def __init__(self, grid, i, j):
+        # Cell.__init__ isn't called on purpose: all of the cell's state
+        # lives in the grid.
+        self._grid = grid
+        self._i = i
+        self._j = j
+        self._index = j * grid.num_cols + i
+
+    def _get_bit(self, bit):
+        return bool(self._grid.data[self._index] & bit)
+
+    def _set_bit(self, bit, value):
+        if value:
+            self._grid.data[self._index] |= bit
+        else:
+            self._grid.data[self._index] &= ~bit
+        if bit != VISITED:
+            self._grid.changed(self._index, self._grid.neighbor(self._index, bit))
+
+    has_left_wall = property(
+        lambda self: self._get_bit(LEFT),
+        lambda self, value: self._set_bit(LEFT, value),
+    )
+    has_right_wall = property(
+        lambda self: self._get_bit(RIGHT),
+        lambda self, value: self._set_bit(RIGHT, value),
+    )
+    has_top_wall = property(
+        lambda self: self._get_bit(TOP),
+        lambda self, value: self._set_bit(TOP, value),
+    )
+    has_bottom_wall = property(
+        lambda self: self._get_bit(BOTTOM),
+        lambda self, value: self._set_bit(BOTTOM, value),
+    )
+    visited = property(
+        lambda self: self._get_bit(VISITED),
+        lambda self, value: self._set_bit(VISITED, value),
+    )
+
+    # Cell.draw() assigns _x1/_x2/_y1/_y2. Those are always derived from
+    # the grid, so the assignments are accepted and ignored:
+    def _ignore(self, value):
+        pass
+
+    _x1 = property(
+        lambda self: self._grid._x1 + self._i * self._grid._cell_size_x, _ignore
+    )
+    _x2 = property(
+        lambda self: self._grid._x1 + (self._i + 1) * self._grid._cell_size_x, _ignore
+    )
+    _y1 = property(
+        lambda self: self._grid._y1 + self._j * self._grid._cell_size_y, _ignore
+    )
+    _y2 = property(
+        lambda self: self._grid._y1 + (self._j + 1) * self._grid._cell_size_y, _ignore
+    )
+    _win = property(lambda self: self._grid._win, _ignore)
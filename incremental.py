@@ -0,0 +1,163 @@
+from array import array
+from grid import LEFT, RIGHT, TOP, BOTTOM
+from solvers import _distances_to, _open_neighbors, SolveResult
+import heapq
+import time
+
+# A shortest-path solver that keeps up with a maze whose walls change, using
+# Lifelong Planning A* (LPA*). It starts out knowing every cell's distance
+# from the start, from one breadth-first search. After that, when walls come
+# down or go up (Maze.open_wall/close_wall), only the cells whose distance
+# from the start actually changed get looked at again, instead of searching
+# the whole maze from scratch.
+#
+#   solver = maze.incremental_solver()
+#   solver.solve().path
+#   maze.close_wall((3, 4), (3, 5))
+#   solver.solve().path     # repaired, usually touching just a few cells
+#
+# Every cell keeps two estimates of its distance from the start: g, the
+# distance it was last settled at, and rhs, one more than the best g among
+# its open neighbors. Where they disagree the cell is "inconsistent" and goes
+# on a priority queue, ordered like A* by distance + Manhattan distance to
+# the goal. A wall change only makes the two cells on either side
+# inconsistent; the search fixes those up and spreads out only as far as the
+# change matters.
+#
+# A change near the start can still change the distance of most of the maze
+# (closing the only way out of the first corridor, say), and LPA* settles
+# cells several times slower than a breadth-first search visits them. So if a
+# repair has settled more than an eighth of the cells, it gives up and
+# starts over from a fresh breadth-first search, which bounds the worst case.
+
+_INFINITY = 1 << 62
+
+
+class LPAStar:
+    def __init__(self, grid, start, goal):
+        self._grid = grid
+        self._start = start
+        self._goal = goal
+        self._max_repair = max(1, grid.num_cols * grid.num_rows // 8)
+        # Cells settled since the last solve():
+        self._nodes_expanded = 0
+        self._reset()
+
+    # LPA* can start from any state where every cell is consistent. Exact
+    # distances are one, and a plain BFS finds them much faster than LPA*
+    # would from scratch:
+    def _reset(self):
+        distance, reached = _distances_to(self._grid, self._start)
+        self._g = array("q", (d if d >= 0 else _INFINITY for d in distance))
+        self._rhs = array("q", self._g)
+        self._heap = []
+        self._nodes_expanded += reached
+
+    # Work out a cell's rhs again from its neighbors, and queue it if that
+    # makes it inconsistent. The queue is ordered by (distance + Manhattan
+    # distance to the goal, distance), where the distance is the better of g
+    # and rhs. Old queue entries are left behind and skipped
+    # when they come up, instead of being removed. This is the inner loop of
+    # the search, so the neighbor checks are written out here:
+    def _update(self, index):
+        grid = self._grid
+        data = grid.data
+        num_cols = grid.num_cols
+        g = self._g
+        rhs = self._rhs
+        i = index % num_cols
+        if index != self._start:
+            walls = data[index]
+            best = _INFINITY
+            if i > 0 and not walls & LEFT and g[index - 1] < best:
+                best = g[index - 1]
+            if i < num_cols - 1 and not walls & RIGHT and g[index + 1] < best:
+                best = g[index + 1]
+            if index >= num_cols and not walls & TOP and g[index - num_cols] < best:
+                best = g[index - num_cols]
+            if index + num_cols < len(data) and not walls & BOTTOM and g[index + num_cols] < best:
+                best = g[index + num_cols]
+            rhs[index] = best + 1 if best < _INFINITY else _INFINITY
+        if g[index] != rhs[index]:
+            best = min(g[index], rhs[index])
+            goal = self._goal
+            h = abs(i - goal % num_cols) + abs(index // num_cols - goal // num_cols)
+            heapq.heappush(self._heap, (best + h, best, index))
+
+    # The wall between two neighboring cells went up or came down. Nothing
+    # is searched until the next solve():
+    def wall_changed(self, index, next_index):
+        self._update(index)
+        self._update(next_index)
+
+    # Settle inconsistent cells, best first, until the goal's distance can't
+    # change any more:
+    def _compute(self):
+        grid = self._grid
+        data = grid.data
+        num_cols = grid.num_cols
+        num_rows = grid.num_rows
+        g = self._g
+        rhs = self._rhs
+        heap = self._heap
+        heappop = heapq.heappop
+        update = self._update
+        goal = self._goal
+        repaired = 0
+        while heap:
+            k1, k2, index = heap[0]
+            # The heuristic part of a cell's key never changes, so the entry is
+            # up to date if its distance part is:
+            if g[index] == rhs[index] or k2 != min(g[index], rhs[index]):
+                # Out of date: the cell was settled or re-queued since.
+                heappop(heap)
+                continue
+            # (The goal's key is just its distance, with nothing left to go.)
+            goal_best = min(g[goal], rhs[goal])
+            if (k1, k2) >= (goal_best, goal_best) and rhs[goal] == g[goal]:
+                break
+            heappop(heap)
+            self._nodes_expanded += 1
+            repaired += 1
+            if repaired > self._max_repair:
+                self._reset()
+                return
+            if g[index] > rhs[index]:
+                # Got closer: settle it, and let the neighbors know.
+                g[index] = rhs[index]
+            else:
+                # Got further away (a wall went up): forget its distance, and
+                # work it out again along with the neighbors.
+                g[index] = _INFINITY
+                update(index)
+            for next_index in _open_neighbors(data, index, num_cols, num_rows):
+                update(next_index)
+
+    # The current shortest path from start to goal, repairing it first if
+    # any walls changed. nodes_expanded and elapsed cover just this repair:
+    def solve(self):
+        started = time.perf_counter()
+        self._compute()
+        grid = self._grid
+        num_cols = grid.num_cols
+        g = self._g
+        path = []
+        if g[self._goal] < _INFINITY:
+            # Walk back downhill in g from the goal:
+            index = self._goal
+            path.append(index)
+            while index != self._start:
+                index = min(
+                    _open_neighbors(grid.data, index, num_cols, grid.num_rows),
+                    key=g.__getitem__,
+                )
+                path.append(index)
+            path.reverse()
+        nodes_expanded = self._nodes_expanded
+        self._nodes_expanded = 0
+        return SolveResult(
+            "lpastar",
+            [(index % num_cols, index // num_cols) for index in path],
+            nodes_expanded,
+            time.perf_counter() - started,
+        )
@@ -0,0 +1,101 @@
+from contextlib import contextmanager, nullcontext
+from grid import LEFT, RIGHT, TOP, BOTTOM
+import time
+
+# Opt-in instrumentation for Maze. Hand a MazeStats to a maze and it counts
+# what its algorithms do and times each phase of its life:
+#
+#   stats = MazeStats(on_phase=lambda name, seconds, stats: print(name, seconds))
+#   maze = Maze.headless(1000, 1000, seed=1, stats=stats)
+#   maze.solve()
+#   stats.as_dict()   # counters and timings, ready for json.dumps
+#
+# The phases are "create" (allocating the grid and drawing it), "carve"
+# (running the generator), "reset" (clearing the visited flags), "solve"
+# (solve()) and "find_path" (find_path()). Timings add up if a phase runs
+# more than once.
+#
+# Mazes without a MazeStats don't pay for any of this: the counters live in
+# locals or are worked out once a phase is over, and are only written out
+# when there's somewhere to write them.
+
+# Shared "do nothing" phase for mazes that aren't being measured:
+NO_PHASE = nullcontext()
+
+# Translation tables that map each cell byte to 1 if that wall is open, so
+# bytes.count() can count open walls across a whole grid in C:
+_OPEN_RIGHT = bytes(0 if b & RIGHT else 1 for b in range(256))
+_OPEN_BOTTOM = bytes(0 if b & BOTTOM else 1 for b in range(256))
+
+
+class MazeStats:
+    def __init__(self, on_phase=None):
+        # Walls knocked down while carving, including the entrance and exit:
+        self.walls_removed = 0
+        # Cells solve() visited, moves it backed out of, and the deepest its
+        # stack got:
+        self.cells_visited = 0
+        self.backtracks = 0
+        self.max_stack_depth = 0
+        # Cells expanded by the find_path() solvers (see SolveResult):
+        self.nodes_expanded = 0
+        # Cells and moves drawn on the window:
+        self.draw_calls = 0
+        # Seconds spent in each phase:
+        self.timings = {}
+        # Called as on_phase(name, seconds, stats) every time a phase ends:
+        self.on_phase = on_phase
+
+    # Time a phase: `with stats.phase("carve"): ...`
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            if self.on_phase is not None:
+                self.on_phase(name, elapsed, self)
+
+    def as_dict(self):
+        return {
+            "walls_removed": self.walls_removed,
+            "cells_visited": self.cells_visited,
+            "backtracks": self.backtracks,
+            "max_stack_depth": self.max_stack_depth,
+            "nodes_expanded": self.nodes_expanded,
+            "draw_calls": self.draw_calls,
+            "timings": dict(self.timings),
+        }
+
+    def __repr__(self):
+        return f"MazeStats({self.as_dict()})"
+
+
+# Number of open walls in a grid, counting a passage between two cells once
+# and every hole in the outer wall once. Only the right and bottom wall of
+# each cell are looked at; the left and top walls are the same walls seen
+# from the other side, apart from the outer walls along the first row and
+# the first column. Grids with a topology are counted cell by cell, each
+# passage from the cell with the lower index:
+def open_walls(grid):
+    data = bytes(grid.data)
+    num_cols = grid.num_cols
+    topology = grid.topology
+    if topology is not None:
+        count = 0
+        for index, walls in enumerate(data):
+            opened = topology.walls & ~walls
+            for next_index, wall, _ in topology.neighbors(index):
+                if opened & wall:
+                    opened &= ~wall
+                    count += next_index > index
+            # Whatever's still open leads out of the grid:
+            count += bin(opened).count("1")
+        return count
+    count = data.translate(_OPEN_RIGHT).count(1)
+    count += data.translate(_OPEN_BOTTOM).count(1)
+    count += sum(1 for b in data[:num_cols] if not b & TOP)
+    count += sum(1 for b in data[::num_cols] if not b & LEFT)
+    return count
@@ -1,6 +1,8 @@
+from events import EventRecorder, Player
 from graphics import Window
 from maze import Maze
-import sys
+import os
+import tempfile
 
 
 def main():
@@ -12,18 +14,25 @@ def main():
     cell_size_x = (screen_x - 2 * margin) / num_cols
     cell_size_y = (screen_y - 2 * margin) / num_rows
 
-    sys.setrecursionlimit(10000)
     win = Window(screen_x, screen_y)
 
-    maze = Maze(margin, margin, num_rows, num_cols, cell_size_x, cell_size_y, win)
-    # maze = Maze(margin, margin, num_rows, num_cols, cell_size_x, cell_size_y, win, 10)
-    print("maze created")
-    is_solvable = maze.solve()
-    if not is_solvable:
-        print("maze can not be solved!")
-    else:
-        print("maze solved!")
-    win.wait_for_close()
+    # Carve and solve the maze at full speed, recording every step, then play
+    # the recording in the window. Space pauses, + and - change the speed:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "run.events")
+        with EventRecorder(path) as recorder:
+            maze = Maze.headless(num_rows, num_cols, recorder=recorder)
+            # maze = Maze.headless(num_rows, num_cols, seed=10, recorder=recorder)
+            print("maze created")
+            is_solvable = maze.solve()
+        if not is_solvable:
+            print("maze can not be solved!")
+        else:
+            print("maze solved!")
+        player = Player(path, win, margin, margin, cell_size_x, cell_size_y)
+        win.run(player.steps())
+        player.close()
 
 
-main()
+if __name__ == "__main__":
+    main()
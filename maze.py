@@ -1,9 +1,42 @@
-from cell import Cell
+import analysis
+from incremental import LPAStar
+import instrument
+from generators import braid, GENERATORS
+from grid import Grid, LEFT, RIGHT, TOP, BOTTOM, VISITED
+import mazefile
+from pathindex import PathIndex
+import raster
+from solvers import k_shortest_paths, SOLVERS, SolveResult
+from tiled import DEFAULT_BLOCK_SIZE, generate_tiled
+from topology import check_shape, make_grid
 import random
-import time
+import weakref
 
 # create a class that holds all the cells in the maze in a 2-dimensional 
-# grid, a list of lists:
+# grid. The cells live in a packed Grid (one byte per cell), which can still
+# be indexed like a list of lists: self._cells[i][j] is a Cell-like view.
+#
+# Headless mode: pass win=None (or use Maze.headless()) and the maze never
+# draws or animates anything. Carving and solving check for a window once,
+# up front, and then run loops with no per-cell draw calls at all, so a
+# headless maze is as fast as the algorithms themselves.
+#
+# solve() answers whether the maze can be solved; find_path() returns an
+# actual shortest path, using one of the solvers in solvers.py.
+#
+# The walls are carved by one of the algorithms in generators.py, picked by
+# name with the generator argument (the default "backtracker" is the
+# randomized depth-first search the maze has always used).
+#
+# Pass an events.EventRecorder as recorder to log every wall removed and every
+# solver step to a file, for playing back later with events.Player.
+#
+# Pass an instrument.MazeStats as stats to count what the algorithms do and
+# time each phase (see instrument.py); it's available as maze.stats after.
+#
+# Pass topology="hex", "triangle" or "layers" (with num_levels) for a maze whose
+# cells aren't squares (see topology.py). Those can be carved, solved and
+# searched like any other, but not drawn, recorded or saved.
 class Maze:
     def __init__(
         self,
@@ -15,10 +48,162 @@ class Maze:
         cell_size_y,
         win=None,
         seed=None,
+        generator="backtracker",
+        recorder=None,
+        stats=None,
+        topology="square",
+        num_levels=1,
     ):
+        if generator not in GENERATORS:
+            raise ValueError(
+                f"unknown generator {generator!r}, expected one of {sorted(GENERATORS)}"
+            )
+        if topology != "square" and recorder is not None:
+            raise ValueError("only square mazes can be recorded")
+        check_shape(topology, num_cols, num_rows, num_levels)
         # initialize data members for all inputs, then call 
 	   # its _create_cells() method:
-        self._cells = []
+        # (Layered mazes store their levels one under the other, so there are
+        # num_rows rows per level.)
+        grid_rows = num_rows * num_levels if topology == "layers" else num_rows
+        self._init_members(
+            x1, y1, grid_rows, num_cols, cell_size_x, cell_size_y, win, seed, generator
+        )
+        if recorder is not None:
+            recorder.begin(num_cols, num_rows)
+        self._recorder = recorder
+        self._stats = stats
+
+        with self._phase("create"):
+            self._create_cells(make_grid(topology, num_cols, num_rows, num_levels))
+        with self._phase("carve"):
+            self._break_entrance_and_exit()
+            self._break_walls_r(0, 0)
+            if stats is not None:
+                stats.walls_removed += instrument.open_walls(self._cells)
+        with self._phase("reset"):
+            self._reset_cells_visited()
+
+    # Build a maze with no window attached. It only needs a size (and
+    # optionally a seed), since drawing coordinates don't matter headless:
+    @classmethod
+    def headless(
+        cls,
+        num_rows,
+        num_cols,
+        seed=None,
+        generator="backtracker",
+        recorder=None,
+        stats=None,
+        topology="square",
+        num_levels=1,
+    ):
+        return cls(
+            0, 0, num_rows, num_cols, 1, 1, None, seed, generator, recorder, stats,
+            topology, num_levels,
+        )
+
+    # Wrap a Grid that's already been carved (loaded from a file, built from an
+    # array, ...) in a Maze. Nothing is carved and no walls are changed:
+    @classmethod
+    def from_grid(
+        cls,
+        grid,
+        x1=0,
+        y1=0,
+        cell_size_x=1,
+        cell_size_y=1,
+        win=None,
+        seed=None,
+        generator=None,
+        stats=None,
+    ):
+        maze = cls.__new__(cls)
+        maze._init_members(
+            x1, y1, grid.num_rows, grid.num_cols, cell_size_x, cell_size_y, win, seed, generator
+        )
+        maze._stats = stats
+        with maze._phase("create"):
+            maze._create_cells(grid)
+        return maze
+
+    # Carve a big maze in parallel, block by block, over a pool of worker processes (see
+    # tiled.py), then open the entrance and exit. Any other keyword arguments (x1, win,
+    # ...) are passed on to from_grid():
+    @classmethod
+    def tiled(
+        cls,
+        num_rows,
+        num_cols,
+        seed=None,
+        generator="backtracker",
+        block_size=DEFAULT_BLOCK_SIZE,
+        workers=None,
+        **kwargs,
+    ):
+        grid = generate_tiled(num_rows, num_cols, seed, generator, block_size, workers)
+        maze = cls.from_grid(grid, seed=seed, generator=generator, **kwargs)
+        maze._break_entrance_and_exit()
+        return maze
+
+    # Build a maze from a (num_rows, num_cols) NumPy array of wall bitmasks, as
+    # returned by to_numpy(). Needs NumPy; see analysis.py:
+    @classmethod
+    def from_numpy(cls, walls, **kwargs):
+        return cls.from_grid(analysis.from_numpy(walls), **kwargs)
+
+    # The walls as a (num_rows, num_cols) uint8 NumPy array, one bitmask per cell
+    # (the LEFT/RIGHT/TOP/BOTTOM bits from grid.py), ready for the vectorized
+    # helpers in analysis.py:
+    def to_numpy(self):
+        self._require_square("converted to NumPy")
+        return analysis.to_numpy(self._cells)
+
+    # Save the maze to `path` in the compact maze file format (see mazefile.py):
+    # a small header with the size, seed and generator, then 4 bits per cell:
+    def save(self, path):
+        self._require_square("saved")
+        mazefile.save(path, self._cells, self._seed, self._generator)
+
+    # Open a maze saved with save() (or written by stream.write_stream). The file
+    # is memory-mapped, so it opens instantly however big it is and walls are only
+    # read from disk as they're needed; pass in_memory=True to load the whole thing
+    # into a regular grid instead. Any other keyword arguments (x1, win, ...) are
+    # passed on to from_grid():
+    @classmethod
+    def load(cls, path, in_memory=False, **kwargs):
+        grid, seed, generator = mazefile.load(path, in_memory)
+        return cls.from_grid(grid, seed=seed, generator=generator or None, **kwargs)
+
+    # Close the file a loaded maze is memory-mapped from. Mazes held in memory
+    # have nothing to close, so for them it does nothing. A maze is also a
+    # context manager that closes itself:
+    #
+    #   with Maze.load(path) as maze:
+    #       maze.find_path()
+    def close(self):
+        if isinstance(self._cells, mazefile.MappedGrid):
+            self._cells.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Draw the maze into an image file (.png or .ppm, see raster.py) without a
+    # window. cell_px and wall_px are the sizes of a cell's floor and of a wall, in
+    # pixels. Pass a path (a list of (i, j) cells, or a SolveResult) to paint it on:
+    def save_image(self, filename, cell_px=4, wall_px=1, path=None):
+        self._require_square("drawn")
+        if isinstance(path, SolveResult):
+            path = path.path
+        raster.write_image(filename, self._cells, cell_px, wall_px, path)
+
+    def _init_members(
+        self, x1, y1, num_rows, num_cols, cell_size_x, cell_size_y, win, seed, generator
+    ):
+        self._cells = None
         self._x1 = x1
         self._y1 = y1
         self._num_rows = num_rows
@@ -26,23 +211,57 @@ class Maze:
         self._cell_size_x = cell_size_x
         self._cell_size_y = cell_size_y
         self._win = win
-        if seed:
-            random.seed(seed)
-
-        self._create_cells()
-        self._break_entrance_and_exit()
-        self._break_walls_r(0, 0)
-        self._reset_cells_visited()
-
-    # This method should fill a self._cells list with lists of cells. 
-    # Each top-level list is a column of Cell objects. Once the matrix 
-    # is populated it should call its _draw_cell() method on each Cell:
-    def _create_cells(self):
-        for i in range(self._num_cols):
-            col_cells = []
-            for j in range(self._num_rows):
-                col_cells.append(Cell(self._win))
-            self._cells.append(col_cells)
+        self._seed = seed
+        self._generator = generator
+        self._recorder = None
+        self._stats = None
+        self._path_index = None
+        # Incremental solvers to tell about wall changes (see open_wall):
+        self._solvers = weakref.WeakSet()
+        # Each maze has its own random number generator, so building mazes in
+        # threads or worker processes can't disturb each other (or anybody else
+        # using the random module). Random(seed) draws the same numbers that
+        # random.seed(seed) used to, so seeded mazes come out the same as ever:
+        self._rng = random.Random(seed) if seed else random.Random()
+
+    # Drawing, recording, saving and the like only know about square cells:
+    def _require_square(self, what):
+        if self._cells.topology is not None:
+            raise ValueError(
+                f"only square mazes can be {what}, not {self._cells.topology.name}"
+            )
+
+    @property
+    def is_headless(self):
+        return self._win is None
+
+    # The MazeStats this maze reports to, or None if it isn't being measured:
+    @property
+    def stats(self):
+        return self._stats
+
+    # A context manager that times one phase into the maze's stats, or does
+    # nothing at all if there aren't any:
+    def _phase(self, name):
+        if self._stats is None:
+            return instrument.NO_PHASE
+        return self._stats.phase(name)
+
+    # This method should fill self._cells with a Grid of cells, all walls up (or use
+    # the grid it's given). Once the grid is ready it should call its _draw_cell()
+    # method on each cell:
+    def _create_cells(self, grid=None):
+        if grid is None:
+            grid = Grid(self._num_cols, self._num_rows)
+        self._cells = grid
+        if self._win is not None:
+            self._require_square("drawn")
+        grid.on_change = self._wall_changed
+        self._cells.set_geometry(
+            self._x1, self._y1, self._cell_size_x, self._cell_size_y, self._win
+        )
+        if self._win is None:
+            return
         for i in range(self._num_cols):
             for j in range(self._num_rows):
                 self._draw_cell(i, j)
@@ -56,221 +275,312 @@ class Maze:
     def _draw_cell(self, i, j):
         if self._win is None:
             return
+        # x2/y2 are worked out the same way as the neighboring cell's x1/y1, so 
+        # shared walls get exactly the same coordinates from both sides:
         x1 = self._x1 + i * self._cell_size_x
         y1 = self._y1 + j * self._cell_size_y
-        x2 = x1 + self._cell_size_x
-        y2 = y1 + self._cell_size_y
+        x2 = self._x1 + (i + 1) * self._cell_size_x
+        y2 = self._y1 + (j + 1) * self._cell_size_y
+        if self._stats is not None:
+            self._stats.draw_calls += 1
         self._cells[i][j].draw(x1, y1, x2, y2)
         self._animate()
 
     # The animate method is what allows us to visualize what the 
-    # algorithms are doing in real time. It should simply call the 
-    # window's redraw() method, then use time.sleep() for a short 
-    # amount of time so your eyes keep up with each render frame. I 
-    # slept for 0.05 seconds:
+    # algorithms are doing in real time. It tells the window that one more 
+    # step has happened; the window decides when to actually redraw and how 
+    # long to wait, based on its frame rate (see Window.animate):
     def _animate(self):
         if self._win is None:
             return
-        self._win.redraw()
-        time.sleep(0.05)
+        self._win.animate()
 
     # Add a _break_entrance_and_exit() method that removes an outer wall 
     # from those cells, and calls _draw_cell() after each removal:
     def _break_entrance_and_exit(self):
-        self._cells[0][0].has_top_wall = False
+        data = self._cells.data
+        data[0] &= ~TOP
         self._draw_cell(0, 0)
         # Can't use exact reference because maze size is variable:
-        self._cells[self._num_cols - 1][self._num_rows - 1].has_bottom_wall = False
+        data[len(data) - 1] &= ~BOTTOM
+        if self._recorder is not None:
+            self._recorder.outer_wall_removed(0, TOP)
+            self._recorder.outer_wall_removed(len(data) - 1, BOTTOM)
         self._draw_cell(self._num_cols - 1, self._num_rows - 1)
 
     # We need to break down enough walls that the maze is fun and challenging while also ensuring that 
-    # there is a correct path from the start to the end.
-    # This recursive method is a depth-first traversal through the cells, breaking down walls as it goes:
+    # there is a correct path from the start to the end. The chosen generator does the work
+    # (see generators.py), starting from cell (i, j). With a window attached, both cells are
+    # redrawn every time a wall comes down (and with a recorder, the wall is logged);
+    # headless and unrecorded, no callback is passed at all:
     def _break_walls_r(self, i, j):
-        # Mark the current cell as visited:
-        self._cells[i][j].visited = True
-        while True:
-            # Create a new empty list to hold the i and j values you will need to visit:
-            next_index_list = []
-
-            # Check the cells that are directly adjacent to the current cell. 
-            # Keep track of any that have not been visited as "possible directions" to move to
-            
-            # left:
-            # 'if i > 0': This ensures that you're not trying to check a cell above the first row (i = 0).
-            # 'and not self._cells[i - 1][j].visited': This checks whether the cell 
-            # directly above the current cell (i - 1, j) has already been visited. 
-            # If it has not been visited, it's a valid target for moving to and breaking walls
-            if i > 0 and not self._cells[i - 1][j].visited:
-                # next_index_list.append((i - 1, j)): If both conditions are true, 
-                # the i and j coordinates of the cell above are added to the next_index_list. 
-                # This list is keeping track of potential next cells to visit:
-                next_index_list.append((i - 1, j))
-            # right:
-            # 'if i < self._num_cols - 1': This ensures that you don’t try to access a cell 
-            # below the last column. 
-            # 'and not self._cells[i + 1][j].visited': This checks whether the cell immediately 
-            # below the current one (i + 1, j) has already been visited. If it's untouched 
-            # (visited == False), then it's a valid candidate for the next step in your depth-first traversal.
-            if i < self._num_cols - 1 and not self._cells[i + 1][j].visited:
-                next_index_list.append((i + 1, j))
-            # up:
-            # 'if j > 0': This ensures that you don’t attempt to check a cell to the left 
-            # of the first column (j = 0).
-            # 'and not self._cells[i][j - 1].visited': This checks whether the cell immediately to 
-            # the left of the current cell (i, j - 1) has already been visited. If it hasn’t been 
-            # visited yet, it qualifies as a valid candidate for movement and wall-breaking:
-            if j > 0 and not self._cells[i][j - 1].visited:
-                next_index_list.append((i, j - 1))
-            # down:
-            # 'if j < self._num_rows - 1': This checks if we're safely within the bounds of the
-            # grid and not trying to step beyond the right edge.
-            # 'and not self._cells[i][j + 1].visited': This ensures that the cell immediately to the 
-            # right of the current one (i, j + 1) hasn’t already been visited:
-            if j < self._num_rows - 1 and not self._cells[i][j + 1].visited:
-                next_index_list.append((i, j + 1))
-
-            # if next_index_list is empty, it indicates that all adjacent cells are either out 
-            # of bounds or have already been visited.
-            if len(next_index_list) == 0:
-            	 # call a method to "draw" or mark the current cell (i, j) in the maze:
-                self._draw_cell(i, j)
-                # exit the recursion completely for this particular function call, signaling 
-                # that the traversal cannot go any further in this direction:
-                return
-
-            # randomly choose the next direction to go:
-            # By selecting a random direction from the list of possible moves, the maze 
-            # generation becomes unpredictable, leading to unique maze paths every time the 
-            # algorithm runs (unless you seed it, of course)
-            # Generate a random number between 0 and len(next_index_list) - 1. In other words, 
-            # it chooses a random index from the list of possible next directions (stored in next_index_list).
-            direction_index = random.randrange(len(next_index_list))
-            # With the randomly chosen index, this selects the corresponding (i, j) coordinates 
-            # from next_index_list. These coordinates represent the next cell you'll visit 
-            # (and likely break walls with):
-            next_index = next_index_list[direction_index]
-
-            # knock out walls between this cell and the next cell(s)
-            # right:
-            # 'next_index[0] == i + 1' means you're moving to the cell to the right of your current position:
-            if next_index[0] == i + 1:
-            	 # Remove: the right wall of the current cell:
-                self._cells[i][j].has_right_wall = False
-                # Remove the left wall of the cell to the right
-                # (When you break a wall between two cells, you need to update both cells' 
-                # wall information.)
-                self._cells[i + 1][j].has_left_wall = False
-            # left:
-            # 'next_index[0] == i - 1' means you're moving to the cell to the left of your current position:
-            if next_index[0] == i - 1:
-                self._cells[i][j].has_left_wall = False
-                self._cells[i - 1][j].has_right_wall = False
-            # down:
-            # # 'next_index[0] == j + 1' means you're moving to the cell below your current position:
-            if next_index[1] == j + 1:
-                self._cells[i][j].has_bottom_wall = False
-                self._cells[i][j + 1].has_top_wall = False
-            # up:
-            # 'next_index[0] == j - 1' means you're moving to the cell above your current position:
-            if next_index[1] == j - 1:
-                self._cells[i][j].has_top_wall = False
-                self._cells[i][j - 1].has_bottom_wall = False
-
-            # recursively visit the next cell:
-            # After you've:
-            #		Chosen a random unvisited neighbor cell (stored in next_index)	
-            #		Broken down the walls between your current cell and that neighbor
-            # Recursively call _break_walls_r() with the coordinates of that neighbor cell 
-            # (next_index[0] and next_index[1]). This will continue the wall-breaking process 
-            # from that new position.
-            # (This recursive approach is key to the depth-first search algorithm for maze 
-            # generation. It will continue exploring as deep as possible along each branch 
-            # before backtracking)
-            self._break_walls_r(next_index[0], next_index[1])
-    
+        on_carve = None
+        if self._win is not None or self._recorder is not None:
+            on_carve = self._on_carve
+        GENERATORS[self._generator](
+            self._cells, self._rng, self._cells.index(i, j), on_carve
+        )
+
+    # Add loops to the maze by knocking a wall down at a fraction of its dead ends (see
+    # generators.braid), so there's more than one way through. 1.0 removes every dead
+    # end. Returns the number of walls removed:
+    def braid(self, fraction=1.0):
+        on_carve = None
+        if self._win is not None or self._recorder is not None or self._solvers:
+            on_carve = self._on_carve
+        with self._phase("braid"):
+            removed = braid(self._cells, self._rng, fraction, on_carve)
+            self._cells.changed()
+            if self._stats is not None:
+                self._stats.walls_removed += removed
+        return removed
+
+    def _on_carve(self, index, next_index):
+        if self._solvers:
+            self._cells.changed(index, next_index)
+        if self._recorder is not None:
+            self._recorder.wall_removed(index, next_index)
+        if self._win is not None:
+            self._draw_carve(index, next_index)
+
+    def _draw_carve(self, index, next_index):
+        j, i = divmod(index, self._num_cols)
+        self._draw_cell(i, j)
+        j, i = divmod(next_index, self._num_cols)
+        self._draw_cell(i, j)
+
     # Write a _reset_cells_visited method to reset the 'visited' property of all the cells 
     # in the Maze to *False*. Call it after _break_walls_r so we can reuse the visited 
     # property when solving the maze in the next step:
     def _reset_cells_visited(self):
-        for col in self._cells:
-            for cell in col:
-                cell.visited = False
+        self._cells.clear_visited()
 
-    # returns True if this is the end cell, OR if it leads to the end cell.
-    # returns False if this is a loser cell.
+    # A depth-first search from cell (i, j) to the end cell, drawing every move as it goes
+    # (and drawing it again in gray when the move turns out to be a dead end). Returns
+    # True if the end cell is reachable, False otherwise.
+    # This used to recurse once per cell. It now keeps an explicit stack of cells instead,
+    # trying directions in the same order (left, right, up, down) and marking the same cells
+    # visited, so it works on mazes of any size. Headless, it never calls a drawing method.
+    # With a recorder attached, every visit, move and undo is logged, and with stats
+    # attached the visits, backtracks and deepest stack are counted:
     def _solve_r(self, i, j):
-        # Call the _animate method:
-        self._animate()
-        # Mark the current cell as visited:
-        self._cells[i][j].visited = True
-
-        # If t the "end" cell (the goal) then return True:
-        if i == self._num_cols - 1 and j == self._num_rows - 1:
-            return True
-
-        # move left if there is no wall and it hasn't been visited:
-        if (
-            # make sure moving left won't go out of bounds:
-            i > 0
-            # ensure there's no wall blocking the path:
-            and not self._cells[i][j].has_left_wall
-            # make sure we haven't already visited the cell:
-            and not self._cells[i - 1][j].visited
-        ):
-            # Draw a move from current cell to left cell:
-            self._cells[i][j].draw_move(self._cells[i - 1][j])
-            # Recursively call _solve_r on the left cell:
-            if self._solve_r(i - 1, j):
-                # If that recursive call returns True, return True 
-                # (meaning a solution was found):
-                return True
-            # Otherwise, undo the move by drawing it again with 'undo=True' parameter 
-            else:
-                self._cells[i][j].draw_move(self._cells[i - 1][j], True)
-
-        # move right if there is no wall and it hasn't been visited
-        if (
-            i < self._num_cols - 1
-            and not self._cells[i][j].has_right_wall
-            and not self._cells[i + 1][j].visited
-        ):
-            self._cells[i][j].draw_move(self._cells[i + 1][j])
-            if self._solve_r(i + 1, j):
-                return True
-            else:
-                self._cells[i][j].draw_move(self._cells[i + 1][j], True)
-
-        # move up if there is no wall and it hasn't been visited
-        if (
-            j > 0
-            and not self._cells[i][j].has_top_wall
-            and not self._cells[i][j - 1].visited
-        ):
-            self._cells[i][j].draw_move(self._cells[i][j - 1])
-            if self._solve_r(i, j - 1):
-                return True
-            else:
-                self._cells[i][j].draw_move(self._cells[i][j - 1], True)
-
-        # move down if there is no wall and it hasn't been visited
-        if (
-            j < self._num_rows - 1
-            and not self._cells[i][j].has_bottom_wall
-            and not self._cells[i][j + 1].visited
-        ):
-            self._cells[i][j].draw_move(self._cells[i][j + 1])
-            if self._solve_r(i, j + 1):
-                return True
-            else:
-                self._cells[i][j].draw_move(self._cells[i][j + 1], True)
+        data = self._cells.data
+        num_cols = self._num_cols
+        num_rows = self._num_rows
+        topology = self._cells.topology
+        goal = len(data) - 1
+        draw = self._win is not None
+        recorder = self._recorder
+        stats = self._stats
+        measure = stats is not None
+        visited = 1
+        backtracks = 0
+        max_depth = 1
+
+        start = j * num_cols + i
+        if draw:
+            self._animate()
+        if recorder is not None:
+            recorder.visited(start)
+        data[start] |= VISITED
+        found = start == goal
+        stack = [] if found else [start]
+        while stack:
+            index = stack[-1]
+            j, i = divmod(index, num_cols)
+            walls = data[index]
+            # Take the first open, unvisited neighbor in the order left, right, up, down
+            # (or the topology's order). Directions that were already tried are visited
+            # now, so rescanning from the start gives the same order as the recursive
+            # version did:
+            next_index = -1
+            if topology is not None:
+                for neighbor in topology.open_neighbors(data, index):
+                    if not data[neighbor] & VISITED:
+                        next_index = neighbor
+                        break
+            elif i > 0 and not walls & LEFT and not data[index - 1] & VISITED:
+                next_index = index - 1
+            elif i < num_cols - 1 and not walls & RIGHT and not data[index + 1] & VISITED:
+                next_index = index + 1
+            elif j > 0 and not walls & TOP and not data[index - num_cols] & VISITED:
+                next_index = index - num_cols
+            elif j < num_rows - 1 and not walls & BOTTOM and not data[index + num_cols] & VISITED:
+                next_index = index + num_cols
+            if next_index < 0:
+                # Dead end: back up one cell, undoing the move that got us here:
+                stack.pop()
+                if measure:
+                    backtracks += 1
+                if stack:
+                    if draw:
+                        self._draw_move(stack[-1], index, True)
+                    if recorder is not None:
+                        recorder.undo(stack[-1], index)
+                continue
 
-        # If none of the directions worked out, return False:
-        return False
+            if draw:
+                self._draw_move(index, next_index)
+                self._animate()
+            if recorder is not None:
+                recorder.move(index, next_index)
+                recorder.visited(next_index)
+            data[next_index] |= VISITED
+            if measure:
+                visited += 1
+                if len(stack) >= max_depth:
+                    max_depth = len(stack) + 1
+            if next_index == goal:
+                found = True
+                break
+            stack.append(next_index)
+
+        if measure:
+            stats.cells_visited += visited
+            stats.backtracks += backtracks
+            stats.max_stack_depth = max(stats.max_stack_depth, max_depth)
+        return found
+
+    def _draw_move(self, index, next_index, undo=False):
+        j, i = divmod(index, self._num_cols)
+        next_j, next_i = divmod(next_index, self._num_cols)
+        if self._stats is not None:
+            self._stats.draw_calls += 1
+        self._cells[i][j].draw_move(self._cells[next_i][next_j], undo)
+
+    def _erase_move(self, index, next_index):
+        j, i = divmod(index, self._num_cols)
+        next_j, next_i = divmod(next_index, self._num_cols)
+        self._cells[i][j].erase_move(self._cells[next_i][next_j])
 
     # Call maze.solve() in the main function to execute the depth-first search:
     # The solve() method on the Maze class simply calls the _solve_r method starting at 
     # i=0 and j=0. It should return True if the maze was solved, False otherwise. 
     # This is the same return value as _solve_r:
     def solve(self):
-        return self._solve_r(0, 0)
+        with self._phase("solve"):
+            return self._solve_r(0, 0)
+
+    # Find a shortest path between two cells with one of the solvers in solvers.py
+    # ("bfs", "astar" or "bidirectional_bfs"). start and goal are (i, j) pairs and default
+    # to the entrance and exit cells. Returns a SolveResult with the path as a list of (i, j)
+    # pairs plus how many cells were expanded and how long it took. Unlike solve(), this
+    # doesn't draw anything or touch the cells' visited flags:
+    def find_path(self, solver="bfs", start=None, goal=None):
+        if solver not in SOLVERS:
+            raise ValueError(
+                f"unknown solver {solver!r}, expected one of {sorted(SOLVERS)}"
+            )
+        start, goal = self._endpoints(start, goal)
+        with self._phase("find_path"):
+            result = SOLVERS[solver](
+                self._cells, self._cells.index(*start), self._cells.index(*goal)
+            )
+            if self._stats is not None:
+                self._stats.nodes_expanded += result.nodes_expanded
+        return result
+
+    # The k shortest distinct paths between two cells, shortest first, as a list of
+    # SolveResults (see solvers.k_shortest_paths). A perfect maze only has one path, so
+    # braid() it first to get more:
+    def find_paths(self, k, start=None, goal=None):
+        start, goal = self._endpoints(start, goal)
+        with self._phase("find_path"):
+            results = k_shortest_paths(
+                self._cells, self._cells.index(*start), self._cells.index(*goal), k
+            )
+            if self._stats is not None and results:
+                self._stats.nodes_expanded += results[-1].nodes_expanded
+        return results
+
+    # Open or close the wall between two neighboring (i, j) cells at runtime, like a door.
+    # Both cells' walls are kept in step, both are redrawn if there's a window, and
+    # anything worked out from the old walls finds out: PathIndexes go stale, and
+    # incremental solvers repair their paths on their next solve(). Returns True if
+    # the wall changed, False if it was already open (or closed):
+    def open_wall(self, a, b):
+        return self._set_wall(a, b, False)
+
+    def close_wall(self, a, b):
+        return self._set_wall(a, b, True)
+
+    def _set_wall(self, a, b, closed):
+        for i, j in (a, b):
+            if not (0 <= i < self._num_cols and 0 <= j < self._num_rows):
+                raise ValueError(f"cell {(i, j)} is outside the maze")
+        index = self._cells.index(*a)
+        next_index = self._cells.index(*b)
+        step = next_index - index
+        topology = self._cells.topology
+        if topology is not None:
+            for neighbor, wall, opposite_wall in topology.neighbors(index):
+                if neighbor == next_index:
+                    break
+            else:
+                raise ValueError(f"cells {a} and {b} aren't neighbors")
+        elif step == 1 and a[1] == b[1]:
+            wall, opposite_wall = RIGHT, LEFT
+        elif step == -1 and a[1] == b[1]:
+            wall, opposite_wall = LEFT, RIGHT
+        elif step == self._num_cols:
+            wall, opposite_wall = BOTTOM, TOP
+        elif step == -self._num_cols:
+            wall, opposite_wall = TOP, BOTTOM
+        else:
+            raise ValueError(f"cells {a} and {b} aren't neighbors")
+
+        data = self._cells.data
+        if bool(data[index] & wall) == closed:
+            return False
+        if closed:
+            data[index] |= wall
+            data[next_index] |= opposite_wall
+        else:
+            data[index] &= ~wall
+            data[next_index] &= ~opposite_wall
+        self._cells.changed(index, next_index)
+        if self._recorder is not None:
+            if closed:
+                self._recorder.wall_added(index, next_index)
+            else:
+                self._recorder.wall_removed(index, next_index)
+        self._draw_cell(*a)
+        self._draw_cell(*b)
+        return True
+
+    # Every wall change after carving (open_wall/close_wall, braid(), a cell view's
+    # wall setters) ends up here, by way of Grid.changed(index, next_index):
+    def _wall_changed(self, index, next_index):
+        for solver in self._solvers:
+            solver.wall_changed(index, next_index)
+
+    # A shortest-path solver that keeps its path up to date as walls are opened and
+    # closed (with open_wall/close_wall, braid(), or by setting a cell's walls),
+    # repairing it instead of searching again (see incremental.py). start and goal
+    # default to the entrance and exit:
+    def incremental_solver(self, start=None, goal=None):
+        self._require_square("solved incrementally")
+        start, goal = self._endpoints(start, goal)
+        solver = LPAStar(self._cells, self._cells.index(*start), self._cells.index(*goal))
+        self._solvers.add(solver)
+        return solver
+
+    # A PathIndex for answering distance and path questions between any two cells
+    # without searching (see pathindex.py). It's built the first time it's asked for,
+    # and built again if the walls have changed since. Only works on perfect mazes:
+    def path_index(self):
+        if self._path_index is None or self._path_index.is_stale:
+            self._path_index = PathIndex(self._cells)
+        return self._path_index
+
+    # Fill in the default start and goal (the entrance and exit cells) and check that
+    # both are in the maze:
+    def _endpoints(self, start, goal):
+        if start is None:
+            start = (0, 0)
+        if goal is None:
+            goal = (self._num_cols - 1, self._num_rows - 1)
+        for i, j in (start, goal):
+            if not (0 <= i < self._num_cols and 0 <= j < self._num_rows):
+                raise ValueError(f"cell {(i, j)} is outside the maze")
+        return start, goal
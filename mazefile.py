@@ -0,0 +1,232 @@
+from grid import Grid, VISITED, WALLS
+import mmap
+import os
+import struct
+
+# The maze file format. A file is a fixed-size header followed by the walls
+# of every cell, row by row, packed 4 bits per cell (the LEFT/RIGHT/TOP/BOTTOM
+# bits from grid.py). The first cell of each pair goes in the low nibble.
+# Every row starts on a fresh byte, so an odd number of columns leaves the
+# last high nibble of each row empty. That keeps rows independent, which is
+# what lets mazes be written one row at a time.
+#
+# Header layout (little-endian):
+#   magic      4 bytes   b"MAZE"
+#   version    1 byte
+#   (padding)  3 bytes
+#   num_cols   uint32
+#   num_rows   uint64
+#   seed       int64     -1 if the maze wasn't generated from an integer seed
+#   algorithm  16 bytes  generator name, ASCII, zero padded
+
+MAGIC = b"MAZE"
+VERSION = 1
+HEADER = struct.Struct("<4sB3xIQq16s")
+HEADER_SIZE = HEADER.size
+
+NO_SEED = -1
+
+# Lookup tables used to split bytes into nibbles and back with
+# bytes.translate(), which runs in C:
+_LOW_NIBBLE = bytes(b & 0x0F for b in range(256))
+_HIGH_NIBBLE = bytes(b >> 4 for b in range(256))
+_TO_HIGH_NIBBLE = bytes((b << 4) & 0xF0 for b in range(256))
+
+
+class MazeFileError(ValueError):
+    pass
+
+
+def row_bytes(num_cols):
+    return (num_cols + 1) // 2
+
+
+def write_header(f, num_cols, num_rows, seed=None, algorithm=""):
+    if not isinstance(seed, int) or seed < 0:
+        seed = NO_SEED
+    name = algorithm.encode("ascii")
+    if len(name) > 16:
+        raise MazeFileError(f"algorithm name {algorithm!r} is longer than 16 bytes")
+    f.write(HEADER.pack(MAGIC, VERSION, num_cols, num_rows, seed, name))
+
+
+# Parse a header from the first HEADER_SIZE bytes of `buf`. Returns
+# (num_cols, num_rows, seed, algorithm), with seed None if none was stored:
+def read_header(buf):
+    if len(buf) < HEADER_SIZE:
+        raise MazeFileError("file is too short to be a maze file")
+    magic, version, num_cols, num_rows, seed, name = HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise MazeFileError("not a maze file")
+    if version != VERSION:
+        raise MazeFileError(f"unsupported maze file version {version}")
+    if seed == NO_SEED:
+        seed = None
+    return num_cols, num_rows, seed, name.rstrip(b"\0").decode("ascii")
+
+
+# Pack one row of wall bytes (one byte per cell, extra bits such as VISITED
+# are dropped) into 4 bits per cell:
+def pack_row(row):
+    low = bytes(row[0::2]).translate(_LOW_NIBBLE)
+    high = bytes(row[1::2]).translate(_TO_HIGH_NIBBLE)
+    # OR the two halves together a whole row at a time:
+    size = len(low)
+    packed = int.from_bytes(low, "little") | int.from_bytes(high, "little")
+    return packed.to_bytes(size, "little")
+
+
+# The reverse of pack_row: one byte per cell, for the first num_cols cells:
+def unpack_row(packed, num_cols):
+    row = bytearray(len(packed) * 2)
+    row[0::2] = bytes(packed).translate(_LOW_NIBBLE)
+    row[1::2] = bytes(packed).translate(_HIGH_NIBBLE)
+    del row[num_cols:]
+    return row
+
+
+# All of a grid's rows packed 4 bits per cell, exactly as they're stored in
+# a maze file after the header:
+def pack_grid(grid):
+    if isinstance(grid, MappedGrid):
+        # Already packed:
+        return grid.packed()
+    data = grid.data
+    num_cols = grid.num_cols
+    return b"".join(
+        pack_row(data[j * num_cols:(j + 1) * num_cols]) for j in range(grid.num_rows)
+    )
+
+
+# The reverse of pack_grid: a new Grid from packed rows:
+def unpack_grid(packed, num_cols, num_rows):
+    size = row_bytes(num_cols)
+    if len(packed) != size * num_rows:
+        raise MazeFileError(f"expected {size * num_rows} packed bytes, got {len(packed)}")
+    grid = Grid(num_cols, num_rows)
+    grid.data[:] = b"".join(
+        unpack_row(packed[j * size:(j + 1) * size], num_cols) for j in range(num_rows)
+    )
+    return grid
+
+
+# Write a grid to `path` in the maze file format:
+def save(path, grid, seed=None, algorithm=""):
+    with open(path, "wb") as f:
+        write_header(f, grid.num_cols, grid.num_rows, seed, algorithm or "")
+        f.write(pack_grid(grid))
+
+
+# Open a maze file. Returns (grid, seed, algorithm).
+#
+# By default the file is memory-mapped and wrapped in a MappedGrid: nothing
+# is read up front, so even a multi-gigabyte maze opens instantly, and the
+# operating system pages walls in as they're looked at. Pass in_memory=True
+# to unpack the whole file into an ordinary Grid instead, which is faster to
+# work with once it's loaded:
+def load(path, in_memory=False):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+            raise MazeFileError("file is too short to be a maze file")
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    try:
+        num_cols, num_rows, seed, algorithm = read_header(buf)
+    except Exception:
+        buf.close()
+        raise
+    expected = HEADER_SIZE + row_bytes(num_cols) * num_rows
+    if len(buf) < expected:
+        buf.close()
+        raise MazeFileError(f"maze file is truncated: {len(buf)} of {expected} bytes")
+
+    grid = MappedGrid(buf, num_cols, num_rows)
+    if in_memory:
+        mapped = grid
+        grid = Grid(num_cols, num_rows)
+        grid.data[:] = mapped.tobytes()
+        buf.close()
+    return grid, seed, algorithm
+
+
+# The walls of a memory-mapped maze file, read and written 4 bits at a time
+# straight from the mapping. It looks just like a Grid's bytearray to the
+# code that uses it: indexing gives the cell's wall bits (plus VISITED), and
+# assigning to an index updates them. The file is mapped copy-on-write, so
+# changes never reach the file on disk.
+#
+# VISITED doesn't fit in the file's 4 bits, so visited flags live in a
+# separate bytearray that's only allocated the first time one is set:
+class NibbleView:
+    def __init__(self, buf, num_cols, num_rows):
+        self._buf = buf
+        self._num_cols = num_cols
+        self._num_rows = num_rows
+        self._row_bytes = row_bytes(num_cols)
+        self._visited = None
+
+    def __len__(self):
+        return self._num_cols * self._num_rows
+
+    def _locate(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("cell index out of range")
+        j, i = divmod(index, self._num_cols)
+        return index, HEADER_SIZE + j * self._row_bytes + (i >> 1), (i & 1) * 4
+
+    def __getitem__(self, index):
+        index, offset, shift = self._locate(index)
+        value = (self._buf[offset] >> shift) & 0x0F
+        if self._visited is not None and self._visited[index]:
+            value |= VISITED
+        return value
+
+    def __setitem__(self, index, value):
+        index, offset, shift = self._locate(index)
+        byte = self._buf[offset] & ~(0x0F << shift)
+        self._buf[offset] = byte | ((value & WALLS) << shift)
+        if value & VISITED:
+            if self._visited is None:
+                self._visited = bytearray(len(self))
+            self._visited[index] = 1
+        elif self._visited is not None:
+            self._visited[index] = 0
+
+    def clear_visited(self):
+        self._visited = None
+
+
+# A Grid backed by a memory-mapped maze file instead of a bytearray:
+class MappedGrid(Grid):
+    def __init__(self, buf, num_cols, num_rows):
+        # Grid.__init__ isn't called, so no bytearray is allocated:
+        self.num_cols = num_cols
+        self.num_rows = num_rows
+        self.data = NibbleView(buf, num_cols, num_rows)
+        self.version = 0
+        self._buf = buf
+        self._x1 = 0
+        self._y1 = 0
+        self._cell_size_x = 0
+        self._cell_size_y = 0
+        self._win = None
+
+    def clear_visited(self):
+        self.data.clear_visited()
+
+    # The packed rows, exactly as they're laid out in the file:
+    def packed(self):
+        return self._buf[HEADER_SIZE:HEADER_SIZE + row_bytes(self.num_cols) * self.num_rows]
+
+    # Row j unpacked to one byte per cell (without VISITED bits):
+    def row(self, j):
+        size = row_bytes(self.num_cols)
+        offset = HEADER_SIZE + j * size
+        return bytes(unpack_row(self._buf[offset:offset + size], self.num_cols))
+
+    def tobytes(self):
+        return unpack_grid(self.packed(), self.num_cols, self.num_rows).tobytes()
+
+    def close(self):
+        self._buf.close()
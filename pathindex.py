@@ -0,0 +1,169 @@
+from array import array
+from functools import lru_cache
+from solvers import _open_neighbors_for
+
+# Answer "how far is it from A to B, and which way?" for any two cells of a
+# perfect maze, over and over, without searching.
+#
+# A perfect maze is a tree: there's exactly one path between any two cells,
+# and it goes up from A to the lowest common ancestor of A and B, then down
+# to B. The index roots the tree at the entrance once, recording every
+# cell's parent and depth. Then:
+#
+#   distance(a, b) = depth[a] + depth[b] - 2 * depth[lca(a, b)]
+#
+# and the path is the walk from a up to the ancestor and down to b.
+#
+# Ancestors are found with a heavy-path decomposition: every cell points at
+# the top of the "heavy" chain it's on (each cell continues the chain of the
+# child with the biggest subtree), so finding the ancestor jumps a chain at a
+# time, which is O(log n) jumps. It takes a few linear passes to build and
+# three arrays of cells, so it fits millions of cells.
+#
+#   index = maze.path_index()
+#   index.distance((0, 0), (5, 7))
+#   index.path((0, 0), (5, 7))
+#
+# Ancestors and distances go through an LRU cache, so hot pairs cost a
+# dictionary lookup. Paths aren't cached: a path can be as long as the maze
+# has cells, walking it is O(length) either way, and a cache full of them
+# would eat memory fast.
+#
+# If the walls change (Maze.braid(), setting a cell's walls, anything that
+# calls Grid.changed()), the index is stale: queries raise StaleIndexError,
+# and Maze.path_index() builds a new one.
+
+
+class StaleIndexError(RuntimeError):
+    pass
+
+
+class PathIndex:
+    def __init__(self, grid, cache_size=65536):
+        self._grid = grid
+        self._version = grid.version
+        self._build()
+        self._ancestor = lru_cache(maxsize=cache_size)(self._lca)
+        self._distance = lru_cache(maxsize=cache_size)(self._find_distance)
+
+    def _build(self):
+        grid = self._grid
+        data = grid.data
+        num_cols = grid.num_cols
+        num_rows = grid.num_rows
+        num_cells = num_cols * num_rows
+        open_neighbors = _open_neighbors_for(grid)
+
+        # Breadth-first from the entrance, so parents come before children in
+        # `order`. Seeing an already-reached cell other than the parent means
+        # there's a loop:
+        parent = array("i", [-1]) * num_cells
+        depth = array("i", [0]) * num_cells
+        parent[0] = 0
+        order = array("i", [0])
+        for index in order:
+            for next_index in open_neighbors(data, index, num_cols, num_rows):
+                if parent[next_index] < 0:
+                    parent[next_index] = index
+                    depth[next_index] = depth[index] + 1
+                    order.append(next_index)
+                elif next_index != parent[index]:
+                    raise ValueError("the maze has loops: a PathIndex needs a perfect maze")
+        if len(order) != num_cells:
+            raise ValueError("some cells can't be reached: a PathIndex needs a perfect maze")
+
+        # Subtree sizes, children before parents:
+        size = array("i", [1]) * num_cells
+        for index in reversed(order[1:]):
+            size[parent[index]] += size[index]
+        # The heavy child of every cell (the one with the biggest subtree):
+        heavy = array("i", [-1]) * num_cells
+        for index in order[1:]:
+            up = parent[index]
+            if heavy[up] < 0 or size[index] > size[heavy[up]]:
+                heavy[up] = index
+        del size
+        # The top of each cell's heavy chain:
+        head = array("i", [0]) * num_cells
+        for index in order[1:]:
+            up = parent[index]
+            head[index] = head[up] if heavy[up] == index else index
+
+        self._parent = parent
+        self._depth = depth
+        self._head = head
+
+    @property
+    def is_stale(self):
+        return self._grid.version != self._version
+
+    def _stale(self):
+        raise StaleIndexError("the walls changed since this PathIndex was built")
+
+    def _cell_index(self, cell):
+        i, j = cell
+        if not (0 <= i < self._grid.num_cols and 0 <= j < self._grid.num_rows):
+            raise ValueError(f"cell {(i, j)} is outside the maze")
+        return j * self._grid.num_cols + i
+
+    def _lca(self, a, b):
+        parent = self._parent
+        depth = self._depth
+        head = self._head
+        while head[a] != head[b]:
+            if depth[head[a]] > depth[head[b]]:
+                a = parent[head[a]]
+            else:
+                b = parent[head[b]]
+        return a if depth[a] < depth[b] else b
+
+    def _find_distance(self, a, b):
+        a = self._cell_index(a)
+        b = self._cell_index(b)
+        depth = self._depth
+        return depth[a] + depth[b] - 2 * depth[self._ancestor(a, b)]
+
+    # The cells from a to b, both included, as (i, j) pairs:
+    def _find_path(self, a, b):
+        a = self._cell_index(a)
+        b = self._cell_index(b)
+        parent = self._parent
+        ancestor = self._ancestor(a, b)
+        up = []
+        while a != ancestor:
+            up.append(a)
+            a = parent[a]
+        down = []
+        while b != ancestor:
+            down.append(b)
+            b = parent[b]
+        up.append(ancestor)
+        up.extend(reversed(down))
+        num_cols = self._grid.num_cols
+        return [(index % num_cols, index // num_cols) for index in up]
+
+    # The lowest common ancestor of two cells, with the tree rooted at the
+    # entrance, as an (i, j) pair:
+    def ancestor(self, a, b):
+        if self._grid.version != self._version:
+            self._stale()
+        index = self._ancestor(self._cell_index(a), self._cell_index(b))
+        return (index % self._grid.num_cols, index // self._grid.num_cols)
+
+    # Number of moves between two (i, j) cells:
+    def distance(self, a, b):
+        if self._grid.version != self._version:
+            self._stale()
+        return self._distance(a, b)
+
+    # The cells from a to b as (i, j) pairs, both included:
+    def path(self, a, b):
+        if self._grid.version != self._version:
+            self._stale()
+        return self._find_path(a, b)
+
+    def cache_info(self):
+        return {
+            "ancestor": self._ancestor.cache_info(),
+            "distance": self._distance.cache_info(),
+        }
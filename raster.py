@@ -0,0 +1,167 @@
+from grid import LEFT, RIGHT, TOP, BOTTOM
+import struct
+import zlib
+
+# Draw a maze straight into pixels and write it out as a PPM or PNG image,
+# without Tk or a display. Mazes of any size can be written: pixel rows are
+# produced one maze row at a time and written out in strips, so memory use
+# depends on the width of the maze, never its height.
+#
+# Every cell is cell_px x cell_px pixels of floor, with wall_px pixels of
+# wall between neighboring cells and around the outside, so an image is
+# num_cols * (cell_px + wall_px) + wall_px pixels wide (and the same for
+# the height). Open walls are drawn as floor.
+#
+# A solution path (a list of (i, j) cells, e.g. SolveResult.path) can be
+# painted on top: the path's cells and the gaps between them turn red.
+
+WALL_COLOR = b"\x00\x00\x00"
+FLOOR_COLOR = b"\xff\xff\xff"
+PATH_COLOR = b"\xdc\x1e\x1e"
+
+# How many pixel rows go into one strip (and one PNG IDAT chunk):
+STRIP_ROWS = 256
+
+
+def image_size(grid, cell_px=4, wall_px=1):
+    width = grid.num_cols * (cell_px + wall_px) + wall_px
+    height = grid.num_rows * (cell_px + wall_px) + wall_px
+    return width, height
+
+
+# Work out which cells are on the path, and which walls the path walks
+# through (stored by the index of the cell on the left of / above the gap):
+def _path_sets(grid, path):
+    cells = set()
+    right_gaps = set()
+    down_gaps = set()
+    if not path:
+        return cells, right_gaps, down_gaps
+    num_cols = grid.num_cols
+    indexes = [j * num_cols + i for i, j in path]
+    cells.update(indexes)
+    for index, next_index in zip(indexes, indexes[1:]):
+        low = min(index, next_index)
+        if abs(next_index - index) == num_cols:
+            down_gaps.add(low)
+        else:
+            right_gaps.add(low)
+    return cells, right_gaps, down_gaps
+
+
+# Yield the image one pixel row at a time, as bytes of RGB triples:
+def iter_pixel_rows(grid, cell_px=4, wall_px=1, path=None):
+    num_cols = grid.num_cols
+    num_rows = grid.num_rows
+    path_cells, right_gaps, down_gaps = _path_sets(grid, path)
+
+    post = WALL_COLOR * wall_px
+    wall_v = WALL_COLOR * wall_px
+    floor_v = FLOOR_COLOR * wall_px
+    path_v = PATH_COLOR * wall_px
+    wall_h = WALL_COLOR * cell_px
+    floor_h = FLOOR_COLOR * cell_px
+    path_h = PATH_COLOR * cell_px
+
+    # A line of walls along one side (bit is TOP or BOTTOM) of a row of
+    # cells. gap_start is the index of the first cell of the row above the
+    # line, used to find path gaps in it, or None if there can't be any:
+    def wall_row(walls, bit, gap_start):
+        pieces = []
+        for i in range(num_cols):
+            pieces.append(post)
+            if walls[i] & bit:
+                pieces.append(wall_h)
+            elif gap_start is not None and gap_start + i in down_gaps:
+                pieces.append(path_h)
+            else:
+                pieces.append(floor_h)
+        pieces.append(post)
+        return b"".join(pieces)
+
+    for j in range(num_rows):
+        walls = grid.row(j)
+        row_start = j * num_cols
+
+        # The wall line above this row. Gaps on the path are the ones that
+        # lead down from the cell above:
+        gap_start = row_start - num_cols if j > 0 else None
+        line = wall_row(walls, TOP, gap_start)
+        for _ in range(wall_px):
+            yield line
+
+        # The floor of this row, with the walls between cells:
+        pieces = [wall_v if walls[0] & LEFT else floor_v]
+        for i in range(num_cols):
+            index = row_start + i
+            pieces.append(path_h if index in path_cells else floor_h)
+            if walls[i] & RIGHT:
+                pieces.append(wall_v)
+            elif index in right_gaps:
+                pieces.append(path_v)
+            else:
+                pieces.append(floor_v)
+        line = b"".join(pieces)
+        for _ in range(cell_px):
+            yield line
+
+    # The wall line under the last row:
+    line = wall_row(grid.row(num_rows - 1), BOTTOM, None)
+    for _ in range(wall_px):
+        yield line
+
+
+# Group pixel rows into strips of STRIP_ROWS rows:
+def _strips(rows, prefix=b""):
+    strip = []
+    for row in rows:
+        strip.append(prefix)
+        strip.append(row)
+        if len(strip) >= 2 * STRIP_ROWS:
+            yield b"".join(strip)
+            strip = []
+    if strip:
+        yield b"".join(strip)
+
+
+# Binary PPM (P6): a tiny text header, then the raw RGB pixels:
+def write_ppm(filename, grid, cell_px=4, wall_px=1, path=None):
+    width, height = image_size(grid, cell_px, wall_px)
+    with open(filename, "wb") as f:
+        f.write(f"P6\n{width} {height}\n255\n".encode("ascii"))
+        for strip in _strips(iter_pixel_rows(grid, cell_px, wall_px, path)):
+            f.write(strip)
+
+
+def _png_chunk(f, kind, data):
+    f.write(struct.pack(">I", len(data)))
+    f.write(kind)
+    f.write(data)
+    f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))))
+
+
+# PNG: 8-bit RGB, no filtering (every scanline starts with filter type 0).
+# Each strip is pushed through one zlib stream and written as its own IDAT
+# chunk, so the whole image is never held in memory:
+def write_png(filename, grid, cell_px=4, wall_px=1, path=None, level=6):
+    width, height = image_size(grid, cell_px, wall_px)
+    compressor = zlib.compressobj(level)
+    with open(filename, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        _png_chunk(f, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        for strip in _strips(iter_pixel_rows(grid, cell_px, wall_px, path), b"\x00"):
+            data = compressor.compress(strip)
+            if data:
+                _png_chunk(f, b"IDAT", data)
+        _png_chunk(f, b"IDAT", compressor.flush())
+        _png_chunk(f, b"IEND", b"")
+
+
+# Write a PNG or PPM, picked by the file name's extension:
+def write_image(filename, grid, cell_px=4, wall_px=1, path=None):
+    if filename.lower().endswith(".png"):
+        write_png(filename, grid, cell_px, wall_px, path)
+    elif filename.lower().endswith((".ppm", ".pnm")):
+        write_ppm(filename, grid, cell_px, wall_px, path)
+    else:
+        raise ValueError(f"don't know how to write {filename!r}: use .png or .ppm")
@@ -0,0 +1,419 @@
+from array import array
+from collections import deque
+from grid import LEFT, RIGHT, TOP, BOTTOM
+import heapq
+import time
+
+# Shortest-path solvers. Maze.solve() only answers "can the end be reached?"
+# with a depth-first search; these find the actual shortest route between
+# any two cells, which matters once a maze has loops in it.
+#
+# Every solver takes the same arguments:
+#
+#   grid   the Grid to search (only the wall bits are read)
+#   start  index of the first cell (grid.index(i, j))
+#   goal   index of the last cell
+#
+# and returns a SolveResult. None of them touch the VISITED bits, so they
+# can run on a maze at any time, as often as you like. Grids with a topology
+# (see topology.py) are searched the same way, with the topology saying
+# which cells are open to each other.
+
+
+class SolveResult:
+    def __init__(self, solver, path, nodes_expanded, elapsed):
+        self.solver = solver
+        # The cells on the path as (i, j) pairs, start and goal included.
+        # Empty if the goal can't be reached:
+        self.path = path
+        # How many cells the solver took off its queue and looked around:
+        self.nodes_expanded = nodes_expanded
+        # Wall-clock seconds the search took:
+        self.elapsed = elapsed
+
+    @property
+    def found(self):
+        return len(self.path) > 0
+
+    # Number of moves from start to goal (one less than the number of cells):
+    @property
+    def length(self):
+        return len(self.path) - 1
+
+    def __repr__(self):
+        return (
+            f"SolveResult(solver={self.solver!r}, length={self.length}, "
+            f"nodes_expanded={self.nodes_expanded}, elapsed={self.elapsed:.6f})"
+        )
+
+
+# The cells you can walk to from `index`: neighbors with no wall in between,
+# in the order left, right, up, down. The bounds checks matter, because the
+# entrance and exit are holes in the outer wall:
+def _open_neighbors(data, index, num_cols, num_rows):
+    j, i = divmod(index, num_cols)
+    walls = data[index]
+    neighbors = []
+    if i > 0 and not walls & LEFT:
+        neighbors.append(index - 1)
+    if i < num_cols - 1 and not walls & RIGHT:
+        neighbors.append(index + 1)
+    if j > 0 and not walls & TOP:
+        neighbors.append(index - num_cols)
+    if j < num_rows - 1 and not walls & BOTTOM:
+        neighbors.append(index + num_cols)
+    return neighbors
+
+
+# The open-neighbor function to search a grid with: _open_neighbors() for
+# square grids, or the topology's, which is called the same way:
+def _open_neighbors_for(grid):
+    if grid.topology is None:
+        return _open_neighbors
+    return grid.topology.open_neighbors
+
+
+# Follow parent links back from `goal` to `start` and return the path as
+# (i, j) pairs in walking order. parent[start] must be start itself:
+def _trace(parent, start, goal, num_cols):
+    if parent[goal] < 0:
+        return []
+    path = []
+    index = goal
+    while index != start:
+        path.append(index)
+        index = parent[index]
+    path.append(start)
+    path.reverse()
+    return [(index % num_cols, index // num_cols) for index in path]
+
+
+# Breadth-first search. Explores the maze in rings of equal distance from
+# the start, so the first time it reaches the goal is along a shortest path:
+def bfs(grid, start, goal):
+    started = time.perf_counter()
+    data = grid.data
+    num_cols = grid.num_cols
+    num_rows = grid.num_rows
+    open_neighbors = _open_neighbors_for(grid)
+
+    parent = array("q", [-1]) * (num_cols * num_rows)
+    parent[start] = start
+    queue = deque([start])
+    nodes_expanded = 0
+    while queue:
+        index = queue.popleft()
+        nodes_expanded += 1
+        if index == goal:
+            break
+        for next_index in open_neighbors(data, index, num_cols, num_rows):
+            if parent[next_index] < 0:
+                parent[next_index] = index
+                queue.append(next_index)
+
+    path = _trace(parent, start, goal, num_cols)
+    return SolveResult("bfs", path, nodes_expanded, time.perf_counter() - started)
+
+
+# A*: always expands the cell with the lowest (distance so far + Manhattan
+# distance to the goal). The Manhattan distance never overestimates in a
+# grid, so the path is still a shortest one, but the search heads for the
+# goal instead of spreading out evenly. Ties go to the cell closer to the
+# goal. Grids with a topology use its own distance instead of Manhattan:
+def astar(grid, start, goal):
+    started = time.perf_counter()
+    data = grid.data
+    num_cols = grid.num_cols
+    num_rows = grid.num_rows
+    open_neighbors = _open_neighbors_for(grid)
+    goal_j, goal_i = divmod(goal, num_cols)
+
+    if grid.topology is None:
+        def heuristic(index):
+            j, i = divmod(index, num_cols)
+            return abs(i - goal_i) + abs(j - goal_j)
+    else:
+        # Other topologies have their own distance that never overestimates:
+        estimate = grid.topology.distance
+
+        def heuristic(index):
+            return estimate(index, goal)
+
+    num_cells = num_cols * num_rows
+    parent = array("q", [-1]) * num_cells
+    distance = array("q", [-1]) * num_cells
+    closed = bytearray(num_cells)
+    parent[start] = start
+    distance[start] = 0
+    h = heuristic(start)
+    heap = [(h, h, start)]
+    nodes_expanded = 0
+    while heap:
+        _, _, index = heapq.heappop(heap)
+        if closed[index]:
+            continue
+        closed[index] = 1
+        nodes_expanded += 1
+        if index == goal:
+            break
+        next_distance = distance[index] + 1
+        for next_index in open_neighbors(data, index, num_cols, num_rows):
+            if closed[next_index]:
+                continue
+            if distance[next_index] < 0 or next_distance < distance[next_index]:
+                distance[next_index] = next_distance
+                parent[next_index] = index
+                h = heuristic(next_index)
+                heapq.heappush(heap, (next_distance + h, h, next_index))
+
+    path = _trace(parent, start, goal, num_cols)
+    return SolveResult("astar", path, nodes_expanded, time.perf_counter() - started)
+
+
+# Bidirectional BFS: one breadth-first search from the start and one from
+# the goal, taking turns a whole ring at a time (always growing the smaller
+# frontier). The search stops after the first ring in which the two sides
+# meet, keeping the shortest of the meeting points found in that ring. On a
+# big maze each side only explores about half as far as plain BFS would:
+def bidirectional_bfs(grid, start, goal):
+    started = time.perf_counter()
+    data = grid.data
+    num_cols = grid.num_cols
+    num_rows = grid.num_rows
+    open_neighbors = _open_neighbors_for(grid)
+    num_cells = num_cols * num_rows
+
+    if start == goal:
+        path = [(start % num_cols, start // num_cols)]
+        return SolveResult("bidirectional_bfs", path, 1, time.perf_counter() - started)
+
+    # parent/distance arrays for the forward (start) and backward (goal) sides:
+    parents = (array("q", [-1]) * num_cells, array("q", [-1]) * num_cells)
+    distances = (array("q", [-1]) * num_cells, array("q", [-1]) * num_cells)
+    frontiers = ([start], [goal])
+    parents[0][start] = start
+    distances[0][start] = 0
+    parents[1][goal] = goal
+    distances[1][goal] = 0
+
+    nodes_expanded = 0
+    best = None
+    while frontiers[0] and frontiers[1] and best is None:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        parent, distance = parents[side], distances[side]
+        other_distance = distances[1 - side]
+        next_frontier = []
+        for index in frontiers[side]:
+            nodes_expanded += 1
+            for next_index in open_neighbors(data, index, num_cols, num_rows):
+                if distance[next_index] >= 0:
+                    continue
+                parent[next_index] = index
+                distance[next_index] = distance[index] + 1
+                next_frontier.append(next_index)
+                if other_distance[next_index] >= 0:
+                    total = distance[next_index] + other_distance[next_index]
+                    if best is None or total < best[0]:
+                        best = (total, next_index)
+        frontiers = (
+            (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+        )
+
+    path = []
+    if best is not None:
+        meet = best[1]
+        # start -> meet from the forward side, then meet -> goal from the backward side:
+        path = _trace(parents[0], start, meet, num_cols)
+        index = meet
+        while index != goal:
+            index = parents[1][index]
+            path.append((index % num_cols, index // num_cols))
+    return SolveResult(
+        "bidirectional_bfs", path, nodes_expanded, time.perf_counter() - started
+    )
+
+
+# Every solver by name. Maze.find_path(solver="astar") looks names up here:
+SOLVERS = {
+    "bfs": bfs,
+    "astar": astar,
+    "bidirectional_bfs": bidirectional_bfs,
+}
+
+
+# Distance from every cell to `goal` (-1 where the goal can't be reached),
+# with one breadth-first search out from the goal. Returns (distances, number
+# of cells reached):
+def _distances_to(grid, goal):
+    data = grid.data
+    num_cols = grid.num_cols
+    num_rows = grid.num_rows
+    open_neighbors = _open_neighbors_for(grid)
+    distance = array("q", [-1]) * (num_cols * num_rows)
+    distance[goal] = 0
+    frontier = [goal]
+    steps = 0
+    reached = 1
+    while frontier:
+        steps += 1
+        next_frontier = []
+        for index in frontier:
+            for next_index in open_neighbors(data, index, num_cols, num_rows):
+                if distance[next_index] < 0:
+                    distance[next_index] = steps
+                    next_frontier.append(next_index)
+        reached += len(next_frontier)
+        frontier = next_frontier
+    return distance, reached
+
+
+# The k shortest loopless paths from start to goal, shortest first, with
+# Yen's algorithm. Every path found so far is "spurred": for each cell on it,
+# look for the best way to the goal that follows the path up to that cell and
+# then leaves it somewhere no earlier path has. The best spur found that way
+# becomes the next path. Spurs are only taken from where a path left its
+# parent path onward (Lawler's shortcut), since spurs before that were
+# already tried from the parent.
+#
+# Each spur is found with A*, guided by the exact distances to the goal in
+# the whole maze. Blocking cells only ever makes paths longer, so those
+# distances never overestimate. A few more things keep the searches small on
+# big mazes:
+#
+#   - Where the rest of the path is already as short as it could be (its
+#     length equals the cell's distance to the goal), a search that reaches
+#     it is finished: it can't do better than following the path home.
+#   - Once there are enough candidates to fill the k paths, spurs are only
+#     searched up to the length of the worst candidate that could still
+#     make it.
+#   - When a spur can't reach the goal at all, every cell it searched can
+#     only get out through cells that stay blocked for the rest of the path,
+#     so they're blocked too and later spurs don't search them again.
+#
+# In a perfect maze there's only ever one path; braid the maze first
+# (generators.braid) to get more. Returns a list of up to k SolveResults.
+# nodes_expanded and elapsed on each are for the whole search so far:
+def k_shortest_paths(grid, start, goal, k):
+    started = time.perf_counter()
+    data = grid.data
+    num_cols = grid.num_cols
+    num_rows = grid.num_rows
+    open_neighbors = _open_neighbors_for(grid)
+
+    def result(path):
+        cells = [(index % num_cols, index // num_cols) for index in path]
+        return SolveResult("yen", cells, nodes_expanded, time.perf_counter() - started)
+
+    # A* from path[i] to the goal. Cells in `blocked` can't be entered, and
+    # neither can the cells in `blocked_first` straight from path[i]. Paths of
+    # more than `limit` moves aren't looked for. `finish` maps the cells of
+    # the path whose rest is as short as possible to their positions.
+    # Returns (spur path or None, nodes expanded, dead), where dead is the set
+    # of cells searched if the goal can't be reached whatever the limit:
+    def spur_path(path, i, blocked, blocked_first, limit, finish):
+        spur = path[i]
+        parent = {spur: spur}
+        distance = {spur: 0}
+        closed = set()
+        heap = [(to_goal[spur], to_goal[spur], spur)]
+        expanded = 0
+        cut_off = False
+        while heap:
+            f, _, index = heapq.heappop(heap)
+            if index in closed:
+                continue
+            if f > limit:
+                cut_off = True
+                break
+            closed.add(index)
+            position = finish.get(index, -1)
+            if position > i:
+                route = [index]
+                while index != spur:
+                    index = parent[index]
+                    route.append(index)
+                route.reverse()
+                return route + path[position + 1:], expanded, None
+            expanded += 1
+            next_distance = distance[index] + 1
+            for next_index in open_neighbors(data, index, num_cols, num_rows):
+                if next_index in blocked or next_index in closed or to_goal[next_index] < 0:
+                    continue
+                if index == spur and next_index in blocked_first:
+                    continue
+                if next_index not in distance or next_distance < distance[next_index]:
+                    distance[next_index] = next_distance
+                    parent[next_index] = index
+                    h = to_goal[next_index]
+                    heapq.heappush(heap, (next_distance + h, h, next_index))
+        return None, expanded, None if cut_off else closed
+
+    to_goal, nodes_expanded = _distances_to(grid, goal)
+    if k < 1 or to_goal[start] < 0:
+        return []
+
+    # The shortest path walks downhill in to_goal all the way:
+    path = [start]
+    index = start
+    while index != goal:
+        for next_index in open_neighbors(data, index, num_cols, num_rows):
+            if to_goal[next_index] == to_goal[index] - 1:
+                index = next_index
+                break
+        path.append(index)
+
+    found = [path]
+    results = [result(path)]
+    # Candidates as (length, tie breaker, path, cell it deviates at):
+    candidates = []
+    seen = {tuple(path)}
+    deviation = 0
+    counter = 0
+    while len(found) < k:
+        path = found[-1]
+        # The cells from which the rest of the path is as short as can be:
+        finish = {}
+        for position in range(len(path) - 1, deviation, -1):
+            if to_goal[path[position]] != len(path) - 1 - position:
+                break
+            finish[path[position]] = position
+        # Earlier paths that share this path's cells up to the spur cell, so
+        # far (the spur can't leave the same way they did):
+        sharing = [other for other in found[:-1] if other[:deviation] == path[:deviation]]
+        blocked = set(path[:deviation])
+        # No use looking for paths longer than the candidate that would come
+        # in last, if there are already enough candidates:
+        wanted = k - len(found)
+        limit = float("inf")
+        if len(candidates) >= wanted:
+            limit = heapq.nsmallest(wanted, candidates)[-1][0] - 1
+        for i in range(deviation, len(path) - 1):
+            spur = path[i]
+            sharing = [
+                other for other in sharing if len(other) > i and other[i] == spur
+            ]
+            blocked_first = {other[i + 1] for other in sharing}
+            blocked_first.add(path[i + 1])
+            rest, expanded, dead = spur_path(
+                path, i, blocked, blocked_first, limit - i, finish
+            )
+            nodes_expanded += expanded
+            blocked.add(spur)
+            if dead is not None:
+                blocked |= dead
+            if rest is None:
+                continue
+            candidate = path[:i] + rest
+            key = tuple(candidate)
+            if key in seen:
+                continue
+            seen.add(key)
+            counter += 1
+            heapq.heappush(candidates, (len(candidate), counter, candidate, i))
+
+        if not candidates:
+            break
+        _, _, path, deviation = heapq.heappop(candidates)
+        found.append(path)
+        results.append(result(path))
+    return results
@@ -0,0 +1,50 @@
+from generators import eller_rows
+from grid import LEFT, RIGHT, TOP, BOTTOM, WALLS
+from mazefile import pack_row, write_header
+import random
+
+# Streaming maze generation, for mazes far too tall to hold in memory. Rows
+# come out of Eller's algorithm one at a time, and only the current row (plus
+# the previous row's bottom walls) is ever kept, so memory is O(num_cols) no
+# matter how many rows there are.
+#
+# The rows match what Maze(..., seed=seed, generator="eller") builds, cell
+# for cell, including the entrance at the top of the first cell and the exit
+# at the bottom of the last one.
+
+
+# Yield each row of the maze as a bytearray with one wall bitmask per cell
+# (the same bits as grid.py). The RNG is local to the generator, so several
+# streams can run side by side without disturbing each other. Like Maze, a
+# seed of 0 or None means "no seed":
+def iter_rows(num_cols, num_rows, seed=None):
+    rng = random.Random(seed) if seed else random.Random()
+    above = bytearray(b"\x01") * num_cols
+    for j, right_walls, down_walls in eller_rows(num_cols, num_rows, rng):
+        row = bytearray([WALLS]) * num_cols
+        for i in range(num_cols):
+            walls = WALLS
+            if i > 0 and not right_walls[i - 1]:
+                walls &= ~LEFT
+            if not right_walls[i]:
+                walls &= ~RIGHT
+            if j > 0 and not above[i]:
+                walls &= ~TOP
+            if not down_walls[i]:
+                walls &= ~BOTTOM
+            row[i] = walls
+        if j == 0:
+            row[0] &= ~TOP
+        if j == num_rows - 1:
+            row[num_cols - 1] &= ~BOTTOM
+        above = down_walls
+        yield row
+
+
+# Generate a maze straight into a maze file (see mazefile.py), one row at a
+# time, without ever holding more than a row in memory:
+def write_stream(path, num_cols, num_rows, seed=None):
+    with open(path, "wb") as f:
+        write_header(f, num_cols, num_rows, seed, "eller")
+        for row in iter_rows(num_cols, num_rows, seed):
+            f.write(pack_row(row))
@@ -1,6 +1,142 @@
+import contextlib
+import json
+import mmap
+import os
+import random
+import struct
+import subprocess
+import sys
+import tempfile
 import unittest
+from unittest import mock
+import zlib
 
+import analysis
+import batch
+from cell import Cell
+import cli
+import events
+from instrument import MazeStats
+from generators import dead_ends, GENERATORS
+from graphics import Line, LineBatch, Point, StepRunner
+from grid import Grid, RIGHT, VISITED, WALLS
 from maze import Maze
+import mazefile
+from pathindex import StaleIndexError
+import raster
+from solvers import SOLVERS
+from topology import Hex, Layers, Square, Triangle
+import stream
+
+
+# Stands in for a Tk canvas, counting what gets done to it:
+class FakeCanvas:
+    def __init__(self):
+        self.created = 0
+        self.configured = 0
+        # item id -> fill color, for the items still on the canvas:
+        self.items = {}
+
+    def create_line(self, *args, fill="black", **kwargs):
+        self.created += 1
+        self.items[self.created] = fill
+        return self.created
+
+    def itemconfigure(self, item, fill="black", **kwargs):
+        self.configured += 1
+        self.items[item] = fill
+
+    def delete(self, item):
+        del self.items[item]
+
+
+# Stands in for graphics.Window, without opening a window or sleeping:
+class FakeWindow:
+    def __init__(self):
+        self.canvas = FakeCanvas()
+        self.lines = LineBatch(self.canvas)
+
+    def draw_line(self, line, fill_color="black"):
+        self.lines.draw_line(line, fill_color)
+
+    def erase_line(self, line):
+        self.lines.erase_line(line)
+
+    def animate(self):
+        self.lines.flush()
+
+    def redraw(self):
+        self.lines.flush()
+
+
+# Stands in for a Tk root: after() just remembers the callbacks, and the test
+# runs them by hand with run_pending():
+class FakeRoot:
+    def __init__(self):
+        self.pending = {}
+        self.next_id = 0
+        self.last_ms = None
+
+    def after(self, ms, callback):
+        self.last_ms = ms
+        self.next_id += 1
+        self.pending[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        del self.pending[after_id]
+
+    def run_pending(self):
+        pending, self.pending = self.pending, {}
+        for callback in pending.values():
+            callback()
+
+
+# Every mmap opened inside the with block, so a test can check they were all
+# closed again:
+@contextlib.contextmanager
+def opened_mmaps():
+    opened = []
+    real_mmap = mmap.mmap
+
+    def record(*args, **kwargs):
+        buf = real_mmap(*args, **kwargs)
+        opened.append(buf)
+        return buf
+
+    with mock.patch("mmap.mmap", record):
+        yield opened
+
+
+# Number of open walls between neighboring cells:
+def count_passages(maze):
+    passages = 0
+    for i, col in enumerate(maze._cells):
+        for j, cell in enumerate(col):
+            if i < maze._num_cols - 1 and not cell.has_right_wall:
+                passages += 1
+            if j < maze._num_rows - 1 and not cell.has_bottom_wall:
+                passages += 1
+    return passages
+
+
+# Number of cells reachable from the top-left cell:
+def count_reachable(maze):
+    seen = {(0, 0)}
+    stack = [(0, 0)]
+    while stack:
+        i, j = stack.pop()
+        cell = maze._cells[i][j]
+        for open_wall, next_cell in (
+            (not cell.has_left_wall and i > 0, (i - 1, j)),
+            (not cell.has_right_wall and i < maze._num_cols - 1, (i + 1, j)),
+            (not cell.has_top_wall and j > 0, (i, j - 1)),
+            (not cell.has_bottom_wall and j < maze._num_rows - 1, (i, j + 1)),
+        ):
+            if open_wall and next_cell not in seen:
+                seen.add(next_cell)
+                stack.append(next_cell)
+    return len(seen)
 
 
 class Tests(unittest.TestCase):
@@ -41,6 +177,781 @@ class Tests(unittest.TestCase):
                     False,
                 )
 
+    def test_maze_break_walls_large_grid(self):
+        # Big enough that the old recursive version blew the default recursion limit:
+        num_cols = 200
+        num_rows = 200
+        m1 = Maze(0, 0, num_rows, num_cols, 10, 10, seed=1)
+        for col in m1._cells:
+            for cell in col:
+                self.assertEqual(
+                    cell.visited,
+                    False,
+                )
+
+    def test_maze_break_walls_same_seed_same_maze(self):
+        m1 = Maze(0, 0, 20, 30, 10, 10, seed=7)
+        m2 = Maze(0, 0, 20, 30, 10, 10, seed=7)
+        walls1 = [
+            (c.has_left_wall, c.has_right_wall, c.has_top_wall, c.has_bottom_wall)
+            for col in m1._cells for c in col
+        ]
+        walls2 = [
+            (c.has_left_wall, c.has_right_wall, c.has_top_wall, c.has_bottom_wall)
+            for col in m2._cells for c in col
+        ]
+        self.assertEqual(walls1, walls2)
+
+    def test_maze_cells_are_packed_one_byte_each(self):
+        num_cols = 12
+        num_rows = 10
+        m1 = Maze(0, 0, num_rows, num_cols, 10, 10)
+        self.assertEqual(
+            len(m1._cells.data),
+            num_cols * num_rows,
+        )
+
+    def test_grid_cell_view_writes_through(self):
+        m1 = Maze(0, 0, 10, 12, 10, 10, seed=3)
+        m1._cells[4][5].has_left_wall = True
+        m1._cells[4][5].visited = True
+        self.assertEqual(m1._cells[4][5].has_left_wall, True)
+        self.assertEqual(m1._cells[4][5].visited, True)
+        m1._reset_cells_visited()
+        self.assertEqual(m1._cells[4][5].visited, False)
+        self.assertEqual(m1._cells[4][5].has_left_wall, True)
+
+    def test_maze_headless_solve(self):
+        m1 = Maze.headless(40, 50, seed=5)
+        self.assertEqual(m1.is_headless, True)
+        self.assertEqual(m1.solve(), True)
+
+    def test_cell_draw_move_without_window(self):
+        m1 = Maze.headless(10, 12, seed=5)
+        # Used to raise a TypeError because the cells were never given coordinates:
+        m1._cells[0][0].draw_move(m1._cells[1][0])
+        Cell().draw_move(Cell())
+
+    def test_maze_generators_make_perfect_mazes(self):
+        num_cols = 12
+        num_rows = 10
+        for name in GENERATORS:
+            m1 = Maze(0, 0, num_rows, num_cols, 10, 10, seed=11, generator=name)
+            # A perfect maze is a spanning tree: every cell is reachable and there
+            # is exactly one fewer passage than there are cells:
+            self.assertEqual(count_passages(m1), num_cols * num_rows - 1, name)
+            self.assertEqual(count_reachable(m1), num_cols * num_rows, name)
+            self.assertEqual(m1._cells[0][0].has_top_wall, False, name)
+            self.assertEqual(
+                m1._cells[num_cols - 1][num_rows - 1].has_bottom_wall, False, name
+            )
+
+    def test_maze_generators_honor_seed(self):
+        for name in GENERATORS:
+            m1 = Maze.headless(15, 15, seed=4, generator=name)
+            m2 = Maze.headless(15, 15, seed=4, generator=name)
+            self.assertEqual(m1._cells.data, m2._cells.data, name)
+
+    def test_maze_unknown_generator(self):
+        with self.assertRaises(ValueError):
+            Maze.headless(5, 5, generator="nope")
+
+    def test_stream_rows_match_eller_maze(self):
+        num_cols = 12
+        num_rows = 10
+        m1 = Maze.headless(num_rows, num_cols, seed=8, generator="eller")
+        rows = list(stream.iter_rows(num_cols, num_rows, seed=8))
+        self.assertEqual(len(rows), num_rows)
+        self.assertEqual(b"".join(rows), bytes(m1._cells.data))
+
+    def test_stream_seed_zero_means_no_seed(self):
+        # Same rule as Maze: seed 0 isn't a seed, so two streams differ.
+        first = b"".join(stream.iter_rows(30, 30, seed=0))
+        second = b"".join(stream.iter_rows(30, 30, seed=0))
+        self.assertNotEqual(first, second)
+
+    def test_stream_write_to_disk(self):
+        num_cols = 9
+        num_rows = 300
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tall.maze")
+            stream.write_stream(path, num_cols, num_rows, seed=2)
+            with open(path, "rb") as f:
+                data = f.read()
+        self.assertEqual(
+            mazefile.read_header(data), (num_cols, num_rows, 2, "eller")
+        )
+        packed = data[mazefile.HEADER_SIZE:]
+        size = mazefile.row_bytes(num_cols)
+        self.assertEqual(len(packed), size * num_rows)
+        rows = list(stream.iter_rows(num_cols, num_rows, seed=2))
+        for j in range(num_rows):
+            self.assertEqual(
+                mazefile.unpack_row(packed[j * size:(j + 1) * size], num_cols),
+                rows[j],
+            )
+
+    def test_maze_solve_large_grid(self):
+        # Deep enough that the old recursive _solve_r hit the recursion limit:
+        m1 = Maze.headless(150, 150, seed=2)
+        self.assertEqual(m1.solve(), True)
+
+    def test_maze_find_path_solvers_agree(self):
+        num_cols = 30
+        num_rows = 20
+        m1 = Maze.headless(num_rows, num_cols, seed=6)
+        lengths = set()
+        for name in SOLVERS:
+            result = m1.find_path(name)
+            self.assertEqual(result.found, True, name)
+            self.assertEqual(result.path[0], (0, 0), name)
+            self.assertEqual(result.path[-1], (num_cols - 1, num_rows - 1), name)
+            self.assertGreater(result.nodes_expanded, 0, name)
+            for (i, j), (next_i, next_j) in zip(result.path, result.path[1:]):
+                self.assertEqual(abs(i - next_i) + abs(j - next_j), 1, name)
+            lengths.add(result.length)
+        self.assertEqual(len(lengths), 1)
+
+    def test_maze_find_path_takes_shortcuts(self):
+        m1 = Maze.headless(10, 10, seed=3)
+        # Open every wall: the shortest path is now a straight staircase:
+        m1._cells.data[:] = bytes(len(m1._cells.data))
+        for name in SOLVERS:
+            result = m1.find_path(name, (0, 0), (9, 9))
+            self.assertEqual(result.length, 18, name)
+
+    def test_maze_find_path_unreachable(self):
+        m1 = Maze.headless(5, 5, seed=3)
+        m1._cells.data[:] = bytes([WALLS]) * 25
+        for name in SOLVERS:
+            self.assertEqual(m1.find_path(name).found, False, name)
+
+    @unittest.skipIf(not analysis.has_numpy(), "NumPy is not installed")
+    def test_maze_numpy_round_trip(self):
+        m1 = Maze.headless(10, 12, seed=9)
+        walls = m1.to_numpy()
+        self.assertEqual(walls.shape, (10, 12))
+        m2 = Maze.from_numpy(walls)
+        self.assertEqual(m2._cells.data, m1._cells.data)
+        walls[0, 0] ^= RIGHT
+        with self.assertRaises(ValueError):
+            Maze.from_numpy(walls)
+
+    @unittest.skipIf(not analysis.has_numpy(), "NumPy is not installed")
+    def test_analysis_matches_maze(self):
+        num_cols = 12
+        num_rows = 10
+        m1 = Maze.headless(num_rows, num_cols, seed=9, generator="prim")
+        walls = m1.to_numpy()
+        degrees = analysis.degrees(walls)
+        # A spanning tree has 2 * (cells - 1) passage ends:
+        self.assertEqual(int(degrees.sum()), 2 * (num_cols * num_rows - 1))
+        self.assertEqual(
+            int(analysis.dead_ends(walls).sum()), int((degrees == 1).sum())
+        )
+        indptr, indices = analysis.to_csr(walls)
+        self.assertEqual(len(indices), 2 * (num_cols * num_rows - 1))
+        self.assertEqual(bool(analysis.reachable(walls).all()), True)
+        distances = analysis.distances(walls)
+        self.assertEqual(
+            int(distances[num_rows - 1, num_cols - 1]), m1.find_path().length
+        )
+        # Wall off the top-left cell and it can't be reached any more:
+        m1._cells[0][0].has_right_wall = True
+        m1._cells[1][0].has_left_wall = True
+        m1._cells[0][0].has_bottom_wall = True
+        m1._cells[0][1].has_top_wall = True
+        walls = m1.to_numpy()
+        self.assertEqual(int(analysis.reachable(walls, (0, 0)).sum()), 1)
+        self.assertEqual(bool(analysis.reachable(walls, (5, 5))[0, 0]), False)
+
+    def test_maze_save_and_load(self):
+        m1 = Maze.headless(10, 13, seed=12, generator="kruskal")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "saved.maze")
+            m1.save(path)
+            # Header plus 4 bits per cell, each row rounded up to a whole byte:
+            self.assertEqual(
+                os.path.getsize(path), mazefile.HEADER_SIZE + 7 * 10
+            )
+            for in_memory in (False, True):
+                with Maze.load(path, in_memory=in_memory) as m2:
+                    self.assertEqual(m2._seed, 12)
+                    self.assertEqual(m2._generator, "kruskal")
+                    self.assertEqual(m2._cells.tobytes(), m1._cells.tobytes())
+                    self.assertEqual(m2.find_path().path, m1.find_path().path)
+                    self.assertEqual(m2.solve(), True)
+                    self.assertEqual(m2._cells[12][9].has_bottom_wall, False)
+            # Closing a loaded maze lets go of the mapping; closing one in
+            # memory does nothing:
+            m2 = Maze.load(path)
+            m2.close()
+            with self.assertRaises(ValueError):
+                m2._cells.tobytes()
+            m1.close()
+            self.assertGreater(m1.find_path().length, 0)
+
+    def test_maze_load_rejects_other_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "not.maze")
+            with open(path, "wb") as f:
+                f.write(b"definitely not a maze file, just some bytes" * 2)
+            with opened_mmaps() as opened:
+                with self.assertRaises(mazefile.MazeFileError):
+                    Maze.load(path)
+            # The file was mapped to read the header, and let go of again:
+            self.assertEqual(len(opened), 1)
+            self.assertTrue(opened[0].closed)
+
+    def test_maze_seed_does_not_touch_global_random(self):
+        random.seed(99)
+        expected = random.random()
+        random.seed(99)
+        Maze.headless(10, 12, seed=5)
+        self.assertEqual(random.random(), expected)
+
+    def test_batch_results_in_order(self):
+        specs = [(8 + k % 3, 9, k + 1) for k in range(12)]
+        for workers in (1, 2):
+            results = list(batch.generate_batch(specs, workers=workers))
+            self.assertEqual(len(results), len(specs))
+            for (num_rows, num_cols, seed), packed in zip(specs, results):
+                self.assertEqual(
+                    (packed.num_rows, packed.num_cols, packed.seed),
+                    (num_rows, num_cols, seed),
+                )
+                self.assertEqual(
+                    packed.to_maze()._cells.tobytes(),
+                    Maze.headless(num_rows, num_cols, seed)._cells.tobytes(),
+                )
+
+    def test_line_batch_reuses_canvas_items(self):
+        canvas = FakeCanvas()
+        lines = LineBatch(canvas)
+        lines.draw_line(Line(Point(0, 0), Point(10, 0)))
+        # The same line drawn backwards, then recolored, before a flush:
+        lines.draw_line(Line(Point(10, 0), Point(0, 0)), "white")
+        lines.draw_line(Line(Point(0, 0), Point(0, 10)))
+        lines.flush()
+        self.assertEqual(canvas.created, 2)
+        self.assertEqual(canvas.configured, 0)
+        lines.draw_line(Line(Point(0, 0), Point(10, 0)), "black")
+        lines.draw_line(Line(Point(0, 0), Point(0, 10)))
+        lines.flush()
+        self.assertEqual(canvas.created, 2)
+        self.assertEqual(canvas.configured, 1)
+        self.assertEqual(lines.item_count, 2)
+
+    def test_maze_drawing_keeps_item_count_bounded(self):
+        num_cols = 12
+        num_rows = 10
+        win = FakeWindow()
+        m1 = Maze(5, 5, num_rows, num_cols, 10, 10, win, seed=1)
+        m1.solve()
+        win.lines.flush()
+        walls = num_cols * (num_rows + 1) + num_rows * (num_cols + 1)
+        moves = num_cols * num_rows - 1
+        self.assertLessEqual(win.lines.item_count, walls + moves)
+        # Every wall was drawn, many of them several times, but each is one item:
+        self.assertGreaterEqual(win.lines.item_count, walls)
+
+    def test_raster_ppm(self):
+        num_cols = 4
+        num_rows = 3
+        m1 = Maze.headless(num_rows, num_cols, seed=2)
+        cell_px = 3
+        wall_px = 1
+        width, height = raster.image_size(m1._cells, cell_px, wall_px)
+        self.assertEqual((width, height), (17, 13))
+        rows = list(raster.iter_pixel_rows(m1._cells, cell_px, wall_px))
+        self.assertEqual(len(rows), height)
+        self.assertEqual({len(row) for row in rows}, {width * 3})
+
+        def pixel(x, y):
+            return rows[y][x * 3:x * 3 + 3]
+
+        # Corner posts are always wall, the entrance is open floor:
+        self.assertEqual(pixel(0, 0), raster.WALL_COLOR)
+        self.assertEqual(pixel(2, 0), raster.FLOOR_COLOR)
+        self.assertEqual(pixel(width - 3, height - 1), raster.FLOOR_COLOR)
+        self.assertEqual(pixel(width - 1, height - 1), raster.WALL_COLOR)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "maze.ppm")
+            m1.save_image(path, cell_px, wall_px)
+            with open(path, "rb") as f:
+                data = f.read()
+        header = f"P6\n{width} {height}\n255\n".encode("ascii")
+        self.assertEqual(data, header + b"".join(rows))
+
+    def test_raster_png_with_path(self):
+        m1 = Maze.headless(6, 5, seed=2)
+        result = m1.find_path()
+        rows = list(raster.iter_pixel_rows(m1._cells, 2, 1, result.path))
+        painted = sum(row.count(raster.PATH_COLOR) for row in rows)
+        # Every cell on the path plus every gap between two of them:
+        self.assertEqual(painted, len(result.path) * 4 + result.length * 2)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "maze.png")
+            m1.save_image(path, 2, 1, result)
+            with open(path, "rb") as f:
+                data = f.read()
+        self.assertEqual(data[:8], b"\x89PNG\r\n\x1a\n")
+        # Pull the pixels back out of the IDAT chunks and compare:
+        pos = 8
+        compressed = b""
+        while pos < len(data):
+            (size,) = struct.unpack(">I", data[pos:pos + 4])
+            kind = data[pos + 4:pos + 8]
+            if kind == b"IDAT":
+                compressed += data[pos + 8:pos + 8 + size]
+            pos += size + 12
+        pixels = zlib.decompress(compressed)
+        self.assertEqual(pixels, b"".join(b"\x00" + row for row in rows))
+
+    def test_events_record_and_replay(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.events")
+            with events.EventRecorder(path) as recorder:
+                m1 = Maze.headless(8, 9, seed=5, recorder=recorder)
+                m1.solve()
+            # Every passage plus the entrance and exit, then the solve:
+            kinds = [event[0] for event in events.read_events(path)]
+            self.assertEqual(kinds.count(events.WALL_REMOVED), 8 * 9 - 1 + 2)
+            self.assertEqual(kinds.count(events.VISITED_CELL), kinds.count(events.MOVE) + 1)
+            self.assertEqual(len(kinds), recorder.count)
+
+            win = FakeWindow()
+            colors = win.canvas.items
+            player = events.Player(path, win)
+            self.assertEqual(len(player), recorder.count)
+            player.play(events_per_frame=50)
+            walls = bytes(b & WALLS for b in m1._cells.tobytes())
+            self.assertEqual(player.maze._cells.tobytes(), m1._cells.tobytes())
+            self.assertIn("red", colors.values())
+            # Jump back to just after the maze was carved, and forward again:
+            player.seek(kinds.index(events.VISITED_CELL))
+            self.assertEqual(player.maze._cells.tobytes(), walls)
+            # No moves yet, so the path is gone from the canvas too:
+            self.assertEqual(set(colors.values()), {"black", "white"})
+            player.skip_to_end()
+            player.seek(0)
+            self.assertEqual(player.maze._cells.tobytes(), bytes([WALLS]) * (8 * 9))
+            # Every wall up, and nothing else left on the canvas:
+            self.assertEqual(set(colors.values()), {"black"})
+            self.assertEqual(len(colors), 8 * 10 + 9 * 9)
+            player.skip_to_end()
+            self.assertEqual(player.position, len(player))
+            self.assertEqual(player.maze._cells.tobytes(), m1._cells.tobytes())
+            player.close()
+
+    def test_events_rejects_other_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "not.events")
+            with open(path, "wb") as f:
+                f.write(b"MAZE and then some more bytes")
+            with opened_mmaps() as opened:
+                with self.assertRaises(events.EventLogError):
+                    events.Player(path)
+            self.assertEqual(len(opened), 1)
+            self.assertTrue(opened[0].closed)
+
+    def test_maze_stats(self):
+        phases = []
+        stats = MazeStats(on_phase=lambda name, seconds, stats: phases.append(name))
+        m1 = Maze.headless(12, 10, seed=4, generator="prim", stats=stats)
+        self.assertIs(m1.stats, stats)
+        self.assertEqual(phases, ["create", "carve", "reset"])
+        # A perfect maze has one passage fewer than it has cells, plus the
+        # entrance and exit:
+        self.assertEqual(stats.walls_removed, 12 * 10 - 1 + 2)
+
+        self.assertEqual(m1.solve(), True)
+        visited = sum(1 for b in m1._cells.tobytes() if b & VISITED)
+        self.assertEqual(stats.cells_visited, visited)
+        # Every visited cell off the final path was backed out of:
+        path = m1.find_path(solver="bfs")
+        self.assertEqual(stats.backtracks, visited - len(path.path))
+        self.assertEqual(stats.max_stack_depth >= len(path.path), True)
+        self.assertEqual(stats.nodes_expanded, path.nodes_expanded)
+        self.assertEqual(phases[3:], ["solve", "find_path"])
+        self.assertEqual(sorted(stats.as_dict()["timings"]), sorted(set(phases)))
+        self.assertEqual(stats.draw_calls, 0)
+        self.assertEqual(Maze.headless(5, 5, seed=4).stats, None)
+
+    def test_maze_stats_counts_draw_calls(self):
+        stats = MazeStats()
+        m1 = Maze(0, 0, 4, 4, 10, 10, FakeWindow(), seed=3, stats=stats)
+        # Every cell once, the entrance and exit, then both cells of each carve:
+        self.assertEqual(stats.draw_calls, 16 + 2 + 2 * 15)
+        m1.solve()
+        self.assertEqual(stats.draw_calls, 48 + stats.cells_visited - 1 + stats.backtracks)
+
+    def test_maze_braid_removes_dead_ends(self):
+        m1 = Maze.headless(15, 12, seed=8)
+        before = count_passages(m1)
+        self.assertGreater(len(dead_ends(m1._cells)), 0)
+        removed = m1.braid(1.0)
+        self.assertEqual(count_passages(m1), before + removed)
+        self.assertEqual(dead_ends(m1._cells), [])
+        self.assertEqual(count_reachable(m1), 15 * 12)
+        for col in m1._cells:
+            for cell in col:
+                open_walls = 4 - sum(
+                    (cell.has_left_wall, cell.has_right_wall, cell.has_top_wall, cell.has_bottom_wall)
+                )
+                # The entrance and exit are holes in the outer wall, not passages:
+                if (cell._i, cell._j) in ((0, 0), (11, 14)):
+                    open_walls -= 1
+                self.assertEqual(open_walls > 1, True)
+        self.assertEqual(Maze.headless(15, 12, seed=8).braid(0.0), 0)
+        with self.assertRaises(ValueError):
+            m1.braid(1.5)
+
+    def test_maze_find_paths_matches_brute_force(self):
+        m1 = Maze.headless(5, 6, seed=21)
+        self.assertEqual(len(m1.find_paths(3)), 1)
+        m1.braid(0.5)
+        data = m1._cells.data
+        goal = 5 * 6 - 1
+
+        # Every loopless path from the entrance to the exit, the slow way:
+        lengths = []
+        def walk(path):
+            index = path[-1]
+            if index == goal:
+                lengths.append(len(path) - 1)
+                return
+            for wall, step in ((1, -1), (2, 1), (4, -6), (8, 6)):
+                next_index = index + step
+                if not data[index] & wall and 0 <= next_index <= goal and next_index not in path:
+                    walk(path + [next_index])
+        walk([0])
+        lengths.sort()
+
+        results = m1.find_paths(6)
+        self.assertEqual([result.length for result in results], lengths[:6])
+        self.assertEqual(results[0].length, m1.find_path().length)
+        self.assertEqual(len({tuple(result.path) for result in results}), len(results))
+
+    def test_path_index_matches_bfs(self):
+        m1 = Maze.headless(14, 11, seed=6, generator="kruskal")
+        index = m1.path_index()
+        self.assertIs(m1.path_index(), index)
+        rng = random.Random(3)
+        for _ in range(50):
+            a = (rng.randrange(11), rng.randrange(14))
+            b = (rng.randrange(11), rng.randrange(14))
+            result = m1.find_path(start=a, goal=b)
+            self.assertEqual(index.distance(a, b), result.length)
+            self.assertEqual(index.path(a, b), result.path)
+            # Asking again comes from the cache:
+            self.assertEqual(index.distance(a, b), result.length)
+        self.assertEqual(index.ancestor((3, 5), (0, 0)), (0, 0))
+        self.assertEqual(index.distance((4, 4), (4, 4)), 0)
+        self.assertEqual(index.cache_info()["distance"].hits, 50)
+        with self.assertRaises(ValueError):
+            index.distance((0, 0), (11, 0))
+
+    def test_path_index_goes_stale_when_walls_change(self):
+        m1 = Maze.headless(8, 8, seed=2)
+        index = m1.path_index()
+        # Visiting cells doesn't change any walls:
+        m1.solve()
+        self.assertEqual(index.is_stale, False)
+        # Put a wall up across the path to the exit, from both sides:
+        (i, j), (next_i, next_j) = index.path((0, 0), (7, 7))[3:5]
+        cell = m1._cells[i][j]
+        next_cell = m1._cells[next_i][next_j]
+        if next_i > i:
+            cell.has_right_wall = next_cell.has_left_wall = True
+        elif next_i < i:
+            cell.has_left_wall = next_cell.has_right_wall = True
+        elif next_j > j:
+            cell.has_bottom_wall = next_cell.has_top_wall = True
+        else:
+            cell.has_top_wall = next_cell.has_bottom_wall = True
+        self.assertEqual(index.is_stale, True)
+        with self.assertRaises(StaleIndexError):
+            index.distance((0, 0), (7, 7))
+        # Some cells are cut off now:
+        with self.assertRaises(ValueError):
+            m1.path_index()
+
+        m2 = Maze.headless(8, 8, seed=2)
+        m2.path_index()
+        m2.braid(1.0)
+        # Loops:
+        with self.assertRaises(ValueError):
+            m2.path_index()
+
+    def test_maze_tiled_is_perfect(self):
+        for num_rows, num_cols, block_size in ((23, 17, 5), (8, 8, 8), (3, 40, 6)):
+            m1 = Maze.tiled(num_rows, num_cols, seed=13, block_size=block_size, workers=1)
+            # A spanning tree: every cell reachable, one passage fewer than cells:
+            self.assertEqual(count_reachable(m1), num_rows * num_cols)
+            self.assertEqual(count_passages(m1), num_rows * num_cols - 1)
+            self.assertEqual(m1._cells[0][0].has_top_wall, False)
+            self.assertEqual(m1.solve(), True)
+        # Same seed, same maze, whether it's built here or in worker processes:
+        m2 = Maze.tiled(30, 30, seed=5, generator="kruskal", block_size=10, workers=1)
+        m3 = Maze.tiled(30, 30, seed=5, generator="kruskal", block_size=10, workers=2)
+        self.assertEqual(m2._cells.tobytes(), m3._cells.tobytes())
+
+    def test_maze_open_and_close_wall(self):
+        m1 = Maze.headless(6, 6, seed=9)
+        closed = (m1._cells[2][3].has_right_wall, m1._cells[3][3].has_left_wall)
+        self.assertEqual(closed[0], closed[1])
+        changed = m1.close_wall((2, 3), (3, 3)) if not closed[0] else m1.open_wall((3, 3), (2, 3))
+        self.assertEqual(changed, True)
+        self.assertEqual(m1._cells[2][3].has_right_wall, not closed[0])
+        self.assertEqual(m1._cells[3][3].has_left_wall, not closed[0])
+        # Nothing to do the second time:
+        self.assertEqual(m1.close_wall((2, 3), (3, 3)), False if not closed[0] else True)
+        with self.assertRaises(ValueError):
+            m1.open_wall((0, 0), (2, 0))
+        with self.assertRaises(ValueError):
+            m1.open_wall((5, 0), (6, 0))
+
+    def test_incremental_solver_tracks_wall_changes(self):
+        m1 = Maze.headless(12, 10, seed=17)
+        m1.braid(0.5)
+        solver = m1.incremental_solver()
+        self.assertEqual(solver.solve().path, m1.find_path().path)
+        rng = random.Random(4)
+        for _ in range(40):
+            i, j = rng.randrange(9), rng.randrange(12)
+            other = (i + 1, j) if rng.randrange(2) or j == 11 else (i, j + 1)
+            if rng.randrange(2):
+                m1.open_wall((i, j), other)
+            else:
+                m1.close_wall((i, j), other)
+            result = solver.solve()
+            self.assertEqual(result.length, m1.find_path().length)
+            for (i, j), (next_i, next_j) in zip(result.path, result.path[1:]):
+                self.assertEqual(abs(next_i - i) + abs(next_j - j), 1)
+
+    def test_events_replay_closed_walls(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.events")
+            with events.EventRecorder(path) as recorder:
+                m1 = Maze.headless(5, 5, seed=3, recorder=recorder)
+                m1.close_wall((0, 0), (1, 0))
+                m1.close_wall((0, 0), (0, 1))
+                m1.open_wall((2, 2), (3, 2))
+            player = events.Player(path)
+            player.skip_to_end()
+            self.assertEqual(player.maze._cells.tobytes(), m1._cells.tobytes())
+            player.close()
+
+    def test_step_runner_pauses_and_goes_idle(self):
+        root = FakeRoot()
+        frames = []
+        done = []
+        runner = StepRunner(
+            root,
+            range(10),
+            steps_per_frame=3,
+            on_frame=lambda: frames.append(1),
+            on_done=lambda: done.append(1),
+        )
+        runner.start()
+        root.run_pending()
+        self.assertEqual(runner.count, 3)
+        runner.pause()
+        self.assertEqual(root.pending, {})
+        runner.resume()
+        runner.steps_per_frame = 5
+        root.run_pending()
+        self.assertEqual(runner.count, 8)
+        root.run_pending()
+        self.assertEqual((runner.count, runner.done, len(frames), len(done)), (10, True, 3, 1))
+        # Finished: nothing is left scheduled, and resuming doesn't restart it.
+        self.assertEqual(root.pending, {})
+        runner.toggle_pause()
+        runner.toggle_pause()
+        self.assertEqual(root.pending, {})
+
+    def test_step_runner_speed(self):
+        root = FakeRoot()
+        runner = StepRunner(root, range(100), frame_time=0.05, steps_per_frame=2)
+        runner.slower()
+        self.assertEqual((runner.steps_per_frame, runner.frame_time), (1, 0.05))
+        # At one step per frame, slower stretches the frames instead:
+        runner.slower()
+        runner.slower()
+        self.assertEqual((runner.steps_per_frame, runner.frame_time), (1, 0.2))
+        runner.start()
+        self.assertEqual(root.last_ms, 200)
+        for _ in range(10):
+            runner.slower()
+        self.assertEqual(runner.frame_time, 1.6)
+        # Faster takes the stretching back before adding steps:
+        for _ in range(5):
+            runner.faster()
+        self.assertEqual((runner.steps_per_frame, runner.frame_time), (1, 0.05))
+        runner.faster()
+        self.assertEqual((runner.steps_per_frame, runner.frame_time), (2, 0.05))
+
+    def test_events_player_steps(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.events")
+            with events.EventRecorder(path) as recorder:
+                m1 = Maze.headless(6, 6, seed=2, recorder=recorder)
+                m1.solve()
+            player = events.Player(path, FakeWindow())
+            root = FakeRoot()
+            runner = StepRunner(root, player.steps(), steps_per_frame=50)
+            runner.start()
+            while root.pending:
+                root.run_pending()
+            self.assertEqual(runner.count, len(player))
+            self.assertEqual(player.maze._cells.tobytes(), m1._cells.tobytes())
+            player.close()
+
+    def test_topology_neighbors_agree(self):
+        for topology in (Hex(7, 6), Hex(6, 7), Triangle(7, 5), Triangle(1, 4), Layers(4, 3, 3)):
+            for index in range(topology.num_cells):
+                neighbors = topology.neighbors(index)
+                self.assertEqual(len({wall for _, wall, _ in neighbors}), len(neighbors))
+                for next_index, wall, opposite_wall in neighbors:
+                    self.assertIn((index, opposite_wall, wall), topology.neighbors(next_index))
+                    self.assertEqual(topology.distance(index, next_index), 1)
+        self.assertEqual(len(Hex(5, 5).neighbors(12)), 6)
+        self.assertEqual(len(Triangle(5, 5).neighbors(12)), 3)
+        self.assertEqual(len(Layers(3, 3, 3).neighbors(13)), 6)
+
+    def test_generic_square_matches_fast_path(self):
+        for name in ("backtracker", "kruskal", "prim", "wilson"):
+            fast = Grid(9, 7)
+            GENERATORS[name](fast, random.Random(4))
+            generic = Square(9, 7).grid()
+            GENERATORS[name](generic, random.Random(4))
+            self.assertEqual(fast.tobytes(), generic.tobytes())
+
+    def test_maze_topologies(self):
+        for topology, num_levels in (("hex", 1), ("triangle", 1), ("layers", 3)):
+            for name in ("backtracker", "kruskal", "prim", "wilson"):
+                stats = MazeStats()
+                m1 = Maze.headless(
+                    6, 8, seed=5, generator=name, topology=topology,
+                    num_levels=num_levels, stats=stats,
+                )
+                grid = m1._cells
+                num_cells = len(grid.data)
+                self.assertEqual(num_cells, 6 * 8 * num_levels)
+                # A perfect maze: a tree, plus the entrance and exit.
+                self.assertEqual(stats.walls_removed, num_cells - 1 + 2)
+                self.assertEqual(len(m1.path_index()._parent), num_cells)
+                lengths = {m1.find_path(solver).length for solver in SOLVERS}
+                self.assertEqual(len(lengths), 1)
+                self.assertTrue(m1.solve())
+        m1 = Maze.headless(4, 4, seed=1, topology="layers", num_levels=2)
+        # The way out is on the bottom level, so it has to take the stairs:
+        path = m1.find_path().path
+        self.assertEqual(path[-1], (3, 7))
+        self.assertTrue(any(j >= 4 for _, j in path) and path[0] == (0, 0))
+
+    def test_maze_triangle_smallest_sizes(self):
+        for num_rows, num_cols in ((1, 1), (2, 1), (1, 2), (2, 2), (3, 2), (7, 2), (2, 7)):
+            for name in ("backtracker", "kruskal", "prim", "wilson"):
+                stats = MazeStats()
+                m1 = Maze.headless(
+                    num_rows, num_cols, seed=3, generator=name,
+                    topology="triangle", stats=stats,
+                )
+                num_cells = num_rows * num_cols
+                self.assertEqual(stats.walls_removed, num_cells - 1 + 2)
+                self.assertEqual(len(m1.path_index()._parent), num_cells)
+                self.assertTrue(m1.find_path().found)
+                self.assertTrue(m1.solve())
+
+    def test_maze_topologies_refuse_square_only_things(self):
+        with self.assertRaises(ValueError):
+            Maze.headless(5, 5, generator="sidewinder", topology="hex")
+        with self.assertRaises(ValueError):
+            Maze(0, 0, 5, 5, 10, 10, FakeWindow(), topology="hex")
+        with self.assertRaises(ValueError):
+            Maze.headless(5, 5, topology="cube")
+        for topology, num_levels in (("square", 2), ("hex", 2), ("layers", 0)):
+            with self.assertRaises(ValueError):
+                Maze.headless(4, 4, topology=topology, num_levels=num_levels)
+        # One column of triangles only holds together for two rows:
+        with self.assertRaises(ValueError):
+            Maze.headless(3, 1, topology="triangle")
+        m1 = Maze.headless(5, 5, seed=2, topology="hex")
+        with self.assertRaises(ValueError):
+            m1.incremental_solver()
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(ValueError):
+                m1.save(os.path.join(tmp, "hex.maze"))
+
+    def test_import_maze_skips_gui_and_numpy(self):
+        code = (
+            "import sys, maze, solvers, graphics; "
+            "print(*(name for name in ('tkinter', 'numpy', 'concurrent.futures') "
+            "if name in sys.modules))"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True,
+        )
+        self.assertEqual(out.stdout.strip(), "")
+
+    def test_cli_writes_mazes_and_metrics(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            metrics_path = os.path.join(tmp, "metrics.jsonl")
+            code = cli.main([
+                "3", "--size", "9x6", "--seed", "40", "--solver", "astar",
+                "--workers", "1", "--out", tmp, "--metrics", metrics_path, "--quiet",
+            ])
+            self.assertEqual(code, 0)
+            with open(metrics_path) as f:
+                metrics = [json.loads(line) for line in f]
+            self.assertEqual([m["seed"] for m in metrics], [40, 41, 42])
+            for m in metrics:
+                self.assertEqual((m["rows"], m["cols"], m["solver"]), (6, 9, "astar"))
+                m2 = Maze.headless(6, 9, seed=m["seed"])
+                with Maze.load(os.path.join(tmp, f"maze-{m['seed']}.maze")) as m1:
+                    self.assertEqual(m1._cells.tobytes(), m2._cells.tobytes())
+                self.assertEqual(m["path_length"], m2.find_path().length)
+                self.assertGreater(m["dead_ends"], 0)
+        self.assertEqual(cli.parse_size("20x10"), (10, 20))
+        self.assertEqual(cli.parse_size("7"), (7, 7))
+
+    def test_incremental_solver_sees_braid_and_cell_walls(self):
+        for seed in range(1, 6):
+            m1 = Maze.headless(20, 20, seed=seed)
+            solver = m1.incremental_solver()
+            solver.solve()
+            m1.braid(1.0)
+            self.assertEqual(solver.solve().length, m1.find_path().length)
+            # A wall put up through the cell views, on both sides:
+            (i, j), (next_i, next_j) = m1.find_path().path[5:7]
+            if next_i != i:
+                m1._cells[min(i, next_i)][j].has_right_wall = True
+                m1._cells[max(i, next_i)][j].has_left_wall = True
+            else:
+                m1._cells[i][min(j, next_j)].has_bottom_wall = True
+                m1._cells[i][max(j, next_j)].has_top_wall = True
+            self.assertEqual(solver.solve().length, m1.find_path().length)
+
+    def test_events_player_draws_without_animating(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.events")
+            with events.EventRecorder(path) as recorder:
+                Maze.headless(6, 6, seed=2, recorder=recorder)
+            win = FakeWindow()
+            frames = []
+            win.animate = lambda: frames.append(1)
+            player = events.Player(path, win, 0, 0, 10, 10)
+            self.assertEqual(frames, [])
+            # Every wall of the starting grid is on the canvas already:
+            self.assertEqual(win.lines.item_count, 2 * 6 * 7)
+            player.close()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,134 @@
+from collections import deque
+from generators import backtracker, GENERATORS
+from grid import Grid, LEFT, RIGHT, TOP, BOTTOM
+import os
+import random
+
+# Carve huge mazes in parallel. Any one generator is a single serial loop, so
+# instead the grid is cut into square blocks of block_size x block_size
+# cells, and every block is carved as a little maze of its own in a pool of
+# worker processes. The blocks are then stitched together: a spanning tree
+# over the blocks (itself carved as a tiny maze, one cell per block) says
+# which neighboring blocks to join, and each pair gets one passage through
+# their shared edge at a random spot. Trees joined by a tree make a tree, so
+# the result is still a perfect maze.
+#
+#   grid = generate_tiled(5000, 2000, seed=7, workers=8)
+#
+# Every block gets its own seed, drawn from the maze's seed before anything
+# is carved, so a seed gives the same maze however many workers build it.
+# It's not the same maze Maze(seed=...) would carve, though: long corridors
+# can't cross block edges except at the stitches.
+
+DEFAULT_BLOCK_SIZE = 256
+
+
+# Carve one block. Runs in the worker processes, so it's a plain module-level
+# function. Returns the block's cells, row by row:
+def _carve_block(num_cols, num_rows, seed, generator):
+    grid = Grid(num_cols, num_rows)
+    GENERATORS[generator](grid, random.Random(seed))
+    return bytes(grid.data)
+
+
+# Yield each block's (x, y, num_cols, num_rows) corner and size, row by row:
+def _blocks(num_rows, num_cols, block_size):
+    for y in range(0, num_rows, block_size):
+        for x in range(0, num_cols, block_size):
+            yield x, y, min(block_size, num_cols - x), min(block_size, num_rows - y)
+
+
+# Generate a num_cols x num_rows Grid, carved block by block. workers is the
+# number of processes (default: one per CPU); with workers=1 everything runs
+# in this process. The entrance and exit aren't opened; Maze.tiled() does
+# that:
+def generate_tiled(
+    num_rows,
+    num_cols,
+    seed=None,
+    generator="backtracker",
+    block_size=DEFAULT_BLOCK_SIZE,
+    workers=None,
+):
+    if generator not in GENERATORS:
+        raise ValueError(
+            f"unknown generator {generator!r}, expected one of {sorted(GENERATORS)}"
+        )
+    if block_size < 1:
+        raise ValueError("block_size must be at least 1")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    rng = random.Random(seed) if seed else random.Random()
+    blocks = list(_blocks(num_rows, num_cols, block_size))
+    specs = [
+        (block_cols, block_rows, rng.getrandbits(63), generator)
+        for _, _, block_cols, block_rows in blocks
+    ]
+
+    grid = Grid(num_cols, num_rows)
+    data = grid.data
+
+    # Copy a carved block into place, one row at a time:
+    def place(block, cells):
+        x, y, block_cols, block_rows = block
+        for row in range(block_rows):
+            start = (y + row) * num_cols + x
+            data[start:start + block_cols] = cells[row * block_cols:(row + 1) * block_cols]
+
+    if workers == 1 or len(blocks) == 1:
+        for block, spec in zip(blocks, specs):
+            place(block, _carve_block(*spec))
+    else:
+        # Same idea as batch.generate_batch: only a few blocks per worker are
+        # in flight at once, so finished blocks don't pile up in memory. The
+        # pool is imported here, since multiprocessing is slow to import and
+        # most mazes never need it:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for block, spec in zip(blocks, specs):
+                pending.append((block, pool.submit(_carve_block, *spec)))
+                if len(pending) >= workers * 4:
+                    block, future = pending.popleft()
+                    place(block, future.result())
+            while pending:
+                block, future = pending.popleft()
+                place(block, future.result())
+
+    _stitch(grid, block_size, rng)
+    return grid
+
+
+# Join the blocks. The spanning tree over them is a backtracker maze with one
+# cell per block: every passage in it becomes one passage between the two
+# blocks, somewhere along their shared edge:
+def _stitch(grid, block_size, rng):
+    data = grid.data
+    num_cols = grid.num_cols
+    num_rows = grid.num_rows
+    blocks_x = -(-num_cols // block_size)
+    blocks_y = -(-num_rows // block_size)
+    tree = Grid(blocks_x, blocks_y)
+    backtracker(tree, rng)
+
+    for block_y in range(blocks_y):
+        for block_x in range(blocks_x):
+            walls = tree.data[block_y * blocks_x + block_x]
+            x = block_x * block_size
+            y = block_y * block_size
+            if block_x < blocks_x - 1 and not walls & RIGHT:
+                # Through the right edge of this block, in a random row:
+                row = y + rng.randrange(min(block_size, num_rows - y))
+                index = row * num_cols + x + block_size - 1
+                data[index] &= ~RIGHT
+                data[index + 1] &= ~LEFT
+            if block_y < blocks_y - 1 and not walls & BOTTOM:
+                # Through the bottom edge of this block, in a random column:
+                col = x + rng.randrange(min(block_size, num_cols - x))
+                index = (y + block_size - 1) * num_cols + col
+                data[index] &= ~BOTTOM
+                data[index + num_cols] &= ~TOP
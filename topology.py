@@ -0,0 +1,259 @@
+from grid import Grid, LEFT, RIGHT, TOP, BOTTOM, UP, DOWN, WALLS
+
+# Grid topologies: how the cells of a Grid connect to each other. A Grid is
+# always one byte per cell, stored row by row, and every wall is one bit of
+# the byte; a topology says which neighbor each wall bit leads to. The
+# generators and solvers only ever ask a topology two questions, so they run
+# unchanged over any of them:
+#
+#   neighbors(index)             every neighbor of a cell, as
+#                                (neighbor index, wall, opposite wall)
+#   open_neighbors(data, index)  the neighbors with no wall in between
+#
+# (Both also accept the grid's num_cols and num_rows, ignored, so they can
+# be called exactly like the square grid functions in generators.py and
+# solvers.py.) A* also asks for distance(a, b), a number of moves that's
+# never more than the real shortest path.
+#
+# Square grids don't need a topology at all: a Grid with topology None is
+# square, and the generators and solvers handle it with their own inlined
+# code, which is as fast as ever. Square is here for completeness, and to
+# check the generic code against the fast code.
+#
+#   grid = make_grid("hex", 40, 30)
+#   grid = make_grid("triangle", 40, 30)
+#   grid = make_grid("layers", 20, 20, num_levels=4)
+#   maze = Maze.headless(20, 20, topology="layers", num_levels=4)
+#
+# A Maze's cells are still (i, j) pairs, in terms of where they're stored:
+# column i of storage row j. For hex and triangle grids that's just the
+# column and row.
+# For layered grids the levels are stored one under the other, so cell
+# (i, j) of level k is (i, k * num_rows + j); see Layers.position().
+#
+# Only square mazes can be drawn, recorded, saved to a file or turned into
+# an image, and binary_tree, sidewinder and eller only carve square grids.
+
+
+class _Topology:
+    def __init__(self, num_cols, num_rows):
+        # The shape the cells are stored in, which is also the Grid's shape:
+        self.num_cols = num_cols
+        self.num_rows = num_rows
+        self.num_cells = num_cols * num_rows
+
+    def open_neighbors(self, data, index, num_cols=None, num_rows=None):
+        walls = data[index]
+        return [
+            next_index
+            for next_index, wall, _ in self.neighbors(index)
+            if not walls & wall
+        ]
+
+    # A new Grid with every wall up:
+    def grid(self):
+        return Grid(self.num_cols, self.num_rows, self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.num_cols}, {self.num_rows})"
+
+
+# Square cells with four neighbors: the layout every Grid has by default.
+class Square(_Topology):
+    name = "square"
+    walls = WALLS
+
+    def neighbors(self, index, num_cols=None, num_rows=None):
+        j, i = divmod(index, self.num_cols)
+        neighbors = []
+        if i > 0:
+            neighbors.append((index - 1, LEFT, RIGHT))
+        if i < self.num_cols - 1:
+            neighbors.append((index + 1, RIGHT, LEFT))
+        if j > 0:
+            neighbors.append((index - self.num_cols, TOP, BOTTOM))
+        if j < self.num_rows - 1:
+            neighbors.append((index + self.num_cols, BOTTOM, TOP))
+        return neighbors
+
+    def distance(self, a, b):
+        a_j, a_i = divmod(a, self.num_cols)
+        b_j, b_i = divmod(b, self.num_cols)
+        return abs(a_i - b_i) + abs(a_j - b_j)
+
+
+# Hex cells with six neighbors, in rows, with every odd row pushed half a cell
+# to the right (the "odd-r" layout). The six walls reuse the four square
+# bits for the sides that line up with them, plus UP and DOWN:
+WEST = LEFT
+EAST = RIGHT
+NORTH_WEST = TOP
+SOUTH_EAST = BOTTOM
+NORTH_EAST = UP
+SOUTH_WEST = DOWN
+
+
+class Hex(_Topology):
+    name = "hex"
+    walls = WEST | EAST | NORTH_WEST | SOUTH_EAST | NORTH_EAST | SOUTH_WEST
+
+    def neighbors(self, index, num_cols=None, num_rows=None):
+        num_cols = self.num_cols
+        j, i = divmod(index, num_cols)
+        # Even rows reach up and down to columns i - 1 and i, odd rows (pushed
+        # to the right) to columns i and i + 1:
+        left = i - 1 + (j & 1)
+        neighbors = []
+        if i > 0:
+            neighbors.append((index - 1, WEST, EAST))
+        if i < num_cols - 1:
+            neighbors.append((index + 1, EAST, WEST))
+        if j > 0:
+            above = index - num_cols + left - i
+            if left >= 0:
+                neighbors.append((above, NORTH_WEST, SOUTH_EAST))
+            if left < num_cols - 1:
+                neighbors.append((above + 1, NORTH_EAST, SOUTH_WEST))
+        if j < self.num_rows - 1:
+            below = index + num_cols + left - i
+            if left >= 0:
+                neighbors.append((below, SOUTH_WEST, NORTH_EAST))
+            if left < num_cols - 1:
+                neighbors.append((below + 1, SOUTH_EAST, NORTH_WEST))
+        return neighbors
+
+    # Hex distance, by way of cube coordinates (x + y + z = 0, and each move
+    # changes two of them by one):
+    def _cube(self, index):
+        j, i = divmod(index, self.num_cols)
+        x = i - (j - (j & 1)) // 2
+        return x, j, -x - j
+
+    def distance(self, a, b):
+        a_x, a_z, a_y = self._cube(a)
+        b_x, b_z, b_y = self._cube(b)
+        return max(abs(a_x - b_x), abs(a_y - b_y), abs(a_z - b_z))
+
+
+# Triangles in rows, alternately pointing up and down: cell (i, j) points up
+# if i + j is even. Every triangle has a neighbor through each slanted side
+# (LEFT and RIGHT) and one through its flat side: below for triangles that
+# point up (BOTTOM), above for ones that point down (TOP). The fourth wall bit
+# of each cell has nothing behind it and just stays up.
+class Triangle(_Topology):
+    name = "triangle"
+    walls = WALLS
+
+    def neighbors(self, index, num_cols=None, num_rows=None):
+        num_cols = self.num_cols
+        j, i = divmod(index, num_cols)
+        neighbors = []
+        if i > 0:
+            neighbors.append((index - 1, LEFT, RIGHT))
+        if i < num_cols - 1:
+            neighbors.append((index + 1, RIGHT, LEFT))
+        if (i + j) % 2 == 0:
+            if j < self.num_rows - 1:
+                neighbors.append((index + num_cols, BOTTOM, TOP))
+        elif j > 0:
+            neighbors.append((index - num_cols, TOP, BOTTOM))
+        return neighbors
+
+    # Every move changes either the column or the row by one, so the
+    # Manhattan distance never overestimates (the real one is often longer,
+    # since a triangle can only leave a row through its flat side):
+    def distance(self, a, b):
+        a_j, a_i = divmod(a, self.num_cols)
+        b_j, b_i = divmod(b, self.num_cols)
+        return abs(a_i - b_i) + abs(a_j - b_j)
+
+
+# Square levels stacked on top of each other, num_cols x num_rows each, with
+# stairs: every cell can connect to the same cell on the level above (UP) and
+# the level below (DOWN). Level 0 is the top. The entrance is on the top
+# level and the exit on the bottom one, so the way through goes downstairs.
+class Layers(_Topology):
+    name = "layers"
+    walls = WALLS | UP | DOWN
+
+    def __init__(self, num_cols, num_rows, num_levels):
+        super().__init__(num_cols, num_rows * num_levels)
+        self.level_rows = num_rows
+        self.num_levels = num_levels
+        self.level_size = num_cols * num_rows
+
+    def __repr__(self):
+        return f"Layers({self.num_cols}, {self.level_rows}, {self.num_levels})"
+
+    def index(self, i, j, level):
+        return level * self.level_size + j * self.num_cols + i
+
+    # A cell's (i, j, level):
+    def position(self, index):
+        level, rest = divmod(index, self.level_size)
+        j, i = divmod(rest, self.num_cols)
+        return i, j, level
+
+    def neighbors(self, index, num_cols=None, num_rows=None):
+        num_cols = self.num_cols
+        level, rest = divmod(index, self.level_size)
+        j, i = divmod(rest, num_cols)
+        neighbors = []
+        if i > 0:
+            neighbors.append((index - 1, LEFT, RIGHT))
+        if i < num_cols - 1:
+            neighbors.append((index + 1, RIGHT, LEFT))
+        if j > 0:
+            neighbors.append((index - num_cols, TOP, BOTTOM))
+        if j < self.level_rows - 1:
+            neighbors.append((index + num_cols, BOTTOM, TOP))
+        if level > 0:
+            neighbors.append((index - self.level_size, UP, DOWN))
+        if level < self.num_levels - 1:
+            neighbors.append((index + self.level_size, DOWN, UP))
+        return neighbors
+
+    def distance(self, a, b):
+        a_i, a_j, a_level = self.position(a)
+        b_i, b_j, b_level = self.position(b)
+        return abs(a_i - b_i) + abs(a_j - b_j) + abs(a_level - b_level)
+
+
+# Every topology by name. Maze(topology="hex") looks names up here:
+TOPOLOGIES = {
+    "square": Square,
+    "hex": Hex,
+    "triangle": Triangle,
+    "layers": Layers,
+}
+
+
+# Refuse shapes a topology can't make a maze out of. num_levels only means
+# something for layered grids, and they need at least one level. A triangle
+# grid one column wide falls apart after its second row: (0, 1) points down
+# and (0, 2) points up, so they don't share a side:
+def check_shape(topology, num_cols, num_rows, num_levels=1):
+    if num_levels < 1:
+        raise ValueError(f"num_levels must be at least 1, got {num_levels}")
+    if num_levels != 1 and topology != "layers":
+        raise ValueError(f"num_levels is only for the layers topology, not {topology!r}")
+    if topology == "triangle" and num_cols < 2 and num_rows > 2:
+        raise ValueError(
+            f"a triangle maze more than 2 rows tall needs at least 2 columns, got {num_cols}"
+        )
+
+
+# A new Grid with every wall up, for a topology by name. "square" gives a plain
+# Grid, with no topology, so it gets the fast square code. num_levels is only
+# for "layers":
+def make_grid(topology, num_cols, num_rows, num_levels=1):
+    if topology not in TOPOLOGIES:
+        raise ValueError(
+            f"unknown topology {topology!r}, expected one of {sorted(TOPOLOGIES)}"
+        )
+    check_shape(topology, num_cols, num_rows, num_levels)
+    if topology == "square":
+        return Grid(num_cols, num_rows)
+    if topology == "layers":
+        return Layers(num_cols, num_rows, num_levels).grid()
+    return TOPOLOGIES[topology](num_cols, num_rows).grid()